@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Company, Employee, EmploymentHistory, UserProfile, AuditLog
+from .models import (
+    Company, Employee, EmploymentHistory, UserProfile, AuditLog, AuditLogArchive, ImportJob,
+    MetricCounter, VerificationRecord,
+)
 
 @admin.register(Company)
 class CompanyAdmin(admin.ModelAdmin):
@@ -40,3 +43,31 @@ class AuditLogAdmin(admin.ModelAdmin):
     date_hierarchy = 'timestamp'
     readonly_fields = ('user', 'action', 'entity_type', 'entity_id', 'details', 'ip_address', 'timestamp')
 
+
+@admin.register(AuditLogArchive)
+class AuditLogArchiveAdmin(admin.ModelAdmin):
+    list_display = ('month', 'format', 'rows', 'first_timestamp', 'last_timestamp', 'created_at')
+    readonly_fields = ('month', 'format', 'file', 'rows', 'first_timestamp', 'last_timestamp')
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('original_name', 'kind', 'status', 'rows_processed', 'rows_failed', 'created_by', 'created_at')
+    search_fields = ('original_name', 'created_by__username')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('rows_processed', 'rows_failed', 'total_rows', 'result', 'error', 'started_at', 'finished_at')
+
+
+@admin.register(MetricCounter)
+class MetricCounterAdmin(admin.ModelAdmin):
+    list_display = ('name', 'value', 'updated_at')
+
+
+@admin.register(VerificationRecord)
+class VerificationRecordAdmin(admin.ModelAdmin):
+    list_display = ('employee_number', 'name', 'company_name', 'role', 'start_date', 'end_date', 'updated_at')
+    search_fields = ('employee_number', 'name', 'company_name')
+    readonly_fields = (
+        'employee', 'employee_number', 'name', 'company', 'company_name', 'department',
+        'role', 'start_date', 'end_date', 'history', 'updated_at',
+    )
@@ -0,0 +1,301 @@
+"""
+Audit log retention.
+
+`archive_audit_logs(before)` moves `AuditLog` entries older than `before` into
+compressed files, one per calendar month, each recorded as an
+`AuditLogArchive`, so the table only holds the retention window
+(`AUDIT_LOG['RETENTION_DAYS']`). Files are gzipped JSON lines, or Parquet when
+`pyarrow` is installed and requested.
+
+`AuditLogEntries` pages through live rows and archived entries as one
+sequence; `AuditLogViewSet` uses it when a query reaches into the archives.
+"""
+import gzip
+import importlib.util
+import io
+import json
+import tempfile
+from operator import itemgetter
+from datetime import datetime, timedelta
+
+import pandas as pd
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AuditLog, AuditLogArchive
+from .pagination import KeysetPagination
+
+# Archived entry layout; matches the output of AuditLogSerializer
+ARCHIVE_FIELDS = (
+    'id', 'user', 'username', 'action', 'entity_type',
+    'entity_id', 'details', 'ip_address', 'timestamp',
+)
+QUERY_FIELDS = (
+    'id', 'user_id', 'user__username', 'action', 'entity_type',
+    'entity_id', 'details', 'ip_address', 'timestamp',
+)
+
+
+def parquet_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def month_bounds(value):
+    """Return the aware start of `value`'s month and of the following month."""
+    local = timezone.localtime(value)
+    start = datetime(local.year, local.month, 1)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return timezone.make_aware(start), timezone.make_aware(end)
+
+
+def archive_audit_logs(before, file_format=AuditLogArchive.FORMAT_JSONL, batch_size=5000):
+    """
+    Archive and delete every entry with a timestamp before `before`, oldest
+    month first. Returns the created `AuditLogArchive` rows.
+    """
+    if file_format == AuditLogArchive.FORMAT_PARQUET and not parquet_available():
+        raise ValueError('Parquet archives require pyarrow to be installed.')
+
+    archives = []
+    while True:
+        oldest = (
+            AuditLog.objects.filter(timestamp__lt=before)
+            .order_by('timestamp').values_list('timestamp', flat=True).first()
+        )
+        if oldest is None:
+            return archives
+        start, end = month_bounds(oldest)
+        archives.append(archive_range(start, min(end, before), file_format, batch_size))
+
+
+def archive_range(start, end, file_format, batch_size):
+    queryset = AuditLog.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    entries = (
+        queryset.order_by('timestamp', 'id')
+        .values_list(*QUERY_FIELDS)
+        .iterator(chunk_size=batch_size)
+    )
+    with tempfile.TemporaryFile() as tmp:
+        if file_format == AuditLogArchive.FORMAT_PARQUET:
+            stats = write_parquet(tmp, entries)
+        else:
+            stats = write_jsonl(tmp, entries)
+        tmp.seek(0)
+
+        with transaction.atomic():
+            archive = AuditLogArchive(
+                month=timezone.localtime(start).date().replace(day=1),
+                format=file_format,
+                rows=stats['rows'],
+                first_timestamp=stats['first_timestamp'],
+                last_timestamp=stats['last_timestamp'],
+            )
+            archive.file.save(f'audit-{start:%Y-%m}.{file_format}', File(tmp), save=False)
+            archive.save()
+            # Only delete what was written, in bounded statements
+            archived = queryset.filter(id__lte=stats['max_id'])
+            while True:
+                ids = list(archived.values_list('id', flat=True)[:batch_size])
+                if not ids:
+                    break
+                AuditLog.objects.filter(pk__in=ids).delete()
+    return archive
+
+
+def iter_records(entries, stats):
+    for entry in entries:
+        record = dict(zip(ARCHIVE_FIELDS, entry))
+        stats['rows'] += 1
+        stats['first_timestamp'] = stats['first_timestamp'] or record['timestamp']
+        stats['last_timestamp'] = record['timestamp']
+        stats['max_id'] = max(stats['max_id'], record['id'])
+        yield record
+
+
+def new_stats():
+    return {'rows': 0, 'first_timestamp': None, 'last_timestamp': None, 'max_id': 0}
+
+
+def write_jsonl(file, entries):
+    stats = new_stats()
+    with gzip.GzipFile(fileobj=file, mode='wb') as gz:
+        writer = io.TextIOWrapper(gz, encoding='utf-8')
+        for record in iter_records(entries, stats):
+            record['timestamp'] = record['timestamp'].isoformat()
+            writer.write(json.dumps(record) + '\n')
+        writer.flush()
+        writer.detach()
+    return stats
+
+
+def write_parquet(file, entries):
+    stats = new_stats()
+    records = list(iter_records(entries, stats))
+    frame = pd.DataFrame.from_records(records, columns=ARCHIVE_FIELDS)
+    # Parquet has no JSON type; keep details as encoded text
+    frame['details'] = frame['details'].map(lambda value: None if value is None else json.dumps(value))
+    frame.to_parquet(file, index=False)
+    return stats
+
+
+def iter_archive(archive):
+    """Yield the entries stored in `archive` as dicts with aware timestamps."""
+    with archive.file.open('rb') as file:
+        if archive.format == AuditLogArchive.FORMAT_PARQUET:
+            frame = pd.read_parquet(file)
+            for record in frame.to_dict('records'):
+                record['details'] = json.loads(record['details']) if record['details'] else None
+                record['timestamp'] = pd.Timestamp(record['timestamp']).to_pydatetime()
+                yield record
+            return
+        with gzip.open(file, 'rt', encoding='utf-8') as lines:
+            for line in lines:
+                record = json.loads(line)
+                record['timestamp'] = parse_datetime(record['timestamp'])
+                yield record
+
+
+class AuditLogEntries:
+    """
+    The `AuditLog` rows of `queryset` followed by the archived entries with
+    `start <= timestamp < end` that satisfy `match`, as one sequence the
+    paginators accept: `count()` and slicing for page numbers, `order_by()`
+    and `after()` for keyset pagination.
+
+    Archives only hold entries older than every live row, so a page is sliced
+    from the queryset in SQL and archive files are read only for the part of
+    the page past the live rows (before them when ordered oldest first).
+    Archives that lie wholly in the range are skipped by their row count
+    when no `match` or cursor applies.
+    """
+
+    def __init__(self, queryset, start=None, end=None, match=None, cursor=None):
+        self.queryset = queryset
+        self.model = queryset.model
+        self.query = queryset.query
+        self.start, self.end, self.match = start, end, match
+        self.cursor = cursor
+        self.ordering = list(self.query.order_by or self.model._meta.ordering)
+        if not {'pk', '-pk', 'id', '-id'} & set(self.ordering):
+            self.ordering.append('pk')
+        self.newest_first = self.ordering[0].startswith('-')
+        self._live_count = None
+        self._archives = None
+        self.sizes = {}
+
+    def order_by(self, *fields):
+        return AuditLogEntries(self.queryset.order_by(*fields), self.start, self.end, self.match)
+
+    def after(self, ordering, values):
+        """Entries strictly after the keyset cursor `values` in `ordering`."""
+        cursor = [
+            self.get_field(field).to_python(value) for field, value in zip(ordering, values)
+        ]
+        return AuditLogEntries(
+            self.queryset.filter(KeysetPagination.after(ordering, values)),
+            self.start, self.end, self.match, cursor,
+        )
+
+    def get_field(self, field):
+        name = field.lstrip('-')
+        return self.model._meta.pk if name == 'pk' else self.model._meta.get_field(name)
+
+    def count(self):
+        return self.live_count() + sum(self.size(archive) for archive in self.get_archives())
+
+    def live_count(self):
+        if self._live_count is None:
+            self._live_count = self.queryset.count()
+        return self._live_count
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError('AuditLogEntries only supports slicing without a step.')
+        start = key.start or 0
+        stop = self.count() if key.stop is None else key.stop
+        limit = stop - start
+        if limit <= 0:
+            return []
+        if self.newest_first:
+            entries = list(self.queryset[start:stop])
+            if len(entries) < limit:
+                # The page runs past the live rows into the archives
+                offset = 0 if entries else max(start - self.live_count(), 0)
+                entries += self.read_window(offset, limit - len(entries))
+            return entries
+        archived = sum(self.size(archive) for archive in self.get_archives())
+        entries = self.read_window(start, limit) if start < archived else []
+        if len(entries) < limit:
+            offset = max(start - archived, 0)
+            entries += list(self.queryset[offset:offset + limit - len(entries)])
+        return entries
+
+    def get_archives(self):
+        if self._archives is None:
+            archives = AuditLogArchive.objects.all()
+            if self.start is not None:
+                archives = archives.filter(last_timestamp__gte=self.start)
+            if self.end is not None:
+                archives = archives.filter(first_timestamp__lt=self.end)
+            if self.cursor is not None and self.ordering[0].lstrip('-') == 'timestamp':
+                # Archives wholly before the cursor hold nothing after it
+                if self.newest_first:
+                    archives = archives.filter(first_timestamp__lte=self.cursor[0])
+                else:
+                    archives = archives.filter(last_timestamp__gte=self.cursor[0])
+            self._archives = list(
+                archives.order_by('-first_timestamp' if self.newest_first else 'first_timestamp')
+            )
+        return self._archives
+
+    def size(self, archive):
+        if archive.pk not in self.sizes:
+            covered = (
+                self.match is None and self.cursor is None
+                and (self.start is None or archive.first_timestamp >= self.start)
+                and (self.end is None or archive.last_timestamp < self.end)
+            )
+            self.sizes[archive.pk] = archive.rows if covered else len(self.read(archive))
+        return self.sizes[archive.pk]
+
+    def read_window(self, offset, limit):
+        """Return `limit` archived entries from `offset`, reading only the files needed."""
+        entries = []
+        for archive in self.get_archives():
+            if len(entries) >= limit:
+                break
+            size = self.sizes.get(archive.pk)
+            if size is not None and offset >= size:
+                offset -= size
+                continue
+            records = self.read(archive)
+            self.sizes[archive.pk] = len(records)
+            entries += records[offset:offset + limit - len(entries)]
+            offset = max(offset - len(records), 0)
+        return entries
+
+    def read(self, archive):
+        """Return the entries of `archive` this sequence includes, in its ordering."""
+        records = [record for record in iter_archive(archive) if self.includes(record)]
+        for field in reversed(self.ordering):
+            records.sort(key=itemgetter(self.get_field(field).name), reverse=field.startswith('-'))
+        return records
+
+    def includes(self, record):
+        timestamp = record['timestamp']
+        if self.start is not None and timestamp < self.start:
+            return False
+        if self.end is not None and timestamp >= self.end:
+            return False
+        if self.cursor is not None and not self.is_after(record):
+            return False
+        return self.match is None or self.match(record)
+
+    def is_after(self, record):
+        for field, value in zip(self.ordering, self.cursor):
+            actual = record[self.get_field(field).name]
+            if actual != value:
+                return actual < value if field.startswith('-') else actual > value
+        return False
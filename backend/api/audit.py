@@ -0,0 +1,245 @@
+"""
+Batched audit logging.
+
+`AuditLogMiddleware` hands entries to `get_audit_pipeline().log(...)`, which
+only appends to an in-memory queue. A background thread writes queued entries
+with `bulk_create` once `BATCH_SIZE` entries are waiting or every
+`FLUSH_INTERVAL` seconds, and whatever is left is flushed when the process
+exits.
+
+Views that write their own entry (e.g. bulk operations) use `log_request`,
+which also stops the middleware from logging the same request again.
+
+High-volume `view` entries can be sampled (`VIEW_SAMPLE_RATE`) and repeated
+views of the same entity by the same user suppressed for
+`VIEW_SUPPRESS_SECONDS`. All options live in the `AUDIT_LOG` setting.
+
+With `ASYNC` off, entries are written once the request's transaction
+commits instead. On SQLite the single background writer takes the write lock
+once per batch rather than once per request; the busy timeout configured in
+`DATABASES` makes it and request threads wait for the lock instead of failing
+with "database is locked", and a batch that still fails is retried. Entries
+that cannot be written (queue full, database errors after retries) are logged
+in full on this module's logger and counted as `audit_entries_dropped` in
+`/api/metrics/`.
+"""
+import atexit
+import logging
+import queue
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DatabaseError, OperationalError, close_old_connections, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .metrics import get_metrics_registry
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # Write entries from a background thread; False writes them on commit
+    'ASYNC': True,
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 2.0,
+    # Entries beyond this are dropped (and counted) rather than blocking requests
+    'MAX_QUEUE_SIZE': 10000,
+    # Fraction of `view` entries kept
+    'VIEW_SAMPLE_RATE': 1.0,
+    # Skip a `view` entry when the same user viewed the same entity this recently
+    'VIEW_SUPPRESS_SECONDS': 0,
+    # Entries older than this are moved to archive files by archive_audit_logs
+    'RETENTION_DAYS': 90,
+}
+
+# Attempts at writing a batch when the database is busy, before falling back
+# to one entry at a time
+WRITE_ATTEMPTS = 3
+RETRY_DELAY = 0.1
+
+
+def get_audit_settings():
+    return {**DEFAULTS, **getattr(settings, 'AUDIT_LOG', {})}
+
+
+class AuditPipeline:
+    def __init__(self, options=None):
+        options = options or get_audit_settings()
+        self.asynchronous = options['ASYNC']
+        self.batch_size = options['BATCH_SIZE']
+        self.flush_interval = options['FLUSH_INTERVAL']
+        self.view_sample_rate = options['VIEW_SAMPLE_RATE']
+        self.view_suppress_seconds = options['VIEW_SUPPRESS_SECONDS']
+        self.queue = queue.Queue(maxsize=options['MAX_QUEUE_SIZE'])
+        self.dropped = 0
+        self.recent_views = {}
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def should_log(self, entry):
+        if entry['action'] != 'view':
+            return True
+        if self.view_sample_rate < 1 and random.random() >= self.view_sample_rate:
+            return False
+        if self.view_suppress_seconds:
+            key = (entry['user_id'], entry['entity_type'], entry['entity_id'])
+            now = time.monotonic()
+            with self.lock:
+                last = self.recent_views.get(key)
+                if last is not None and now - last < self.view_suppress_seconds:
+                    return False
+                if len(self.recent_views) >= self.queue.maxsize:
+                    self.recent_views.clear()
+                self.recent_views[key] = now
+        return True
+
+    def log(self, **entry):
+        """
+        Queue an audit entry. Accepts `AuditLog` field values, with `user_id`
+        rather than `user`; `timestamp` defaults to now.
+        """
+        entry.setdefault('user_id', None)
+        entry.setdefault('entity_id', None)
+        entry.setdefault('timestamp', timezone.now())
+        if not self.should_log(entry):
+            return
+        if not self.asynchronous:
+            # After commit, so that a failed insert cannot fail the caller's
+            # transaction (foreign keys are checked at commit)
+            transaction.on_commit(lambda: self.write([entry]))
+            return
+
+        self.start()
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            self.discard([entry], 'audit queue full')
+            return
+        if self.queue.qsize() >= self.batch_size:
+            self.wakeup.set()
+
+    def start(self):
+        if self.thread is not None:
+            return
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='audit-log', daemon=True)
+                self.thread.start()
+                atexit.register(self.stop)
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                # This thread's connection outlives requests; honour CONN_MAX_AGE
+                close_old_connections()
+                self.flush()
+            except Exception:
+                logger.exception('Audit log flush failed')
+
+    def stop(self):
+        """Stop the background thread and write anything still queued."""
+        self.stopped.set()
+        self.wakeup.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def flush(self):
+        """Write all queued entries; returns the number written."""
+        written = 0
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return written
+            written += self.write(batch)
+
+    def write(self, entries):
+        # Savepoints keep a failed insert from breaking a surrounding transaction
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                with transaction.atomic():
+                    AuditLog.objects.bulk_create([AuditLog(**entry) for entry in entries])
+                return len(entries)
+            except OperationalError:
+                # e.g. "database is locked"; usually gone after a moment
+                logger.warning('Audit batch insert failed (attempt %d)', attempt, exc_info=True)
+                if attempt < WRITE_ATTEMPTS:
+                    time.sleep(RETRY_DELAY * attempt)
+            except DatabaseError:
+                # e.g. a user deleted while their entries were queued; keep the rest
+                logger.exception('Audit batch insert failed, retrying entries one by one')
+                break
+
+        written = 0
+        for entry in entries:
+            try:
+                with transaction.atomic():
+                    AuditLog.objects.create(**entry)
+                written += 1
+            except DatabaseError as e:
+                self.discard([entry], f'write failed: {e}')
+        return written
+
+    def discard(self, entries, reason):
+        """Log and count entries that will not be written, so none are lost silently."""
+        with self.lock:
+            self.dropped += len(entries)
+        get_metrics_registry().increment('audit_entries_dropped', len(entries))
+        for entry in entries:
+            logger.error('Dropped audit entry (%s): %r', reason, entry)
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_audit_pipeline():
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = AuditPipeline()
+        return _pipeline
+
+
+@receiver(setting_changed)
+def reset_audit_pipeline(setting, **kwargs):
+    # Build the pipeline again from overridden settings, e.g. in tests
+    global _pipeline
+    if setting != 'AUDIT_LOG':
+        return
+    with _pipeline_lock:
+        previous, _pipeline = _pipeline, None
+    if previous is not None:
+        previous.stop()
+
+
+def get_client_ip(request):
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[0]
+    return request.META.get('REMOTE_ADDR')
+
+
+def log_request(request, **entry):
+    """
+    Queue an audit entry for `request` on behalf of a view, in place of the
+    generic entry `AuditLogMiddleware` would write for it.
+    """
+    http_request = getattr(request, '_request', request)
+    http_request.audit_logged = True
+    get_audit_pipeline().log(
+        user_id=request.user.pk, ip_address=get_client_ip(http_request), **entry
+    )
@@ -0,0 +1,317 @@
+"""
+Repeatable API benchmark suite.
+
+Every scenario sends real requests through the whole stack (middleware, JWT
+authentication, permissions, querysets and serialization) with Django's test
+client against the configured database, authenticated as benchmark users of
+each role, all bound to the largest company but the admin. For each scenario
+the suite records latency percentiles, the number of queries per request and
+the peak Python memory allocated while serving one request.
+
+Write scenarios only target rows the suite creates itself (tagged with
+`UPLOAD_PREFIX`, in the largest company and a benchmark company of their
+own) and deletes afterwards, so existing data is never modified.
+
+`run_suite` returns a JSON-serializable report; `compare_reports` diffs two
+reports so that runs can be compared over time (see the `run_benchmarks`
+management command). Response caching is disabled while benchmarking unless
+asked for, so the numbers describe the uncached path.
+"""
+import csv
+import io
+import logging
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from collections import namedtuple
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .bulk import bulk_delete_employees
+from .importers import peak_memory_mb
+from .models import AuditLog, Company, Employee, EmploymentHistory
+from .tokens import ProfileRefreshToken
+
+PERCENTILES = (50, 90, 95, 99)
+ROLES = ('admin', 'company_manager', 'hr_staff', 'regular_user')
+USERNAME = 'benchmark-{}'
+UPLOAD_PREFIX = 'BENCH-'
+
+# Relative slowdown of p95 latency reported as a regression, ignoring
+# differences below NOISE_MS
+REGRESSION_THRESHOLD = 0.2
+NOISE_MS = 1.0
+
+# `send(client, iteration)` returns the response; `status` is the expected code
+Scenario = namedtuple('Scenario', 'name role send status')
+
+
+def percentile(values, percent):
+    """Linear-interpolated percentile of a sorted, non-empty list."""
+    position = (len(values) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def get(path, **params):
+    return lambda client, iteration: client.get(path, params)
+
+
+def benchmark_users(company):
+    """Return an authenticated client per role, creating the benchmark users if needed."""
+    clients = {}
+    for role in ROLES:
+        user, _ = User.objects.get_or_create(username=USERNAME.format(role))
+        user.profile.role = role
+        user.profile.company = None if role == 'admin' else company
+        user.profile.save()
+        client = APIClient(HTTP_HOST=benchmark_host())
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {ProfileRefreshToken.for_user(user).access_token}'
+        )
+        clients[role] = client
+    return clients
+
+
+def benchmark_host():
+    for host in settings.ALLOWED_HOSTS:
+        host = host.lstrip('.')
+        if host and host != '*':
+            return host
+    return 'localhost'
+
+
+def upload_file(company, rows, iteration):
+    """An employee CSV whose rows all change role on every other iteration."""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['name', 'employee_id', 'company', 'department', 'role', 'start_date'])
+    role = f'Benchmark Analyst {iteration % 2}'
+    for number in range(rows):
+        writer.writerow([
+            f'Benchmark Employee {number}', f'{UPLOAD_PREFIX}{number:07d}',
+            company.name, 'Engineering', role, '2020-01-01',
+        ])
+    file = io.BytesIO(output.getvalue().encode())
+    file.name = 'benchmark.csv'
+    return file
+
+
+def create_fixtures(company):
+    """
+    Create the employees the write scenarios target: one in `company` and one
+    in a separate benchmark company.
+    """
+    other_company, _ = Company.objects.get_or_create(
+        registration_number=f'{UPLOAD_PREFIX}COMPANY',
+        defaults={
+            'name': 'Benchmark Company', 'registration_date': '2020-01-01', 'address': '-',
+            'contact_person': '-', 'phone': '-', 'email': 'benchmark@example.com',
+        },
+    )
+    fixtures = []
+    for target, suffix in ((company, 'OWN'), (other_company, 'OTHER')):
+        employee, _ = Employee.objects.get_or_create(
+            employee_id=f'{UPLOAD_PREFIX}{suffix}',
+            defaults={
+                'name': f'Benchmark {suffix.title()}', 'company': target,
+                'department': 'Engineering', 'role': 'Benchmark Analyst', 'start_date': '2020-01-01',
+            },
+        )
+        fixtures.append(employee)
+    return fixtures
+
+
+def delete_fixtures():
+    """Delete everything the suite created: uploaded rows, fixtures and the benchmark company."""
+    bulk_delete_employees(Employee.objects.filter(employee_id__startswith=UPLOAD_PREFIX))
+    Company.objects.filter(registration_number=f'{UPLOAD_PREFIX}COMPANY').delete()
+
+
+def build_scenarios(company, upload_rows):
+    employee = Employee.objects.filter(company=company).order_by('pk').first()
+    if employee is None:
+        raise ValueError('No employees to benchmark against; run seed_data first.')
+    own, other = create_fixtures(company)
+    surname = employee.name.split()[-1]
+    misspelled = employee.name[:2] + employee.name[3:]
+    detail = f'/api/employees/{employee.pk}/'
+
+    def upload(client, iteration):
+        return client.post(
+            '/api/employees/bulk_upload/?mode=upsert',
+            {'file': upload_file(company, upload_rows, iteration)}, format='multipart',
+        )
+
+    scenarios = [
+        Scenario('search:name', 'admin', get('/api/search/', name=surname), 200),
+        Scenario('search:q', 'admin', get('/api/search/', q=employee.role.split()[0]), 200),
+        Scenario('search:fuzzy', 'admin', get('/api/search/', name=misspelled, fuzzy='true'), 200),
+        Scenario('search:keyset', 'admin', get('/api/search/', department=employee.department, pagination='keyset'), 200),
+        Scenario('dashboard', 'admin', get('/api/dashboard/'), 200),
+        Scenario('companies:list', 'admin', get('/api/companies/'), 200),
+        Scenario('employees:list', 'admin', get('/api/employees/'), 200),
+        Scenario('employees:list:deep-page', 'admin', get('/api/employees/', page=50), 200),
+        Scenario('employees:list:keyset', 'admin', get('/api/employees/', pagination='keyset'), 200),
+        Scenario('employees:detail', 'admin', get(detail), 200),
+        Scenario('history:list', 'admin', get('/api/employment-history/'), 200),
+        Scenario('verification-records:detail', 'admin', get(f'/api/verification-records/{employee.employee_id}/'), 200),
+    ]
+    # The same list under each role exercises scoping and the permission classes
+    for role in ROLES[1:]:
+        scenarios.append(Scenario(f'permissions:employees:list:{role}', role, get('/api/employees/'), 200))
+    scenarios += [
+        Scenario(
+            'permissions:denied-write', 'regular_user',
+            lambda client, iteration: client.patch(f'/api/employees/{own.pk}/', {'role': 'x'}, format='json'),
+            403,
+        ),
+        Scenario(
+            'permissions:other-company-write', 'company_manager',
+            lambda client, iteration: client.patch(f'/api/employees/{other.pk}/', {'role': 'x'}, format='json'),
+            404,
+        ),
+        Scenario('bulk_upload', 'admin', upload, 200),
+    ]
+    return scenarios
+
+
+def measure(client, scenario, iterations, warmup):
+    for iteration in range(warmup):
+        scenario.send(client, iteration)
+
+    timings, queries, failures = [], [], 0
+    for iteration in range(warmup, warmup + iterations):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = scenario.send(client, iteration)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+        failures += response.status_code != scenario.status
+
+    tracemalloc.start()
+    try:
+        scenario.send(client, warmup + iterations)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'name': scenario.name,
+        'role': scenario.role,
+        'iterations': iterations,
+        'failures': failures,
+        'latency_ms': {
+            'mean': round(statistics.fmean(timings), 3),
+            'min': round(timings[0], 3),
+            'max': round(timings[-1], 3),
+            **{f'p{percent}': round(percentile(timings, percent), 3) for percent in PERCENTILES},
+        },
+        'queries': {'median': statistics.median(queries), 'max': max(queries)},
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(iterations=30, warmup=3, only=None, upload_rows=1000, response_cache=False, progress=None):
+    """
+    Run the scenarios whose name starts with one of `only` (all by default)
+    and return the report.
+    """
+    progress = progress or (lambda result: None)
+    company = Company.objects.order_by('-employee_count', 'pk').first()
+    clients = benchmark_users(company)
+
+    results = []
+    overrides = {} if response_cache else {'RESPONSE_CACHE_TTL': 0}
+    # The permission scenarios would otherwise log a warning per request
+    request_logger = logging.getLogger('django.request')
+    level = request_logger.level
+    request_logger.setLevel(logging.ERROR)
+    try:
+        scenarios = build_scenarios(company, upload_rows)
+        if only:
+            scenarios = [scenario for scenario in scenarios if scenario.name.startswith(tuple(only))]
+        with override_settings(**overrides):
+            for scenario in scenarios:
+                result = measure(clients[scenario.role], scenario, iterations, warmup)
+                results.append(result)
+                progress(result)
+    finally:
+        request_logger.setLevel(level)
+        delete_fixtures()
+
+    return {
+        'created_at': timezone.now().isoformat(),
+        'git_commit': git_commit(),
+        'environment': {
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'dataset': {
+            'companies': Company.objects.count(),
+            'employees': Employee.objects.count(),
+            'employment_history': EmploymentHistory.objects.count(),
+            'audit_logs': AuditLog.objects.count(),
+        },
+        'config': {
+            'iterations': iterations,
+            'warmup': warmup,
+            'upload_rows': upload_rows,
+            'response_cache': response_cache,
+        },
+        'process_peak_memory_mb': peak_memory_mb(),
+        'scenarios': results,
+    }
+
+
+def compare_reports(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """
+    Return one row per scenario present in both reports with the relative
+    change of p50/p95 latency and the change in queries per request, and
+    whether it counts as a regression (slower p95 beyond `threshold`, or
+    more queries).
+    """
+    previous = {result['name']: result for result in baseline['scenarios']}
+    rows = []
+    for result in current['scenarios']:
+        before = previous.get(result['name'])
+        if before is None:
+            continue
+        change = {
+            f'p{percent}': (
+                result['latency_ms'][f'p{percent}'] / before['latency_ms'][f'p{percent}'] - 1
+                if before['latency_ms'][f'p{percent}'] else 0.0
+            )
+            for percent in (50, 95)
+        }
+        slower = result['latency_ms']['p95'] - before['latency_ms']['p95']
+        queries = result['queries']['median'] - before['queries']['median']
+        rows.append({
+            'name': result['name'],
+            'p50_change': round(change['p50'], 3),
+            'p95_change': round(change['p95'], 3),
+            'queries_change': queries,
+            'regression': (change['p95'] > threshold and slower > NOISE_MS) or queries > 0,
+        })
+    return rows
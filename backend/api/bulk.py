@@ -0,0 +1,89 @@
+"""
+Set-based employee updates and deletes.
+
+Updates run as one `UPDATE` statement, deletes as a queryset `delete()`,
+and both keep the side effects that `api.signals` maintains for single-row
+saves in step, in aggregate: employment history, verification records,
+`Company.employee_count` and the dashboard counters.
+"""
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .caching import invalidate_models
+from .dashboard import adjust_counters
+from .fuzzy import remove_names
+from .models import Company, Employee, EmploymentHistory, VerificationRecord
+from .records import refresh_records
+
+# Fields a bulk update may change
+BULK_UPDATE_FIELDS = ('company', 'department', 'role', 'start_date', 'end_date', 'duties')
+
+
+def bulk_update_employees(queryset, changes):
+    """
+    Apply `changes` (validated field values) to every employee in
+    `queryset`. Returns `(matched, updated)`; rows that already hold the new
+    values are left untouched.
+    """
+    with transaction.atomic():
+        matched = queryset.count()
+        # NOT (a = x AND b = y): rows where at least one value differs
+        changing = queryset.exclude(**changes)
+        before = list(
+            changing.select_for_update()
+            .select_related(None)
+            .only('id', 'employee_id', 'company_id', 'department', 'role', 'start_date', 'end_date', 'duties')
+        )
+        if not before:
+            return matched, 0
+
+        was_active = sum(employee.is_active for employee in before)
+        companies = {employee.company_id for employee in before}
+        changing.update(**changes, updated_at=timezone.now())
+
+        # History rows reflect the new position of each changed employee
+        for employee in before:
+            for field, value in changes.items():
+                setattr(employee, field, value)
+        if set(changes) & {'company', 'department', 'role', 'start_date', 'end_date'}:
+            EmploymentHistory.objects.record(before)
+        refresh_records(employee.pk for employee in before)
+
+        if 'company' in changes:
+            companies.add(changes['company'].pk)
+            Company.objects.refresh_employee_counts(companies)
+        now_active = sum(employee.is_active for employee in before)
+        adjust_counters(active_employees=now_active - was_active)
+        invalidate_models('employee', 'employmenthistory', 'company')
+    return matched, len(before)
+
+
+def bulk_delete_employees(queryset):
+    """Delete every employee in `queryset`; returns the number deleted."""
+    with transaction.atomic():
+        per_company = list(
+            queryset.select_related(None).order_by().values('company_id').annotate(
+                total=Count('id'), active=Count('id', filter=Q(end_date__isnull=True)),
+            )
+        )
+        if not per_company:
+            return 0
+
+        EmploymentHistory.objects.filter(employee_id__in=queryset.values('pk')).delete()
+        VerificationRecord.objects.filter(employee_id__in=queryset.values('pk')).delete()
+        # Only evaluated when the name index is loaded in this process
+        remove_names('employee', queryset.values_list('pk', flat=True))
+        # The post_delete handler leaves deletes from a marked queryset to
+        # the aggregate bookkeeping below
+        queryset = queryset.select_related(None).order_by()
+        queryset.aggregate_bookkeeping = True
+        deleted = queryset.delete()[1].get(Employee._meta.label, 0)
+
+        Company.objects.refresh_employee_counts([row['company_id'] for row in per_company])
+        adjust_counters(
+            employees=-sum(row['total'] for row in per_company),
+            active_employees=-sum(row['active'] for row in per_company),
+        )
+        invalidate_models('employee', 'employmenthistory', 'company')
+    return deleted
@@ -0,0 +1,82 @@
+"""
+Response caching for read-heavy endpoints.
+
+Cached responses are keyed by the endpoint, the normalized query parameters,
+the caller's access scope (role and company) and the current version of every
+model the response is built from. Writes call `invalidate_models()`, which
+bumps the version of each model they touch with a single `incr` once the
+transaction commits: every response built from the old data stops being
+looked up, without scanning or deleting keys, and expires after
+`RESPONSE_CACHE_TTL` seconds.
+
+The cache is Django's default cache (see `CACHES`). With several worker
+processes use a shared backend (file-based or Redis) so that a write in one
+worker invalidates the responses cached by the others; with the per-process
+'locmem' default, other workers serve stale responses for up to
+`RESPONSE_CACHE_TTL`, which therefore defaults to a few seconds there.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'cache-version:{}'
+RESPONSE_KEY = 'response:{}'
+
+
+def initial_version():
+    # Start from the clock rather than 1, so a version key that was evicted
+    # never restarts at a value that responses still in the cache were built with
+    return time.time_ns()
+
+
+def get_versions(models):
+    """Return the current cache version of each model label in `models`."""
+    keys = [VERSION_KEY.format(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            version = initial_version()
+            versions[key] = version if cache.add(key, version, timeout=None) else cache.get(key, version)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*models):
+    for model in models:
+        key = VERSION_KEY.format(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, initial_version(), timeout=None)
+
+
+def invalidate_models(*models):
+    """
+    Bump the cache version of the given model labels (e.g. `'employee'`) once
+    the current transaction commits.
+    """
+    transaction.on_commit(lambda: bump_versions(*models))
+
+
+def response_cache_key(request, scope, models):
+    """
+    Build the cache key for a GET `request` made with the given access
+    `scope`, from the path, the sorted query parameters and the versions of
+    `models`.
+    """
+    params = sorted(
+        (name, value)
+        for name in request.query_params
+        for value in request.query_params.getlist(name)
+    )
+    parts = [request.path, urlencode(params), *map(str, scope), *map(str, get_versions(models))]
+    digest = hashlib.sha1('\n'.join(parts).encode()).hexdigest()
+    return RESPONSE_KEY.format(digest)
+
+
+def get_response_cache_ttl():
+    """Seconds cached responses are kept for; 0 disables response caching."""
+    return getattr(settings, 'RESPONSE_CACHE_TTL', 300)
@@ -0,0 +1,91 @@
+"""
+Dashboard metrics.
+
+Totals are read from `MetricCounter` rows that are adjusted incrementally
+whenever companies and employees are created, updated, deleted or bulk
+uploaded, instead of counting the tables on every request. The full dashboard
+payload is additionally cached for `DASHBOARD_CACHE_TTL` seconds and dropped by
+`invalidate_dashboard()` whenever the underlying data changes.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .models import AuditLog, Company, Employee, MetricCounter
+from .serializers import AuditLogSerializer, CompanySerializer, EmployeeSerializer
+
+CACHE_KEY = 'dashboard:payload'
+COUNTER_NAMES = ('companies', 'employees', 'active_employees')
+
+
+def invalidate_dashboard():
+    """Drop the cached dashboard payload so the next request rebuilds it."""
+    cache.delete(CACHE_KEY)
+
+
+def adjust_counters(**deltas):
+    """
+    Apply `name=delta` adjustments to the dashboard counters with atomic
+    `F()` updates, and invalidate the cached payload once the transaction
+    commits.
+    """
+    for name, delta in deltas.items():
+        if delta:
+            MetricCounter.objects.filter(name=name).update(value=F('value') + delta)
+    transaction.on_commit(invalidate_dashboard)
+
+
+def rebuild_counters():
+    """Recount every dashboard counter from the source tables."""
+    values = {
+        'companies': Company.objects.count(),
+        'employees': Employee.objects.count(),
+        'active_employees': Employee.objects.filter(end_date__isnull=True).count(),
+    }
+    for name, value in values.items():
+        MetricCounter.objects.update_or_create(name=name, defaults={'value': value})
+    invalidate_dashboard()
+    return values
+
+
+def get_counters():
+    counters = dict(
+        MetricCounter.objects.filter(name__in=COUNTER_NAMES).values_list('name', 'value')
+    )
+    if len(counters) < len(COUNTER_NAMES):
+        # First use, or counters were reset: seed them with a full count
+        counters = rebuild_counters()
+    return counters
+
+
+def build_dashboard():
+    counters = get_counters()
+    top_companies = Company.objects.order_by('-employee_count')[:5]
+    recent_employees = EmployeeSerializer.setup_eager_loading(
+        Employee.objects.order_by('-created_at')
+    )[:5]
+    recent_activities = AuditLogSerializer.setup_eager_loading(
+        AuditLog.objects.order_by('-timestamp')
+    )[:10]
+
+    return {
+        'metrics': {
+            'total_companies': counters['companies'],
+            'total_employees': counters['employees'],
+            'active_employees': counters['active_employees'],
+            'inactive_employees': counters['employees'] - counters['active_employees'],
+        },
+        'top_companies': CompanySerializer(top_companies, many=True).data,
+        'recent_employees': EmployeeSerializer(recent_employees, many=True).data,
+        'recent_activities': AuditLogSerializer(recent_activities, many=True).data,
+    }
+
+
+def get_dashboard():
+    """Return the dashboard payload, from the cache when available."""
+    data = cache.get(CACHE_KEY)
+    if data is None:
+        data = build_dashboard()
+        cache.set(CACHE_KEY, data, getattr(settings, 'DASHBOARD_CACHE_TTL', 60))
+    return data
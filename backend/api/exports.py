@@ -0,0 +1,101 @@
+"""
+Streaming CSV and Excel exports.
+
+Rows are read with `values_list(...).iterator()` and written straight to the
+output, so no model instances or serializers are created and memory stays flat
+regardless of the number of rows. Columns follow the upload templates
+(`scripts/generate_*_template.py`), so an export can be fed back into
+`bulk_upload`.
+"""
+import csv
+import tempfile
+from datetime import date
+
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl import Workbook
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (column, ORM lookup) in template order
+EMPLOYEE_EXPORT_COLUMNS = (
+    ('name', 'name'),
+    ('employee_id', 'employee_id'),
+    ('company', 'company__name'),
+    ('department', 'department'),
+    ('role', 'role'),
+    ('start_date', 'start_date'),
+    ('end_date', 'end_date'),
+    ('duties', 'duties'),
+)
+COMPANY_EXPORT_COLUMNS = (
+    ('name', 'name'),
+    ('registration_date', 'registration_date'),
+    ('registration_number', 'registration_number'),
+    ('address', 'address'),
+    ('contact_person', 'contact_person'),
+    ('departments', 'departments'),
+    ('employee_count', 'employee_count'),
+    ('phone', 'phone'),
+    ('email', 'email'),
+)
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def export_value(value):
+    """Format a value the way the importers read it back."""
+    if value is None:
+        return ''
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, list):
+        return ','.join(value)
+    return value
+
+
+def iter_export_rows(queryset, columns):
+    yield [column for column, _ in columns]
+    lookups = [lookup for _, lookup in columns]
+    # values_list joins what the lookups need; eager loading would only add columns
+    rows = queryset.select_related(None).values_list(*lookups).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for row in rows:
+        yield [export_value(value) for value in row]
+
+
+class Echo:
+    """A file-like object whose `write` returns the value, for csv.writer streaming."""
+
+    def write(self, value):
+        return value
+
+
+def csv_response(queryset, columns, filename):
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in iter_export_rows(queryset, columns)),
+        content_type='text/csv',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def xlsx_response(queryset, columns, filename, sheet_title):
+    # Write-only workbooks keep rows out of memory but can only be saved whole,
+    # so the file is built on disk and then streamed
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_title)
+    for row in iter_export_rows(queryset, columns):
+        sheet.append(row)
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(
+        output, as_attachment=True, filename=f'{filename}.xlsx', content_type=XLSX_CONTENT_TYPE
+    )
+
+
+def export_response(queryset, columns, file_type, filename, sheet_title):
+    if file_type == 'xlsx':
+        return xlsx_response(queryset, columns, filename, sheet_title)
+    return csv_response(queryset, columns, filename)
@@ -0,0 +1,266 @@
+"""
+In-process fuzzy name matching.
+
+`NameIndex` keeps a trigram inverted index over normalized names
+(lowercased, punctuation dropped, whitespace collapsed) and returns the top-k
+most similar names with their Jaccard similarity. Scoring is vectorized with
+numpy, so lookups take well under a millisecond for 100k+ names.
+
+`get_name_index('company')` and `get_name_index('employee')` return
+process-wide indexes that are built from the database on first use, updated
+on commit by the model signals and bulk write paths, and rebuilt in the
+background after `NAME_INDEX_MAX_AGE` seconds to pick up writes made by other
+processes.
+"""
+import logging
+import math
+import re
+import threading
+import time
+from array import array
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Case, FloatField, Value, When
+
+from .models import Company, Employee
+
+logger = logging.getLogger(__name__)
+
+# Similarity at which an unambiguous match may be resolved automatically
+AUTO_MATCH_SCORE = 0.8
+
+# Candidates considered per fuzzy search term
+FUZZY_SEARCH_LIMIT = 200
+
+NON_ALPHANUMERIC = re.compile(r'[^\w]+')
+
+
+def normalize_name(name):
+    return ' '.join(NON_ALPHANUMERIC.sub(' ', str(name).lower()).split())
+
+
+def trigrams(normalized):
+    padded = f' {normalized} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def concatenate(postings):
+    # Copies, so no view on the (resizable) arrays outlives the index lock
+    return np.concatenate([np.frombuffer(slots, dtype=np.intc) for slots in postings])
+
+
+class NameIndex:
+    """
+    Names are stored in numbered slots and each trigram maps to the array of
+    slots containing it. Searches count shared trigrams with numpy instead of
+    looping over candidates in Python. Replaced and removed names leave a dead
+    slot (size 0) behind until the next rebuild.
+    """
+
+    def __init__(self, names=()):
+        self.lock = threading.RLock()
+        self.entries = {}
+        self.keys = []
+        self.sizes = array('i')
+        self.postings = defaultdict(lambda: array('i'))
+        self.built_at = time.monotonic()
+        for key, name in names:
+            self.add(key, name)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, key, name):
+        """Index `name` under `key`, replacing any previous name for it."""
+        normalized = normalize_name(name)
+        grams = trigrams(normalized)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] == normalized:
+                return
+            self.remove(key)
+            if not normalized:
+                return
+            slot = len(self.keys)
+            self.entries[key] = (slot, normalized)
+            self.keys.append(key)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.postings[gram].append(slot)
+
+    def remove(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                # The slot stays in its postings; a zero size marks it dead
+                self.keys[entry[0]] = None
+                self.sizes[entry[0]] = 0
+
+    def search(self, name, limit=5, threshold=0.4):
+        """
+        Return up to `limit` `(key, score)` pairs with a Jaccard similarity of
+        at least `threshold`, best first. Exact matches after normalization
+        score 1.0.
+        """
+        query = trigrams(normalize_name(name))
+        if not query:
+            return []
+        with self.lock:
+            postings = sorted((self.postings[gram] for gram in query if gram in self.postings), key=len)
+
+            # A name scoring >= threshold shares at least `needed` trigrams
+            # with the query, so it occurs in one of the rarest `rare`
+            # postings: only those are scanned for candidates
+            needed = math.ceil(threshold * len(query))
+            rare = len(postings) - needed + 1
+            if rare <= 0:
+                return []
+            counts = np.bincount(concatenate(postings))
+            hits = concatenate(postings[:rare])
+            candidates = np.unique(hits[counts[hits] >= needed])
+            shared = counts[candidates]
+
+            sizes = np.frombuffer(self.sizes, dtype=np.intc)[candidates]
+            alive = sizes > 0
+            candidates, shared, sizes = candidates[alive], shared[alive], sizes[alive]
+            scores = shared / (len(query) + sizes - shared)
+            matches = np.flatnonzero(scores >= threshold)
+            if len(matches) > limit:
+                matches = matches[np.argpartition(-scores[matches], limit - 1)[:limit]]
+            results = [
+                (self.keys[candidates[match]], round(float(scores[match]), 4))
+                for match in matches
+            ]
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results
+
+    def best_match(self, name, threshold=AUTO_MATCH_SCORE):
+        """
+        Return the key of the single best match above `threshold`, or None.
+        Ties are ambiguous, except between exact matches, where the lowest
+        key (the oldest row) wins.
+        """
+        matches = self.search(name, limit=2, threshold=threshold)
+        if not matches:
+            return None
+        if len(matches) > 1 and matches[0][1] == matches[1][1] and matches[0][1] < 1:
+            return None
+        return matches[0][0]
+
+
+INDEXED_MODELS = {
+    'company': Company,
+    'employee': Employee,
+}
+
+_indexes = {}
+_building = set()
+# Changes committed while an index is being built, replayed onto it afterwards
+_pending = defaultdict(list)
+_registry_lock = threading.Lock()
+
+
+def apply_changes(index, changes):
+    for key, name in changes:
+        if name is None:
+            index.remove(key)
+        else:
+            index.add(key, name)
+
+
+def build_index(kind):
+    """Load a fresh index for `kind` from the database and install it."""
+    try:
+        names = INDEXED_MODELS[kind].objects.values_list('id', 'name').iterator(chunk_size=10000)
+        index = NameIndex(names)
+        with _registry_lock:
+            apply_changes(index, _pending.pop(kind, ()))
+            _indexes[kind] = index
+        return index
+    finally:
+        with _registry_lock:
+            _building.discard(kind)
+            _pending.pop(kind, None)
+
+
+def rebuild_in_background(kind):
+    def rebuild():
+        close_old_connections()
+        try:
+            build_index(kind)
+        except Exception:
+            logger.exception('Rebuilding the %s name index failed', kind)
+        finally:
+            connection.close()
+
+    with _registry_lock:
+        if kind in _building:
+            return
+        _building.add(kind)
+    threading.Thread(target=rebuild, name=f'name-index-{kind}', daemon=True).start()
+
+
+def get_name_index(kind):
+    """Return the process-wide index for `kind` ('company' or 'employee')."""
+    index = _indexes.get(kind)
+    if index is None:
+        with _registry_lock:
+            _building.add(kind)
+        index = build_index(kind)
+    elif time.monotonic() - index.built_at > getattr(settings, 'NAME_INDEX_MAX_AGE', 600):
+        # Serve the current index while a fresh one is built
+        rebuild_in_background(kind)
+    return index
+
+
+def record_changes(kind, changes):
+    """
+    Apply `(key, name)` changes (a None name removes the key) to the index
+    once the current transaction commits. Nothing is done while the index is
+    not loaded in this process; it will read the database when it is.
+    """
+    if kind not in _indexes and kind not in _building:
+        return
+    changes = list(changes)
+
+    def apply():
+        with _registry_lock:
+            index = _indexes.get(kind)
+            if kind in _building:
+                _pending[kind].extend(changes)
+        if index is not None:
+            apply_changes(index, changes)
+    transaction.on_commit(apply)
+
+
+def update_names(kind, names):
+    """Index `(key, name)` pairs once the current transaction commits."""
+    # Objects saved without returning their primary key cannot be indexed
+    record_changes(kind, ((key, name) for key, name in names if key is not None))
+
+
+def remove_names(kind, keys):
+    """Drop `keys` from the index once the current transaction commits."""
+    record_changes(kind, ((key, None) for key in keys))
+
+
+def fuzzy_filter(queryset, name=None, company=None, limit=FUZZY_SEARCH_LIMIT):
+    """
+    Restrict employees to the `limit` best matches for `name` and/or
+    `company`, most similar names first (annotated as `name_score`).
+    """
+    if company:
+        company_ids = [key for key, _ in get_name_index('company').search(company, limit=limit)]
+        queryset = queryset.filter(company_id__in=company_ids)
+    if name:
+        matches = get_name_index('employee').search(name, limit=limit)
+        queryset = queryset.filter(pk__in=[key for key, _ in matches]).annotate(
+            name_score=Case(
+                *(When(pk=key, then=Value(score)) for key, score in matches),
+                default=Value(0.0), output_field=FloatField(),
+            )
+        ).order_by('-name_score', *queryset.model._meta.ordering)
+    return queryset
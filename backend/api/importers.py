@@ -0,0 +1,597 @@
+"""
+Streaming import engine used by the bulk upload endpoints.
+
+Uploads are read incrementally into pandas DataFrames of a fixed number of
+rows. Each chunk is validated and coerced column by column, invalid rows are
+collected into a per-row error report, and the remaining rows are written with
+`bulk_create`. Memory stays flat regardless of file size and the number of
+queries grows with the number of chunks rather than the number of rows.
+"""
+import re
+import sys
+import time
+from contextlib import nullcontext
+
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import invalidate_models
+from .dashboard import adjust_counters
+from .fuzzy import get_name_index, update_names
+from .models import Company, Employee, EmploymentHistory, ImportJob
+from .records import refresh_company_records, refresh_records
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+CHUNK_SIZE = 2000
+SUPPORTED_EXTENSIONS = ('.csv', '.xls', '.xlsx')
+
+# Cap the number of row errors returned to the client; all failures are counted
+MAX_REPORTED_ERRORS = 1000
+
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+class ImportValidationError(Exception):
+    """Raised when an uploaded file cannot be imported at all."""
+
+
+def peak_memory_mb():
+    """Return the peak resident memory of this process in megabytes."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(peak / divisor, 1)
+
+
+def iter_csv_frames(file, chunk_size):
+    yield from pd.read_csv(
+        file, chunksize=chunk_size, dtype=str, keep_default_na=False,
+        encoding='utf-8-sig', skipinitialspace=True,
+    )
+
+
+def iter_excel_frames(file, chunk_size):
+    if file.name.endswith('.xls'):
+        # openpyxl cannot read legacy .xls workbooks, so these are read whole
+        df = pd.read_excel(file, dtype=object)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+        return
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(cell).strip() if cell is not None else '' for cell in header]
+
+        offset, records = 0, []
+        for values in rows:
+            if all(value is None for value in values):
+                continue
+            records.append(values)
+            if len(records) >= chunk_size:
+                yield excel_frame(records, header, offset)
+                offset, records = offset + len(records), []
+        if records:
+            yield excel_frame(records, header, offset)
+    finally:
+        workbook.close()
+
+
+def excel_frame(records, header, offset):
+    # Keep cell values as read: with inference, a numeric column with blanks
+    # becomes float64 and employee_id 1002 would be imported as "1002.0"
+    return pd.DataFrame(
+        records, columns=header, index=range(offset, offset + len(records)), dtype=object
+    )
+
+
+def iter_upload_frames(file, chunk_size=CHUNK_SIZE):
+    """
+    Yield an uploaded CSV or Excel file as DataFrames of at most `chunk_size`
+    rows. Frame indexes are 0-based data row positions across the whole file.
+    """
+    if file.name.endswith('.csv'):
+        return iter_csv_frames(file, chunk_size)
+    if file.name.endswith(('.xls', '.xlsx')):
+        return iter_excel_frames(file, chunk_size)
+    raise ImportValidationError('Unsupported file format')
+
+
+def count_upload_rows(file):
+    """
+    Return the number of data rows in an upload without parsing it, or `None`
+    if it cannot be determined cheaply. Used to estimate progress.
+    """
+    try:
+        if file.name.endswith('.csv'):
+            lines = sum(block.count(b'\n') for block in iter(lambda: file.read(1024 * 1024), b''))
+            return max(lines - 1, 0)
+        if file.name.endswith('.xlsx'):
+            from openpyxl import load_workbook
+            workbook = load_workbook(file, read_only=True)
+            try:
+                max_row = workbook.active.max_row
+                return max(max_row - 1, 0) if max_row else None
+            finally:
+                workbook.close()
+    finally:
+        file.seek(0)
+    return None
+
+
+def text_column(frame, column):
+    """Return `column` as stripped strings, with blanks and missing cells as None."""
+    result = pd.Series(None, index=frame.index, dtype=object)
+    if column not in frame:
+        return result
+    values = frame[column]
+    present = values.notna()
+    result[present] = values[present].astype(str).str.strip()
+    result[result.eq('') | result.isna()] = None
+    return result
+
+
+def date_column(values):
+    """Parse a text column into dates. Returns `(dates, invalid_mask)`."""
+    parsed = pd.to_datetime(values, errors='coerce', format='ISO8601')
+    invalid = values.notna() & parsed.isna()
+    dates = parsed.dt.date.astype(object).where(parsed.notna(), None)
+    return dates, invalid
+
+
+class ChunkValidator:
+    """Collects row-level validation failures for one chunk."""
+
+    def __init__(self, frame):
+        self.index = frame.index
+        self.invalid = pd.Series(False, index=frame.index)
+        self.errors = []
+
+    def flag(self, mask, field, message):
+        mask = mask.fillna(False).astype(bool)
+        if not mask.any():
+            return
+        self.invalid |= mask
+        self.errors.extend(
+            # +2 accounts for the header line and 1-based row numbers
+            {'row': int(position) + 2, 'field': field, 'message': message}
+            for position in self.index[mask]
+        )
+
+    def require(self, values, field):
+        self.flag(values.isna(), field, 'This field is required.')
+
+
+class BaseImporter:
+    """
+    Imports model instances from an uploaded file in fixed-size batches.
+
+    Subclasses set `model`, `natural_key`, `update_fields` and
+    `required_columns`, and implement `prepare` (vectorized validation and
+    coercion of a chunk, returning a dict of column Series) and `build_objects`.
+
+    In `upsert` mode rows whose natural key already exists are updated in place
+    instead of being rejected.
+
+    With a `company_scope` (a company id, see `get_company_scope`) only rows
+    of that company are written: rows whose natural key belongs to a row of
+    another company (matched on `scope_field`) are reported as errors.
+
+    `fuzzy_companies` lets importers that reference companies by name accept
+    close matches for names not found exactly (see `EmployeeImporter`).
+    """
+    model = None
+    natural_key = None
+    scope_field = None
+    update_fields = ()
+    required_columns = ()
+
+    def __init__(self, chunk_size=CHUNK_SIZE, mode=ImportJob.MODE_INSERT, company_scope=None,
+                 fuzzy_companies=False):
+        self.chunk_size = chunk_size
+        self.mode = mode
+        self.company_scope = company_scope
+        self.fuzzy_companies = fuzzy_companies
+        self.seen_keys = set()
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.rows_failed = 0
+        self.errors = []
+
+    def run(self, file, progress=None, atomic=True):
+        """
+        Import every valid row of `file` and return import statistics.
+
+        With `atomic=True` the whole file is imported in one transaction. With
+        `atomic=False` each chunk commits on its own, so progress reported
+        through the `progress(rows_processed, rows_failed)` callback is visible
+        to other connections while the import runs.
+        """
+        started = time.perf_counter()
+        created = 0
+
+        with transaction.atomic() if atomic else nullcontext():
+            for position, frame in enumerate(iter_upload_frames(file, self.chunk_size)):
+                if position == 0:
+                    self.check_columns(frame)
+                with transaction.atomic():
+                    created += self.import_chunk(frame)
+                if progress is not None:
+                    progress(created, self.rows_failed)
+
+        elapsed = time.perf_counter() - started
+        processed = created + self.rows_failed
+        return {
+            'rows': created,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'rows_failed': self.rows_failed,
+            'errors': self.errors,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(processed / elapsed, 1) if elapsed else None,
+            'peak_memory_mb': peak_memory_mb(),
+        }
+
+    def check_columns(self, frame):
+        missing = [column for column in self.required_columns if column not in frame.columns]
+        if missing:
+            raise ImportValidationError(f"Missing required columns: {', '.join(missing)}")
+
+    def import_chunk(self, frame):
+        validator = ChunkValidator(frame)
+        columns = self.prepare(frame, validator)
+        self.check_duplicates(columns[self.natural_key], validator)
+
+        self.rows_failed += int(validator.invalid.sum())
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            validator.errors.sort(key=lambda error: error['row'])
+            self.errors.extend(validator.errors[:MAX_REPORTED_ERRORS - len(self.errors)])
+
+        valid = ~validator.invalid
+        objects = self.build_objects({
+            name: values[valid].tolist() for name, values in columns.items()
+        })
+        if self.mode == ImportJob.MODE_UPSERT:
+            inserted, updated = self.upsert(objects)
+        else:
+            inserted, updated = self.model.objects.bulk_create(objects, batch_size=self.chunk_size), []
+            self.inserted += len(inserted)
+        self.after_write(inserted, updated)
+        return len(objects)
+
+    def after_write(self, inserted, updated):
+        """Hook called with the objects created and updated for each chunk."""
+
+    def upsert(self, objects):
+        """
+        Insert new objects and update existing ones matched by natural key,
+        using one lookup query, one `bulk_create` and one `bulk_update` per chunk.
+        """
+        keys = [getattr(obj, self.natural_key) for obj in objects]
+        existing = (
+            self.get_queryset().only(self.natural_key, *self.update_fields)
+            .in_bulk(keys, field_name=self.natural_key)
+        )
+
+        new, changed = [], []
+        now = timezone.now()
+        for obj in objects:
+            current = existing.get(getattr(obj, self.natural_key))
+            if current is None:
+                new.append(obj)
+            elif any(getattr(current, field) != getattr(obj, field) for field in self.update_fields):
+                for field in self.update_fields:
+                    setattr(current, field, getattr(obj, field))
+                # bulk_update does not apply auto_now
+                current.updated_at = now
+                changed.append(current)
+            else:
+                self.unchanged += 1
+
+        self.model.objects.bulk_create(new, batch_size=self.chunk_size)
+        self.model.objects.bulk_update(
+            changed, [*self.update_fields, 'updated_at'], batch_size=self.chunk_size
+        )
+        self.inserted += len(new)
+        self.updated += len(changed)
+        return new, changed
+
+    def check_duplicates(self, keys, validator):
+        """
+        Flag natural keys repeated within the file, or already in the database
+        unless upserting.
+        """
+        present = keys.notna()
+        repeated = present & (keys.duplicated(keep='first') | keys.isin(self.seen_keys))
+        validator.flag(repeated, self.natural_key, 'Duplicate value in file.')
+
+        candidates = keys[present & ~repeated]
+        self.seen_keys.update(candidates.tolist())
+        existing = self.model.objects.filter(**{f'{self.natural_key}__in': candidates.tolist()})
+        if self.mode == ImportJob.MODE_UPSERT:
+            if self.company_scope is None:
+                return
+            # Upserts may only update rows within the caller's company
+            existing = existing.exclude(**{self.scope_field: self.company_scope})
+            message = 'Belongs to another company.'
+        else:
+            message = 'Already exists.'
+        existing = set(existing.values_list(self.natural_key, flat=True))
+        validator.flag(keys.isin(existing) & ~repeated, self.natural_key, message)
+
+    def get_queryset(self):
+        queryset = self.model.objects.all()
+        if self.company_scope is not None:
+            queryset = queryset.filter(**{self.scope_field: self.company_scope})
+        return queryset
+
+    def prepare(self, frame, validator):
+        raise NotImplementedError
+
+    def build_objects(self, columns):
+        raise NotImplementedError
+
+
+class CompanyImporter(BaseImporter):
+    """Imports companies from an uploaded file."""
+    model = Company
+    natural_key = 'registration_number'
+    scope_field = 'pk'
+    # employee_count is derived from Employee rows, so any column for it is ignored
+    update_fields = (
+        'name', 'registration_date', 'address', 'contact_person', 'departments',
+        'phone', 'email',
+    )
+    required_columns = (
+        'name', 'registration_date', 'registration_number', 'address',
+        'contact_person', 'departments', 'phone', 'email',
+    )
+
+    def prepare(self, frame, validator):
+        columns = {
+            field: text_column(frame, field)
+            for field in ('name', 'registration_number', 'address', 'contact_person', 'phone', 'email')
+        }
+        for field, values in columns.items():
+            validator.require(values, field)
+        validator.flag(
+            columns['email'].notna() & ~columns['email'].fillna('').str.match(EMAIL_PATTERN),
+            'email', 'Enter a valid email address.'
+        )
+
+        registration_date = text_column(frame, 'registration_date')
+        validator.require(registration_date, 'registration_date')
+        columns['registration_date'], invalid = date_column(registration_date)
+        validator.flag(invalid, 'registration_date', 'Enter a valid date.')
+
+        departments = text_column(frame, 'departments').fillna('').str.split(',')
+        columns['departments'] = departments.map(
+            lambda parts: [part.strip() for part in parts if part.strip()]
+        )
+        return columns
+
+    def after_write(self, inserted, updated):
+        adjust_counters(companies=len(inserted))
+        refresh_company_records(
+            company.pk for company in updated
+            if company.name != getattr(company, '_loaded_name', None)
+        )
+        invalidate_models('company')
+        update_names('company', [(company.pk, company.name) for company in inserted + updated])
+
+    def build_objects(self, columns):
+        return [
+            Company(
+                name=name,
+                registration_number=registration_number,
+                registration_date=registration_date,
+                address=address,
+                contact_person=contact_person,
+                departments=departments,
+                phone=phone,
+                email=email,
+            )
+            for (name, registration_number, registration_date, address, contact_person,
+                 departments, phone, email) in zip(
+                columns['name'], columns['registration_number'], columns['registration_date'],
+                columns['address'], columns['contact_person'], columns['departments'],
+                columns['phone'], columns['email'],
+            )
+        ]
+
+
+class EmployeeImporter(BaseImporter):
+    """
+    Imports employees from an uploaded file.
+
+    Company references are resolved with one query per chunk for the names or
+    ids not seen before, and cached for the rest of the file. Names without an
+    exact match are rejected unless `fuzzy_companies` is set; they then fall
+    back to the fuzzy company index, so "Tech Solutions Inc." finds "Tech
+    Solutions Inc" as long as the match is close and unambiguous. Every row
+    resolved that way is listed in the result's `fuzzy_companies`.
+    """
+    model = Employee
+    natural_key = 'employee_id'
+    scope_field = 'company_id'
+    update_fields = (
+        'name', 'company_id', 'department', 'role', 'start_date', 'end_date', 'duties',
+    )
+    required_columns = ('name', 'employee_id', 'department', 'role', 'start_date')
+
+    def __init__(self, chunk_size=CHUNK_SIZE, mode=ImportJob.MODE_INSERT, company_scope=None,
+                 fuzzy_companies=False):
+        super().__init__(chunk_size, mode, company_scope, fuzzy_companies)
+        self.company_ids = {}
+        self.company_names = {}
+        # Names resolved through the fuzzy index, mapped to the matched company's name
+        self.fuzzy_matches = {}
+        self.fuzzy_rows = []
+
+    def run(self, file, progress=None, atomic=True):
+        stats = super().run(file, progress, atomic)
+        stats['fuzzy_companies'] = self.fuzzy_rows
+        return stats
+
+    def check_columns(self, frame):
+        super().check_columns(frame)
+        if 'company' not in frame.columns and 'company_id' not in frame.columns:
+            raise ImportValidationError('Missing required columns: company or company_id')
+
+    def prepare(self, frame, validator):
+        columns = {
+            field: text_column(frame, field)
+            for field in ('name', 'employee_id', 'department', 'role')
+        }
+        for field, values in columns.items():
+            validator.require(values, field)
+        columns['duties'] = text_column(frame, 'duties').fillna('')
+
+        raw_start_date = text_column(frame, 'start_date')
+        validator.require(raw_start_date, 'start_date')
+        start_date, invalid = date_column(raw_start_date)
+        validator.flag(invalid, 'start_date', 'Enter a valid date.')
+        end_date, invalid = date_column(text_column(frame, 'end_date'))
+        validator.flag(invalid, 'end_date', 'Enter a valid date.')
+        both = start_date.notna() & end_date.notna()
+        validator.flag(
+            both & (end_date.where(both, pd.NaT) < start_date.where(both, pd.NaT)),
+            'end_date', 'End date cannot be before start date.'
+        )
+        columns['start_date'], columns['end_date'] = start_date, end_date
+
+        columns['company_id'] = self.resolve_companies(frame, validator)
+        return columns
+
+    def resolve_companies(self, frame, validator):
+        """Map each row's company reference to a company id."""
+        by_id = text_column(frame, 'company_id')
+        by_name = text_column(frame, 'company').where(by_id.isna(), None)
+        validator.flag(by_id.isna() & by_name.isna(), 'company', 'This field is required.')
+
+        ids = set(by_id.dropna()) - self.company_ids.keys()
+        if ids:
+            numeric = [int(value) for value in ids if value.isdigit()]
+            found = set(Company.objects.filter(id__in=numeric).values_list('id', flat=True))
+            for value in ids:
+                self.company_ids[value] = int(value) if value.isdigit() and int(value) in found else None
+
+        names = set(by_name.dropna()) - self.company_names.keys()
+        if names:
+            for value in names:
+                self.company_names[value] = None
+            # Company names are not unique; prefer the oldest company with the name
+            for company_id, name in (
+                Company.objects.filter(name__in=names).order_by('-id').values_list('id', 'name')
+            ):
+                self.company_names[name] = company_id
+            unmatched = [name for name in names if self.company_names[name] is None]
+            if unmatched and self.fuzzy_companies:
+                index = get_name_index('company')
+                matches = {name: index.best_match(name) for name in unmatched}
+                matched_names = dict(
+                    Company.objects.filter(id__in={key for key in matches.values() if key is not None})
+                    .values_list('id', 'name')
+                )
+                for name, company_id in matches.items():
+                    if company_id in matched_names:
+                        self.company_names[name] = company_id
+                        self.fuzzy_matches[name] = matched_names[company_id]
+
+        company_ids = by_id.map(self.company_ids).where(by_id.notna(), by_name.map(self.company_names))
+        company_ids = company_ids.astype(object).where(company_ids.notna(), None)
+        if self.fuzzy_matches:
+            self.report_fuzzy_rows(by_name, company_ids)
+        validator.flag(
+            (by_id.notna() | by_name.notna()) & company_ids.isna(),
+            'company', 'Company not found.'
+        )
+        if self.company_scope is not None:
+            validator.flag(
+                company_ids.notna() & company_ids.ne(self.company_scope),
+                'company', 'You can only import employees of your own company.'
+            )
+        return company_ids
+
+    def report_fuzzy_rows(self, by_name, company_ids):
+        for position, name in by_name[by_name.isin(self.fuzzy_matches.keys())].items():
+            if len(self.fuzzy_rows) >= MAX_REPORTED_ERRORS:
+                return
+            self.fuzzy_rows.append({
+                # +2 accounts for the header line and 1-based row numbers
+                'row': int(position) + 2,
+                'company': name,
+                'matched': self.fuzzy_matches[name],
+                'company_id': int(company_ids[position]),
+            })
+
+    def after_write(self, inserted, updated):
+        # bulk_create/bulk_update skip signals, so record history for the chunk here
+        moved = [
+            employee for employee in updated
+            if employee.history_state() != getattr(employee, '_history_state', None)
+        ]
+        recorded = EmploymentHistory.objects.record(inserted + moved, batch_size=self.chunk_size)
+
+        # Recount headcounts of every company that gained or lost employees
+        company_ids = {employee.company_id for employee in inserted + moved}
+        company_ids.update(employee._history_state['company_id'] for employee in moved)
+        if company_ids:
+            Company.objects.refresh_employee_counts(company_ids)
+
+        activated = sum(
+            1 if employee.is_active else -1
+            for employee in moved
+            if (employee._history_state['end_date'] is None) != employee.is_active
+        )
+        adjust_counters(
+            employees=len(inserted),
+            active_employees=sum(employee.is_active for employee in inserted) + activated,
+        )
+        # History rows carry the ids of inserted employees even on backends
+        # that cannot return them from bulk_create
+        refresh_records([
+            *(history.employee_id for history in recorded),
+            *(employee.pk for employee in updated),
+        ])
+        invalidate_models('employee', 'employmenthistory', 'company')
+        update_names('employee', [(employee.pk, employee.name) for employee in inserted + updated])
+
+    def build_objects(self, columns):
+        return [
+            Employee(
+                name=name,
+                employee_id=employee_id,
+                company_id=int(company_id),
+                department=department,
+                role=role,
+                start_date=start_date,
+                end_date=end_date,
+                duties=duties,
+            )
+            for (name, employee_id, company_id, department, role, start_date, end_date,
+                 duties) in zip(
+                columns['name'], columns['employee_id'], columns['company_id'],
+                columns['department'], columns['role'], columns['start_date'],
+                columns['end_date'], columns['duties'],
+            )
+        ]
+
+
+IMPORTERS = {
+    ImportJob.KIND_COMPANY: CompanyImporter,
+    ImportJob.KIND_EMPLOYEE: EmployeeImporter,
+}
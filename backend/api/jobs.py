@@ -0,0 +1,118 @@
+"""
+Local background worker for import jobs.
+
+Jobs are executed on an in-process thread pool, so no external broker is
+needed. Progress is written to the `ImportJob` row after every chunk and can
+be polled through `/api/import-jobs/<id>/`. A job whose rows all failed ends
+as failed, and the uploaded file is deleted once the job finishes either way.
+
+Jobs still pending or running when the server stops are lost with its
+threads; `fail_interrupted_jobs()` marks them failed when the server starts
+again (see `gunicorn.conf.py` and the `fail_interrupted_jobs` command).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .importers import IMPORTERS, count_upload_rows
+from .models import ImportJob
+from .permissions import get_company_scope, get_user_access
+
+logger = logging.getLogger(__name__)
+
+NO_ROWS_ERROR = 'No rows were imported; see the result for the row errors.'
+INTERRUPTED_ERROR = 'The server stopped before the import finished; upload the file again.'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMPORT_JOB_WORKERS', 2),
+                thread_name_prefix='import-job',
+            )
+        return _executor
+
+
+def enqueue_import_job(job):
+    """Schedule `job` to run once the surrounding transaction (if any) commits."""
+    transaction.on_commit(lambda: get_executor().submit(run_import_job, job.pk))
+
+
+def run_import_job(job_id):
+    close_old_connections()
+    try:
+        job = ImportJob.objects.get(pk=job_id)
+        job.status = ImportJob.STATUS_RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+
+        def progress(rows_processed, rows_failed):
+            ImportJob.objects.filter(pk=job_id).update(
+                rows_processed=rows_processed, rows_failed=rows_failed
+            )
+
+        # Scoped by the creator's current profile, as the request would be
+        company_scope = get_company_scope(get_user_access(job.created_by_id))
+        importer = IMPORTERS[job.kind](
+            mode=job.mode, company_scope=company_scope, fuzzy_companies=job.fuzzy_companies,
+        )
+        with job.file.open('rb') as file:
+            total_rows = count_upload_rows(file)
+            if total_rows is not None:
+                ImportJob.objects.filter(pk=job_id).update(total_rows=total_rows)
+            # Commit per chunk so progress is visible to pollers
+            stats = importer.run(file, progress=progress, atomic=False)
+
+        job.refresh_from_db()
+        job.status = ImportJob.STATUS_COMPLETED
+        if stats['rows'] == 0 and stats['errors']:
+            job.status = ImportJob.STATUS_FAILED
+            job.error = NO_ROWS_ERROR
+        job.result = stats
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'result', 'finished_at'])
+    except Exception as e:
+        logger.exception('Import job %s failed', job_id)
+        ImportJob.objects.filter(pk=job_id).update(
+            status=ImportJob.STATUS_FAILED, error=str(e), finished_at=timezone.now()
+        )
+    finally:
+        delete_upload(job_id)
+        connection.close()
+
+
+def delete_upload(job_id):
+    """Delete a job's uploaded file, which is only needed while it runs."""
+    try:
+        job = ImportJob.objects.filter(pk=job_id).only('file').first()
+        if job is not None and job.file:
+            job.file.delete(save=False)
+            ImportJob.objects.filter(pk=job_id).update(file='')
+    except Exception:
+        logger.exception('Could not delete the upload of import job %s', job_id)
+
+
+def fail_interrupted_jobs():
+    """
+    Mark jobs left pending or running by a stopped server as failed and
+    delete their uploads. Returns the number of jobs marked. Only call this
+    while no process is running jobs, i.e. before the server starts its
+    workers.
+    """
+    jobs = ImportJob.objects.filter(
+        status__in=[ImportJob.STATUS_PENDING, ImportJob.STATUS_RUNNING]
+    )
+    for job_id in jobs.values_list('pk', flat=True):
+        delete_upload(job_id)
+    return jobs.update(
+        status=ImportJob.STATUS_FAILED, error=INTERRUPTED_ERROR, finished_at=timezone.now()
+    )
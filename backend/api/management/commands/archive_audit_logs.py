@@ -0,0 +1,67 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.archive import archive_audit_logs
+from api.audit import get_audit_settings
+from api.models import AuditLog, AuditLogArchive
+
+
+def time_list_query():
+    """Milliseconds for the first page of /api/audit-logs/ (count + page)."""
+    started = time.perf_counter()
+    AuditLog.objects.count()
+    list(AuditLog.objects.select_related('user').order_by('-timestamp')[:10])
+    return (time.perf_counter() - started) * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Move audit log entries older than the retention window into compressed '
+        'monthly archive files.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help="Retention window in days (default: AUDIT_LOG['RETENTION_DAYS']).",
+        )
+        parser.add_argument(
+            '--format', choices=[choice for choice, _ in AuditLogArchive.FORMAT_CHOICES],
+            default=AuditLogArchive.FORMAT_JSONL,
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report how many entries would be archived.',
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        if days is None:
+            days = get_audit_settings()['RETENTION_DAYS']
+        before = timezone.now() - timedelta(days=days)
+
+        total = AuditLog.objects.count()
+        expired = AuditLog.objects.filter(timestamp__lt=before).count()
+        self.stdout.write(f'{total} audit log entries, {expired} older than {days} days.')
+        if options['dry_run'] or not expired:
+            return
+
+        before_ms = time_list_query()
+        try:
+            archives = archive_audit_logs(before, options['format'], options['batch_size'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        after_ms = time_list_query()
+
+        for archive in archives:
+            self.stdout.write(f'  {archive.file.name}: {archive.rows} entries')
+        remaining = AuditLog.objects.count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {sum(archive.rows for archive in archives)} entries into '
+            f'{len(archives)} files; {remaining} entries remain.'
+        ))
+        self.stdout.write(f'Audit log first page: {before_ms:.1f} ms before, {after_ms:.1f} ms after.')
@@ -0,0 +1,96 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.settings import api_settings
+
+from api.serializers import (
+    AuditLogSerializer, CompanySerializer, EmployeeSerializer, EmploymentHistorySerializer
+)
+
+SERIALIZERS = {
+    'employees': EmployeeSerializer,
+    'companies': CompanySerializer,
+    'employment-history': EmploymentHistorySerializer,
+    'audit-logs': AuditLogSerializer,
+}
+
+
+def field_selections(serializer_class):
+    """Query strings checked for parity: all fields, a few, and all but a few."""
+    names = list(serializer_class.get_field_sources())
+    return [{}, {'fields': ','.join(names[::3])}, {'exclude': ','.join(names[1::3])}]
+
+
+def render_instances(serializer_class, queryset, count, request, renderer):
+    # Shaped as in QueryShapingMixin
+    setup_eager_loading = getattr(serializer_class, 'setup_eager_loading', None)
+    if setup_eager_loading is not None:
+        queryset = setup_eager_loading(queryset)
+    queryset = serializer_class.restrict_queryset(queryset, request)[:count]
+    started = time.perf_counter()
+    rows = list(queryset)
+    fetched = time.perf_counter()
+    content = renderer.render(serializer_class(rows, many=True, context={'request': request}).data)
+    return content, fetched - started, time.perf_counter() - fetched
+
+
+def render_rows(serializer_class, queryset, count, request, renderer):
+    queryset = serializer_class.values_queryset(queryset, request)[:count]
+    started = time.perf_counter()
+    rows = list(queryset)
+    fetched = time.perf_counter()
+    content = renderer.render(serializer_class.represent_rows(rows, request))
+    return content, fetched - started, time.perf_counter() - fetched
+
+
+class Command(BaseCommand):
+    help = (
+        'Check that list serialization from .values() rows renders the same bytes '
+        'as the model serializers, and measure both.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000], help='Rows per list.')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement; the fastest counts.')
+        parser.add_argument('--only', nargs='+', choices=list(SERIALIZERS), help='Lists to benchmark.')
+
+    def handle(self, *args, **options):
+        renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+        factory = RequestFactory()
+
+        self.stdout.write(
+            f"{'list':<20} {'rows':>6} {'':<10} {'fetch':>9} {'serialize':>10} {'total':>9} {'speedup':>8}"
+        )
+        for label in options['only'] or SERIALIZERS:
+            serializer_class = SERIALIZERS[label]
+            queryset = serializer_class.Meta.model.objects.all()
+            available = queryset.count()
+            for rows in options['rows']:
+                if available < rows:
+                    self.stdout.write(self.style.WARNING(
+                        f'{label}: {available} rows, fewer than {rows}; run seed_data for more.'
+                    ))
+                for params in field_selections(serializer_class):
+                    request = factory.get('/', params)
+                    expected = render_instances(serializer_class, queryset, rows, request, renderer)[0]
+                    if render_rows(serializer_class, queryset, rows, request, renderer)[0] != expected:
+                        raise CommandError(
+                            f'{label}: output differs from {serializer_class.__name__} for {params}'
+                        )
+
+                request = factory.get('/')
+                timings = {}
+                for name, render in (('serializer', render_instances), ('rows', render_rows)):
+                    runs = [
+                        render(serializer_class, queryset, rows, request, renderer)[1:]
+                        for _ in range(options['repeat'])
+                    ]
+                    timings[name] = min(runs, key=sum)
+                for name, (fetch, serialize) in timings.items():
+                    speedup = sum(timings['serializer']) / sum(timings['rows']) if name == 'rows' else 1
+                    self.stdout.write(
+                        f'{label:<20} {min(rows, available):>6} {name:<10} {fetch * 1000:>7.1f}ms '
+                        f'{serialize * 1000:>8.1f}ms {(fetch + serialize) * 1000:>7.1f}ms {speedup:>7.1f}x'
+                    )
+        self.stdout.write(self.style.SUCCESS('Output identical for all lists and field selections.'))
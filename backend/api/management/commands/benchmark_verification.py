@@ -0,0 +1,79 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Employee
+from api.serializers import VerificationBatchSerializer
+from api.verification import verify_claims
+
+
+def build_claims(count, seed):
+    """
+    Build a realistic batch from existing employees: mostly correct claims,
+    some with a wrong role, some by name only and some unknown people.
+    """
+    rng = random.Random(seed)
+    employees = list(
+        Employee.objects.order_by('?')[:count].values(
+            'name', 'employee_id', 'company__name', 'role', 'start_date', 'end_date'
+        )
+    )
+    if not employees:
+        raise CommandError('No employees to verify; import or seed some data first.')
+
+    claims = []
+    for index in range(count):
+        employee = employees[index % len(employees)]
+        claim = {
+            'reference': f'claim-{index}',
+            'name': employee['name'],
+            'employee_id': employee['employee_id'],
+            'company': employee['company__name'],
+            'role': employee['role'],
+            'start_date': employee['start_date'].isoformat(),
+            'end_date': employee['end_date'].isoformat() if employee['end_date'] else None,
+        }
+        kind = rng.random()
+        if kind < 0.15:
+            claim['role'] = 'Chief ' + claim['role']
+        elif kind < 0.25:
+            del claim['employee_id']
+        elif kind < 0.35:
+            claim.update(name=f'Unknown Person {index}', employee_id=f'UNKNOWN-{index}')
+        claims.append(claim)
+    return claims
+
+
+class Command(BaseCommand):
+    help = 'Measure throughput of batch employment verification (/api/verify/batch/).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--claims', type=int, default=5000, help='Claims per batch.')
+        parser.add_argument('--repeat', type=int, default=3, help='Batches to run.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        claims = build_claims(options['claims'], options['seed'])
+        self.stdout.write(f"Verifying {len(claims)} claims x {options['repeat']}")
+
+        for run in range(1, options['repeat'] + 1):
+            started = time.perf_counter()
+            serializer = VerificationBatchSerializer(data={'claims': claims})
+            serializer.is_valid(raise_exception=True)
+            validated = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                results = verify_claims(serializer.validated_data['claims'])
+            finished = time.perf_counter()
+
+            statuses = {}
+            for result in results:
+                statuses[result['status']] = statuses.get(result['status'], 0) + 1
+            total = finished - started
+            self.stdout.write(
+                f'  run {run}: validate {(validated - started) * 1000:.0f} ms, '
+                f'verify {(finished - validated) * 1000:.0f} ms in {len(queries)} queries, '
+                f'{len(claims) / total:,.0f} claims/s  {statuses}'
+            )
@@ -0,0 +1,49 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.models import AuditLog, Company, Employee
+
+
+def hot_queries():
+    """The filter/order patterns used by the list, search and dashboard endpoints."""
+    company = Company.objects.order_by('-employee_count').values_list('pk', flat=True).first()
+    department = Employee.objects.values_list('department', flat=True).first()
+    return [
+        ('employee list', Employee.objects.order_by('-start_date', 'name')[:10]),
+        ('employees by company', Employee.objects.filter(company_id=company).order_by('-start_date', 'name')[:10]),
+        ('employees by department', Employee.objects.filter(department=department).order_by('-start_date', 'name')[:10]),
+        ('active employees', Employee.objects.filter(end_date__isnull=True).order_by('-start_date', 'name')[:10]),
+        ('recent employees', Employee.objects.order_by('-created_at')[:5]),
+        ('top companies', Company.objects.order_by('-employee_count')[:5]),
+        ('audit log list', AuditLog.objects.order_by('-timestamp')[:10]),
+        ('audit log by entity type', AuditLog.objects.filter(entity_type='employee').order_by('-timestamp')[:10]),
+        ('audit log by action', AuditLog.objects.filter(action='update').order_by('-timestamp')[:10]),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Print the query plan and latency of the hot list/search/dashboard queries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query.')
+        parser.add_argument('--no-plan', action='store_true', help='Only print latencies.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{Company.objects.count()} companies, {Employee.objects.count()} employees, '
+            f'{AuditLog.objects.count()} audit log entries'
+        )
+        for label, queryset in hot_queries():
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'\n{label}: median {statistics.median(timings):.2f} ms, max {max(timings):.2f} ms'
+            ))
+            if not options['no_plan']:
+                self.stdout.write(queryset.explain())
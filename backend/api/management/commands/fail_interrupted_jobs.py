@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.jobs import fail_interrupted_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Mark import jobs left pending or running by a stopped server as failed. '
+        'Run it when the server starts, before any worker picks up new jobs.'
+    )
+
+    def handle(self, *args, **options):
+        failed = fail_interrupted_jobs()
+        self.stdout.write(self.style.SUCCESS(f'Marked {failed} interrupted import jobs as failed.'))
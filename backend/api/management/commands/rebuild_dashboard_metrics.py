@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from api.dashboard import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount the denormalized dashboard counters and clear the cached dashboard.'
+
+    def handle(self, *args, **options):
+        for name, value in rebuild_counters().items():
+            self.stdout.write(f'{name}: {value}')
+        self.stdout.write(self.style.SUCCESS('Dashboard metrics rebuilt.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.records import rebuild_records
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized verification record of every employee.'
+
+    def handle(self, *args, **options):
+        written = rebuild_records(progress=lambda written: self.stdout.write(f'  {written} records'))
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} verification records.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from api.dashboard import invalidate_dashboard
+from api.models import Company
+
+
+class Command(BaseCommand):
+    help = 'Recompute Company.employee_count for every company in a single UPDATE.'
+
+    def handle(self, *args, **options):
+        updated = Company.objects.refresh_employee_counts()
+        invalidate_dashboard()
+        self.stdout.write(self.style.SUCCESS(f'Reconciled employee counts for {updated} companies.'))
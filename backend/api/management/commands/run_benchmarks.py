@@ -0,0 +1,97 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.benchmarks import REGRESSION_THRESHOLD, compare_reports, run_suite
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the main API endpoints against the current database (seed it '
+        'with seed_data first), save the results as JSON and optionally compare '
+        'them with an earlier run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30, help='Measured requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=3, help='Unmeasured requests per scenario.')
+        parser.add_argument(
+            '--only', nargs='+', metavar='PREFIX',
+            help='Run only the scenarios whose name starts with one of these, e.g. search.',
+        )
+        parser.add_argument('--upload-rows', type=int, default=1000, help='Rows per bulk upload.')
+        parser.add_argument('--cache', action='store_true', help='Leave response caching enabled.')
+        parser.add_argument('--output', help='Report path (default: benchmark-results/<timestamp>.json).')
+        parser.add_argument('--compare', metavar='BASELINE', help='Earlier report to compare with.')
+        parser.add_argument(
+            '--threshold', type=float, default=REGRESSION_THRESHOLD,
+            help='Relative p95 slowdown reported as a regression.',
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true',
+            help='Exit with an error if any scenario regressed against --compare.',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read baseline {options['compare']}: {exc}")
+
+        self.stdout.write(
+            f"{'scenario':<44} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8} {'memory':>10}"
+        )
+        try:
+            report = run_suite(
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+                only=options['only'],
+                upload_rows=options['upload_rows'],
+                response_cache=options['cache'],
+                progress=self.write_result,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        output = Path(options['output'] or Path(settings.BASE_DIR) / 'benchmark-results' / (
+            timezone.now().strftime('%Y%m%d-%H%M%S') + '.json'
+        ))
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+        self.stdout.write(f'Saved {output}')
+
+        if baseline is not None:
+            self.write_comparison(baseline, report, options)
+
+    def write_result(self, result):
+        latency = result['latency_ms']
+        line = (
+            f"{result['name']:<44} {latency['p50']:>7.1f}ms {latency['p95']:>7.1f}ms "
+            f"{latency['p99']:>7.1f}ms {result['queries']['median']:>8} "
+            f"{result['peak_memory_kb']:>8.0f}KB"
+        )
+        if result['failures']:
+            line += self.style.ERROR(f"  {result['failures']} unexpected status codes")
+        self.stdout.write(line)
+
+    def write_comparison(self, baseline, report, options):
+        rows = compare_reports(baseline, report, options['threshold'])
+        self.stdout.write(
+            f"Compared with {baseline.get('git_commit') or 'baseline'} "
+            f"from {baseline.get('created_at', '?')}:"
+        )
+        for row in rows:
+            line = (
+                f"{row['name']:<44} p50 {row['p50_change']:>+7.1%}  p95 {row['p95_change']:>+7.1%}  "
+                f"queries {row['queries_change']:>+4}"
+            )
+            self.stdout.write(self.style.ERROR(line + '  REGRESSION') if row['regression'] else line)
+
+        regressions = [row['name'] for row in rows if row['regression']]
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"Regressed: {', '.join(regressions)}")
@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.seeding import BATCH_SIZE, DEFAULT_PREFIX, clear_seeded, seed_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed synthetic companies, employees, employment history and audit log '
+        'entries for load testing, using bulk inserts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--companies', type=int, default=100)
+        parser.add_argument('--employees', type=int, default=10000)
+        parser.add_argument('--history', type=int, default=5000, help='Earlier positions to add.')
+        parser.add_argument('--audit-logs', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for repeatable data.')
+        parser.add_argument(
+            '--prefix', default=DEFAULT_PREFIX,
+            help='Tag for registration numbers, employee ids and audit entries.',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Delete the rows previously seeded with --prefix first.',
+        )
+
+    def handle(self, *args, **options):
+        if options['employees'] and not options['companies']:
+            raise CommandError('Employees need at least one company to work for.')
+
+        if options['clear']:
+            deleted = clear_seeded(options['prefix'])
+            self.stdout.write(
+                f"Deleted {deleted['companies']} companies, {deleted['employees']} employees "
+                f"and {deleted['audit_logs']} audit log entries."
+            )
+
+        started = time.perf_counter()
+        created = seed_database(
+            companies=options['companies'],
+            employees=options['employees'],
+            history=options['history'],
+            audit_logs=options['audit_logs'],
+            seed=options['seed'],
+            prefix=options['prefix'],
+            batch_size=options['batch_size'],
+            progress=lambda message: self.stdout.write(f'  {message}'),
+        )
+        elapsed = time.perf_counter() - started
+        rows = sum(created.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {created['companies']} companies, {created['employees']} employees, "
+            f"{created['history']} earlier positions and {created['audit_logs']} audit log "
+            f"entries in {elapsed:.1f} s ({rows / elapsed:,.0f} rows/s)."
+        ))
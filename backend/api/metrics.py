@@ -0,0 +1,317 @@
+"""
+Per-endpoint request instrumentation.
+
+`MetricsMiddleware` measures every request: wall time, time spent in and
+number of database queries, time spent rendering the response data
+(serialization to JSON, CSV, ...) and response size. The measurements go into
+in-process histograms keyed by view name (e.g. `employee-list`) and method,
+and are exposed to admins at `/api/metrics/` as JSON or, with
+`?format=prometheus`, in the Prometheus text format.
+
+Requests and queries slower than `SLOW_REQUEST_MS` / `SLOW_QUERY_MS` are
+logged on the `api.metrics` logger, slow queries with their SQL (without
+parameter values) unless `LOG_SQL` is off. All options live in the `METRICS`
+setting.
+
+Other modules count events outside of requests with
+`get_metrics_registry().increment(name)`, for the names in `COUNTERS`.
+
+Histograms are per process: with several workers each one reports its own,
+which is what Prometheus expects when it scrapes them individually.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.renderers import BaseRenderer
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    # Requests and queries at least this slow are logged; 0 disables
+    'SLOW_REQUEST_MS': 1000,
+    'SLOW_QUERY_MS': 200,
+    # Include the SQL of slow queries in the log
+    'LOG_SQL': True,
+}
+
+SKIP_PATHS = ('/static/', '/media/', '/admin/jsi18n/')
+PROMETHEUS_PREFIX = 'talent_verify_'
+
+TIME_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (1000, 10000, 100000, 1000000, 10000000)
+
+# name: (buckets, Prometheus name, scale to Prometheus units, help)
+HISTOGRAMS = {
+    'duration_ms': (TIME_BUCKETS, 'request_duration_seconds', 0.001, 'Request wall time.'),
+    'db_time_ms': (TIME_BUCKETS, 'request_db_duration_seconds', 0.001, 'Time spent in database queries.'),
+    'queries': (QUERY_BUCKETS, 'request_queries', 1, 'Database queries per request.'),
+    'serialization_ms': (
+        TIME_BUCKETS, 'response_render_duration_seconds', 0.001, 'Time spent rendering response data.'
+    ),
+    'response_bytes': (SIZE_BUCKETS, 'response_size_bytes', 1, 'Response body size (not streamed).'),
+}
+
+# name: help; exported to Prometheus as <name>_total
+COUNTERS = {
+    'audit_entries_dropped': 'Audit log entries that could not be written.',
+}
+
+
+def get_metrics_settings():
+    return {**DEFAULTS, **getattr(settings, 'METRICS', {})}
+
+
+class Histogram:
+    """Counts of observed values per bucket, with their sum and maximum."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0
+        self.max = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating within its bucket."""
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index else 0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return 0
+
+    def snapshot(self):
+        cumulative, total = [], 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            cumulative.append([bound, total])
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'mean': round(self.sum / self.count, 3) if self.count else 0,
+            'max': round(self.max, 3),
+            **{f'p{round(q * 100)}': round(self.quantile(q), 3) for q in (0.5, 0.95, 0.99)},
+            'buckets': cumulative,
+        }
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.statuses = {}
+        self.slow_queries = 0
+        self.histograms = {name: Histogram(spec[0]) for name, spec in HISTOGRAMS.items()}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.endpoints = {}
+            self.counters = dict.fromkeys(COUNTERS, 0)
+            self.started_at = time.time()
+
+    def record(self, view, method, status, slow_queries, **values):
+        with self.lock:
+            endpoint = self.endpoints.get((view, method))
+            if endpoint is None:
+                endpoint = self.endpoints[view, method] = EndpointMetrics()
+            endpoint.statuses[status] = endpoint.statuses.get(status, 0) + 1
+            endpoint.slow_queries += slow_queries
+            for name, value in values.items():
+                if value is not None:
+                    endpoint.histograms[name].observe(value)
+
+    def increment(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'since': self.started_at,
+                'counters': dict(self.counters),
+                'endpoints': [
+                    {
+                        'view': view,
+                        'method': method,
+                        'requests': sum(endpoint.statuses.values()),
+                        'statuses': {str(status): count for status, count in sorted(endpoint.statuses.items())},
+                        'slow_queries': endpoint.slow_queries,
+                        **{name: histogram.snapshot() for name, histogram in endpoint.histograms.items()},
+                    }
+                    for (view, method), endpoint in sorted(self.endpoints.items())
+                ],
+            }
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry():
+    return _registry
+
+
+class RequestTimer:
+    """Database time and queries of one request, via `execute_wrapper`."""
+
+    def __init__(self, request, slow_query_ms, log_sql):
+        self.request = f'{request.method} {request.path}'
+        self.slow_query_ms = slow_query_ms
+        self.log_sql = log_sql
+        self.queries = 0
+        self.db_time = 0.0
+        self.slow_queries = 0
+        self.render_started = None
+        self.serialization_ms = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.queries += 1
+            self.db_time += elapsed
+            if self.slow_query_ms and elapsed >= self.slow_query_ms:
+                self.slow_queries += 1
+                if self.log_sql:
+                    logger.warning('Slow query in %s (%.0f ms): %s', self.request, elapsed, sql)
+                else:
+                    logger.warning('Slow query in %s (%.0f ms)', self.request, elapsed)
+
+    def start_render(self, response):
+        self.render_started = time.perf_counter()
+        response.add_post_render_callback(self.finish_render)
+        return response
+
+    def finish_render(self, response):
+        self.serialization_ms = (time.perf_counter() - self.render_started) * 1000
+
+
+class MetricsMiddleware:
+    """
+    Records per-view timing, query and size metrics for every request (see
+    module docstring). Goes first in `MIDDLEWARE` so that the time spent in
+    the other middleware is included.
+    """
+
+    def __init__(self, get_response):
+        options = get_metrics_settings()
+        if not options['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_request_ms = options['SLOW_REQUEST_MS']
+        self.slow_query_ms = options['SLOW_QUERY_MS']
+        self.log_sql = options['LOG_SQL']
+
+    def __call__(self, request):
+        if request.path.startswith(SKIP_PATHS):
+            return self.get_response(request)
+
+        timer = request.metrics_timer = RequestTimer(request, self.slow_query_ms, self.log_sql)
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        duration = (time.perf_counter() - started) * 1000
+
+        match = request.resolver_match
+        # Unresolved paths share one label so that 404 probes can't grow the registry
+        view = match.view_name if match is not None else 'unmatched'
+        get_metrics_registry().record(
+            view, request.method, response.status_code, timer.slow_queries,
+            duration_ms=duration,
+            db_time_ms=timer.db_time,
+            queries=timer.queries,
+            serialization_ms=timer.serialization_ms,
+            response_bytes=None if response.streaming else len(response.content),
+        )
+        if self.slow_request_ms and duration >= self.slow_request_ms:
+            logger.warning(
+                'Slow request %s %s (%s): %.0f ms, %d queries in %.0f ms',
+                request.method, request.path, view, duration, timer.queries, timer.db_time,
+            )
+        return response
+
+    def process_template_response(self, request, response):
+        # Called just before DRF responses are rendered
+        timer = getattr(request, 'metrics_timer', None)
+        return timer.start_render(response) if timer is not None else response
+
+
+def prometheus_labels(**labels):
+    return ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in labels.items()
+    )
+
+
+def to_prometheus(snapshot):
+    """Render a registry snapshot in the Prometheus text exposition format."""
+    lines = [
+        f'# HELP {PROMETHEUS_PREFIX}requests_total Requests handled.',
+        f'# TYPE {PROMETHEUS_PREFIX}requests_total counter',
+    ]
+    for endpoint in snapshot['endpoints']:
+        for status, count in endpoint['statuses'].items():
+            labels = prometheus_labels(view=endpoint['view'], method=endpoint['method'], status=status)
+            lines.append(f'{PROMETHEUS_PREFIX}requests_total{{{labels}}} {count}')
+    lines += [
+        f'# HELP {PROMETHEUS_PREFIX}slow_queries_total Queries slower than SLOW_QUERY_MS.',
+        f'# TYPE {PROMETHEUS_PREFIX}slow_queries_total counter',
+    ]
+    for endpoint in snapshot['endpoints']:
+        labels = prometheus_labels(view=endpoint['view'], method=endpoint['method'])
+        lines.append(f"{PROMETHEUS_PREFIX}slow_queries_total{{{labels}}} {endpoint['slow_queries']}")
+    for counter, value in snapshot['counters'].items():
+        name = f'{PROMETHEUS_PREFIX}{counter}_total'
+        lines += [f'# HELP {name} {COUNTERS[counter]}', f'# TYPE {name} counter', f'{name} {value}']
+
+    for key, (_, name, scale, description) in HISTOGRAMS.items():
+        name = PROMETHEUS_PREFIX + name
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+        for endpoint in snapshot['endpoints']:
+            histogram = endpoint[key]
+            labels = prometheus_labels(view=endpoint['view'], method=endpoint['method'])
+            for bound, count in histogram['buckets']:
+                lines.append(f'{name}_bucket{{{labels},le="{bound * scale:g}"}} {count}')
+            lines += [
+                f'{name}_bucket{{{labels},le="+Inf"}} {histogram["count"]}',
+                f'{name}_sum{{{labels}}} {histogram["sum"] * scale:g}',
+                f'{name}_count{{{labels}}} {histogram["count"]}',
+            ]
+    return '\n'.join(lines) + '\n'
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict) and 'endpoints' in data:
+            return to_prometheus(data)
+        # Errors such as 403 responses
+        detail = data.get('detail', data) if isinstance(data, dict) else data
+        return f'# {detail}\n'
@@ -1,10 +1,14 @@
+from django.http import RawPostDataException
 from django.utils.deprecation import MiddlewareMixin
-from .models import AuditLog
+from .audit import get_audit_pipeline, get_client_ip
 import json
 
 class AuditLogMiddleware(MiddlewareMixin):
     """
     Middleware to log user actions for auditing purposes.
+    
+    Entries are queued on the audit pipeline and written in batches off the
+    request path (see `api.audit`).
     """
     
     def process_response(self, request, response):
@@ -14,8 +18,14 @@ class AuditLogMiddleware(MiddlewareMixin):
             if request.path.startswith(path):
                 return response
         
-        # Only log actions for authenticated users
-        if not request.user.is_authenticated:
+        # Only log actions for authenticated users; DRF leaves `user` as None
+        # for anonymous requests (UNAUTHENTICATED_USER)
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return response
+        
+        # The view already wrote a more specific entry
+        if getattr(request, 'audit_logged', False):
             return response
         
         # Determine action based on request method and path
@@ -49,21 +59,14 @@ class AuditLogMiddleware(MiddlewareMixin):
         if not entity_type:
             return response
         
-        # Get request body for details
+        # Get request body for details; reads carry none
         details = None
-        if request.body and request.content_type == 'application/json':
-            try:
-                # Mask sensitive data
-                body_data = json.loads(request.body)
-                if 'password' in body_data:
-                    body_data['password'] = '********'
-                details = body_data
-            except json.JSONDecodeError:
-                pass
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            details = self.get_details(request, response)
         
-        # Create audit log entry
-        AuditLog.objects.create(
-            user=request.user,
+        # Queue audit log entry
+        get_audit_pipeline().log(
+            user_id=user.pk,
             action=action,
             entity_type=entity_type,
             entity_id=entity_id,
@@ -73,11 +76,26 @@ class AuditLogMiddleware(MiddlewareMixin):
         
         return response
     
-    def get_client_ip(self, request):
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
+    def get_details(self, request, response):
+        if request.content_type != 'application/json':
+            return None
+        # Reuse the data DRF already parsed rather than decoding the body again
+        drf_request = getattr(response, 'renderer_context', {}).get('request')
+        if drf_request is not None and hasattr(drf_request, '_full_data'):
+            body_data = drf_request.data
         else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
-
+            try:
+                body_data = json.loads(request.body)
+            except (json.JSONDecodeError, RawPostDataException, UnicodeDecodeError):
+                return None
+        
+        if not isinstance(body_data, dict):
+            return None
+        # Mask sensitive data
+        body_data = dict(body_data)
+        if 'password' in body_data:
+            body_data['password'] = '********'
+        return body_data
+    
+    def get_client_ip(self, request):
+        return get_client_ip(request)
@@ -0,0 +1,94 @@
+from django.db import migrations
+
+
+POSTGRES_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS employee_name_trgm_idx ON api_employee USING GIN (name gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS employee_code_trgm_idx ON api_employee USING GIN (employee_id gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS employee_department_trgm_idx ON api_employee USING GIN (department gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS employee_role_trgm_idx ON api_employee USING GIN (role gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS company_name_trgm_idx ON api_company USING GIN (name gin_trgm_ops)',
+    # Must match PostgresSearchBackend.SEARCH_VECTOR
+    "CREATE INDEX IF NOT EXISTS employee_search_vector_idx ON api_employee USING GIN ("
+    "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(employee_id, '') || ' ' || "
+    "coalesce(department, '') || ' ' || coalesce(role, '')))",
+]
+
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS employee_search_vector_idx',
+    'DROP INDEX IF EXISTS company_name_trgm_idx',
+    'DROP INDEX IF EXISTS employee_role_trgm_idx',
+    'DROP INDEX IF EXISTS employee_department_trgm_idx',
+    'DROP INDEX IF EXISTS employee_code_trgm_idx',
+    'DROP INDEX IF EXISTS employee_name_trgm_idx',
+]
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE api_employee_fts USING fts5("
+    "name, employee_id, company_name, department, role, tokenize='trigram')",
+    "INSERT INTO api_employee_fts (rowid, name, employee_id, company_name, department, role) "
+    "SELECT e.id, e.name, e.employee_id, c.name, e.department, e.role "
+    "FROM api_employee e JOIN api_company c ON c.id = e.company_id",
+    "CREATE TRIGGER api_employee_fts_insert AFTER INSERT ON api_employee BEGIN "
+    "INSERT INTO api_employee_fts (rowid, name, employee_id, company_name, department, role) "
+    "VALUES (new.id, new.name, new.employee_id, "
+    "(SELECT name FROM api_company WHERE id = new.company_id), new.department, new.role); END",
+    "CREATE TRIGGER api_employee_fts_update "
+    "AFTER UPDATE OF name, employee_id, company_id, department, role ON api_employee BEGIN "
+    "DELETE FROM api_employee_fts WHERE rowid = old.id; "
+    "INSERT INTO api_employee_fts (rowid, name, employee_id, company_name, department, role) "
+    "VALUES (new.id, new.name, new.employee_id, "
+    "(SELECT name FROM api_company WHERE id = new.company_id), new.department, new.role); END",
+    "CREATE TRIGGER api_employee_fts_delete AFTER DELETE ON api_employee BEGIN "
+    "DELETE FROM api_employee_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER api_company_fts_rename AFTER UPDATE OF name ON api_company BEGIN "
+    "UPDATE api_employee_fts SET company_name = new.name "
+    "WHERE rowid IN (SELECT id FROM api_employee WHERE company_id = new.id); END",
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS api_company_fts_rename',
+    'DROP TRIGGER IF EXISTS api_employee_fts_delete',
+    'DROP TRIGGER IF EXISTS api_employee_fts_update',
+    'DROP TRIGGER IF EXISTS api_employee_fts_insert',
+    'DROP TABLE IF EXISTS api_employee_fts',
+]
+
+
+def sqlite_supports_trigram(schema_editor):
+    # The trigram tokenizer needs SQLite 3.34+ built with FTS5
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        options = {row[0] for row in cursor.fetchall()}
+    return 'ENABLE_FTS5' in options and schema_editor.connection.Database.sqlite_version_info >= (3, 34)
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRES_FORWARD
+    elif vendor == 'sqlite' and sqlite_supports_trigram(schema_editor):
+        statements = SQLITE_FORWARD
+    else:
+        # Other databases use the icontains fallback backend
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRES_BACKWARD, 'sqlite': SQLITE_BACKWARD}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_auditlog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditLogArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('format', models.CharField(choices=[('jsonl.gz', 'Gzipped JSON lines'), ('parquet', 'Parquet')], default='jsonl.gz', max_length=10)),
+                ('file', models.FileField(upload_to='audit-archive/%Y/')),
+                ('rows', models.PositiveIntegerField()),
+                ('first_timestamp', models.DateTimeField()),
+                ('last_timestamp', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-month', '-created_at'],
+                'indexes': [models.Index(fields=['first_timestamp', 'last_timestamp'], name='auditarchive_range_idx')],
+            },
+        ),
+    ]
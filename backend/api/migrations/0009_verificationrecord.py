@@ -0,0 +1,31 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_auditlogarchive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VerificationRecord',
+            fields=[
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='verification_record', serialize=False, to='api.employee')),
+                ('employee_number', models.CharField(max_length=100, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('company_name', models.CharField(max_length=255)),
+                ('department', models.CharField(max_length=100)),
+                ('role', models.CharField(max_length=255)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('history', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.company')),
+            ],
+            options={
+                'ordering': ['employee_number'],
+            },
+        ),
+    ]
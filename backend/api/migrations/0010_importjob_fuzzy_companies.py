@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_verificationrecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='fuzzy_companies',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,7 +1,27 @@
 from django.db import models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils import timezone
+
+class CompanyManager(models.Manager):
+    def refresh_employee_counts(self, company_ids=None):
+        """
+        Recompute `employee_count` from the Employee table with a single grouped
+        UPDATE, for the given companies or for every company.
+        """
+        counts = (
+            Employee.objects.filter(company=OuterRef('pk'))
+            .order_by()
+            .values('company')
+            .annotate(count=Count('pk'))
+            .values('count')
+        )
+        companies = self.all() if company_ids is None else self.filter(pk__in=company_ids)
+        return companies.update(employee_count=Coalesce(Subquery(counts), 0))
+
 
 class Company(models.Model):
     name = models.CharField(max_length=255)
@@ -10,24 +30,49 @@ class Company(models.Model):
     address = models.TextField()
     contact_person = models.CharField(max_length=255)
     departments = models.JSONField(default=list)  # Store as JSON array
-    employee_count = models.PositiveIntegerField(default=0)
+    employee_count = models.PositiveIntegerField(default=0)  # Maintained from Employee rows
     phone = models.CharField(max_length=50)
     email = models.EmailField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CompanyManager()
+
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded name so saves can tell whether it changed
+        if 'name' not in instance.get_deferred_fields():
+            instance._loaded_name = instance.name
+        return instance
+
+    def save(self, *args, **kwargs):
+        # employee_count is maintained with F() updates, so never write back a stale value
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'employee_count'
+            ]
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name_plural = "Companies"
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name'], name='company_name_idx'),
+            models.Index(fields=['-employee_count'], name='company_headcount_idx'),
+            models.Index(fields=['registration_date'], name='company_reg_date_idx'),
+        ]
 
 
 class Employee(models.Model):
     name = models.CharField(max_length=255)
     employee_id = models.CharField(max_length=100, unique=True)
-    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='employees')
+    # Indexed as the leading column of employee_company_start_idx
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='employees', db_index=False)
     department = models.CharField(max_length=100)
     role = models.CharField(max_length=255)
     start_date = models.DateField()
@@ -43,13 +88,125 @@ class Employee(models.Model):
     def is_active(self):
         return self.end_date is None
 
+    # Fields whose changes are recorded in EmploymentHistory
+    HISTORY_FIELDS = ('company_id', 'department', 'role', 'start_date', 'end_date')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded position so saves can tell whether it changed
+        if not instance.get_deferred_fields().intersection(cls.HISTORY_FIELDS):
+            instance._history_state = instance.history_state()
+        return instance
+
+    def history_state(self):
+        return {field: getattr(self, field) for field in self.HISTORY_FIELDS}
+
     class Meta:
         ordering = ['-start_date', 'name']
+        indexes = [
+            models.Index(fields=['-start_date', 'name'], name='employee_ordering_idx'),
+            models.Index(fields=['company', '-start_date', 'name'], name='employee_company_start_idx'),
+            models.Index(fields=['department', '-start_date', 'name'], name='employee_department_idx'),
+            models.Index(fields=['end_date'], name='employee_end_date_idx'),
+            models.Index(fields=['-created_at'], name='employee_created_idx'),
+            # Active employees only; used by search and the dashboard
+            models.Index(
+                fields=['-start_date', 'name'],
+                condition=Q(end_date__isnull=True),
+                name='employee_active_idx',
+            ),
+        ]
+
+
+class EmploymentHistoryManager(models.Manager):
+    # Fields that identify a position; other changes update its row in place
+    POSITION_FIELDS = ('company_id', 'department', 'role')
+
+    def record(self, employees, batch_size=None):
+        """
+        Record the current position of each employee. A new company,
+        department or role closes the row of the position held until now and
+        adds a snapshot; changed dates or duties of the same position update
+        its row in place. Returns the rows written.
+        """
+        employees = list(employees)
+        # Backends that cannot return ids from bulk_create leave pk unset
+        missing = [employee.employee_id for employee in employees if employee.pk is None]
+        pks = dict(
+            Employee.objects.filter(employee_id__in=missing).values_list('employee_id', 'id')
+        ) if missing else {}
+
+        to_date = self.model._meta.get_field('start_date').to_python
+        snapshots = {}
+        for employee in employees:
+            snapshot = self.model(
+                employee_id=employee.pk or pks[employee.employee_id],
+                company_id=employee.company_id,
+                department=employee.department,
+                role=employee.role,
+                start_date=to_date(employee.start_date),
+                end_date=to_date(employee.end_date),
+                duties=employee.duties,
+            )
+            snapshots[snapshot.employee_id] = snapshot
+
+        changed, closed, added = [], [], []
+        current = self.current_rows(snapshots)
+        for employee_id, snapshot in snapshots.items():
+            row = current.get(employee_id)
+            if row is not None and self.same_stint(row, snapshot):
+                if (row.start_date, row.end_date, row.duties) != (snapshot.start_date, snapshot.end_date, snapshot.duties):
+                    row.start_date, row.end_date, row.duties = snapshot.start_date, snapshot.end_date, snapshot.duties
+                    changed.append(row)
+                continue
+            if row is not None and row.end_date is None:
+                row.end_date = self.replaced_end_date(row, snapshot)
+                closed.append(row)
+            added.append(snapshot)
+
+        self.bulk_update(changed, ['start_date', 'end_date', 'duties'], batch_size=batch_size)
+        self.bulk_update(closed, ['end_date'], batch_size=batch_size)
+        return changed + self.bulk_create(added, batch_size=batch_size)
+
+    def current_rows(self, employee_ids):
+        """
+        Map each employee to the row of their current position: the open row,
+        or else the one that started last.
+        """
+        current = self.filter(employee_id=models.OuterRef('employee_id')).order_by(
+            models.F('end_date').desc(nulls_first=True), '-start_date', '-id'
+        ).values('id')[:1]
+        rows = self.filter(employee_id__in=list(employee_ids), id=models.Subquery(current))
+        return {row.employee_id: row for row in rows}
+
+    def same_stint(self, row, snapshot):
+        # The same position, still held or with the same start (a correction)
+        return all(
+            getattr(row, field) == getattr(snapshot, field) for field in self.POSITION_FIELDS
+        ) and (row.end_date is None or row.start_date == snapshot.start_date)
+
+    @staticmethod
+    def replaced_end_date(row, snapshot):
+        """
+        When a position that is replaced ends: on the new start date when the
+        new position starts later, otherwise on the new end date if the
+        employee left, or today. Never before the row's own start date.
+        """
+        if snapshot.start_date > row.start_date:
+            end = snapshot.start_date
+        else:
+            end = snapshot.end_date or timezone.localdate()
+        return max(end, row.start_date)
 
 
 class EmploymentHistory(models.Model):
-    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='employment_history')
-    company = models.ForeignKey(Company, on_delete=models.CASCADE)
+    # Indexed as the leading columns of history_employee_start_idx and
+    # history_company_start_idx
+    employee = models.ForeignKey(
+        Employee, on_delete=models.CASCADE, related_name='employment_history', db_index=False
+    )
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, db_index=False)
     department = models.CharField(max_length=100)
     role = models.CharField(max_length=255)
     start_date = models.DateField()
@@ -57,12 +214,49 @@ class EmploymentHistory(models.Model):
     duties = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = EmploymentHistoryManager()
+
     def __str__(self):
         return f"{self.employee.name} at {self.company.name} ({self.role})"
 
     class Meta:
         verbose_name_plural = "Employment Histories"
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['employee', '-start_date'], name='history_employee_start_idx'),
+            models.Index(fields=['company', '-start_date'], name='history_company_start_idx'),
+        ]
+
+
+class VerificationRecord(models.Model):
+    """
+    Denormalized read model for verification lookups: an employee's current
+    position and their employment history with company names inlined, kept
+    in step with the source tables by `api.records`.
+    """
+    employee = models.OneToOneField(
+        Employee, on_delete=models.CASCADE, primary_key=True, related_name='verification_record'
+    )
+    employee_number = models.CharField(max_length=100, unique=True)  # Employee.employee_id
+    name = models.CharField(max_length=255)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='+')
+    company_name = models.CharField(max_length=255)
+    department = models.CharField(max_length=100)
+    role = models.CharField(max_length=255)
+    start_date = models.DateField()
+    end_date = models.DateField(null=True, blank=True)
+    history = models.JSONField(default=list)  # Newest first
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Verification record for {self.name} ({self.employee_number})"
+
+    @property
+    def is_active(self):
+        return self.end_date is None
+
+    class Meta:
+        ordering = ['employee_number']
 
 
 class UserProfile(models.Model):
@@ -102,17 +296,137 @@ class AuditLog(models.Model):
         ('other', 'Other'),
     )
     
-    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    # Indexed as the leading column of auditlog_user_ts_idx
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, db_index=False)
     action = models.CharField(max_length=10, choices=ACTION_CHOICES)
     entity_type = models.CharField(max_length=100)  # e.g., 'company', 'employee'
     entity_id = models.CharField(max_length=100, null=True, blank=True)
     details = models.JSONField(null=True, blank=True)  # Store additional details as JSON
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add, so batched writes keep the time of the request
+    timestamp = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
         return f"{self.action} {self.entity_type} by {self.user} at {self.timestamp}"
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['-timestamp'], name='auditlog_timestamp_idx'),
+            models.Index(fields=['entity_type', '-timestamp'], name='auditlog_entity_ts_idx'),
+            models.Index(fields=['user', '-timestamp'], name='auditlog_user_ts_idx'),
+            models.Index(fields=['action', '-timestamp'], name='auditlog_action_ts_idx'),
+        ]
+
+
+class AuditLogArchive(models.Model):
+    """
+    A compressed file holding audit log entries moved out of `AuditLog` by
+    the `archive_audit_logs` command. Each file covers one calendar month.
+    """
+    FORMAT_JSONL = 'jsonl.gz'
+    FORMAT_PARQUET = 'parquet'
+    FORMAT_CHOICES = (
+        (FORMAT_JSONL, 'Gzipped JSON lines'),
+        (FORMAT_PARQUET, 'Parquet'),
+    )
+
+    month = models.DateField()  # First day of the month covered
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default=FORMAT_JSONL)
+    file = models.FileField(upload_to='audit-archive/%Y/')
+    rows = models.PositiveIntegerField()
+    first_timestamp = models.DateTimeField()
+    last_timestamp = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Audit archive {self.month:%Y-%m} ({self.rows} entries)"
+
+    class Meta:
+        ordering = ['-month', '-created_at']
+        indexes = [
+            models.Index(fields=['first_timestamp', 'last_timestamp'], name='auditarchive_range_idx'),
+        ]
+
+
+
+class ImportJob(models.Model):
+    KIND_COMPANY = 'company'
+    KIND_EMPLOYEE = 'employee'
+    KIND_CHOICES = (
+        (KIND_COMPANY, 'Company'),
+        (KIND_EMPLOYEE, 'Employee'),
+    )
+
+    MODE_INSERT = 'insert'
+    MODE_UPSERT = 'upsert'
+    MODE_CHOICES = (
+        (MODE_INSERT, 'Insert'),
+        (MODE_UPSERT, 'Upsert'),
+    )
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES, default=MODE_INSERT)
+    fuzzy_companies = models.BooleanField(default=False)  # Resolve unknown company names approximately
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    file = models.FileField(upload_to='imports/%Y/%m/')
+    original_name = models.CharField(max_length=255)
+    total_rows = models.PositiveIntegerField(null=True, blank=True)
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_failed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    result = models.JSONField(null=True, blank=True)  # Final import statistics
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind} import {self.original_name} ({self.status})"
+
+    @property
+    def elapsed_seconds(self):
+        if not self.started_at:
+            return None
+        end = self.finished_at or timezone.now()
+        return max((end - self.started_at).total_seconds(), 0)
+
+    @property
+    def throughput(self):
+        """Rows processed per second since the job started."""
+        elapsed = self.elapsed_seconds
+        if not elapsed:
+            return None
+        return round(self.rows_processed / elapsed, 1)
 
+    @property
+    def eta_seconds(self):
+        """Estimated seconds until the job finishes, based on current throughput."""
+        if self.status != self.STATUS_RUNNING or not self.total_rows or not self.throughput:
+            return None
+        remaining = max(self.total_rows - self.rows_processed - self.rows_failed, 0)
+        return round(remaining / self.throughput, 1)
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+class MetricCounter(models.Model):
+    """Denormalized counters kept up to date incrementally for the dashboard."""
+    name = models.CharField(max_length=100, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
@@ -0,0 +1,177 @@
+"""
+Pagination for list endpoints.
+
+`HybridPagination` keeps the page-number behaviour by default and switches to
+keyset (cursor) pagination when the request passes `?cursor=` or
+`?pagination=keyset`. Keyset pages are fetched with a `WHERE` on the last row's
+ordering values instead of an `OFFSET`, skip the `COUNT(*)` query, and stay
+stable when rows are inserted while a client is paging.
+"""
+import base64
+import json
+from collections.abc import Mapping
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+MAX_PAGE_SIZE = getattr(settings, 'MAX_PAGE_SIZE', 100)
+
+
+def get_page_size(request, param, default):
+    try:
+        page_size = int(request.query_params[param])
+    except (KeyError, ValueError):
+        return default
+    return min(max(page_size, 1), MAX_PAGE_SIZE)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination over the queryset's ordering, with the
+    primary key appended as a tie-breaker. Ordering fields must not be nullable.
+    Sequences that are not plain querysets (`archive.AuditLogEntries`) apply
+    the cursor themselves through an `after(ordering, values)` method.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.pk_name = queryset.model._meta.pk.name
+        page_size = get_page_size(request, self.page_size_query_param, api_settings.PAGE_SIZE)
+        ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*ordering)
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            if len(cursor) != len(ordering):
+                raise NotFound(self.invalid_cursor_message)
+            if hasattr(queryset, 'after'):
+                queryset = queryset.after(ordering, cursor)
+            else:
+                queryset = queryset.filter(self.after(ordering, cursor))
+
+        # Fetch one extra row to know whether there is a next page
+        results = list(queryset[:page_size + 1])
+        self.next_cursor = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            self.next_cursor = self.encode_cursor(
+                [self.get_value(results[-1], field) for field in ordering]
+            )
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        for field in ordering:
+            if not isinstance(field, str):
+                raise ValidationError('Keyset pagination requires plain field ordering.')
+            name = field.lstrip('-')
+            if '__' in name or name in queryset.query.annotations:
+                continue
+            try:
+                model_field = queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if model_field.null:
+                raise ValidationError(
+                    f'Keyset pagination does not support ordering by nullable field {name}.'
+                )
+        if not {'pk', '-pk', 'id', '-id'} & set(ordering):
+            ordering.append('pk')
+        return ordering
+
+    @staticmethod
+    def after(ordering, values):
+        """
+        Build the filter selecting rows strictly after `values` in `ordering`:
+        (a > x) OR (a = x AND b > y) OR ...
+        """
+        condition = Q()
+        for position, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            step = Q(**{f'{name}__{lookup}': values[position]})
+            for previous, value in zip(ordering[:position], values):
+                step &= Q(**{previous.lstrip('-'): value})
+            condition |= step
+        return condition
+
+    def get_value(self, obj, field):
+        name = field.lstrip('-')
+        if isinstance(obj, Mapping):
+            # A .values() row, keyed by ORM path
+            value = obj[self.pk_name if name == 'pk' else name]
+        else:
+            value = obj
+            for part in name.split('__'):
+                value = getattr(value, part)
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()
+        return value
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    @staticmethod
+    def encode_cursor(values):
+        return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+
+class HybridPagination(PageNumberPagination):
+    """
+    Page-number pagination with a client-selectable `page_size` (capped at
+    `MAX_PAGE_SIZE`) that switches to `KeysetPagination` when the request
+    passes `?cursor=` or `?pagination=keyset`.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+    keyset_class = KeysetPagination
+
+    def use_keyset(self, request):
+        return (
+            self.keyset_class.cursor_query_param in request.query_params
+            or request.query_params.get('pagination') == 'keyset'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        # Keyset pagination needs a queryset; plain lists keep page numbers
+        if self.use_keyset(request) and hasattr(queryset, 'query'):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -1,11 +1,63 @@
+from collections import namedtuple
 from rest_framework import permissions
+from rest_framework.exceptions import PermissionDenied
+from .models import UserProfile
+from .tokens import ROLE_CLAIM, COMPANY_CLAIM
+
+Access = namedtuple('Access', ['role', 'company_id'])
+NO_ACCESS = Access(None, None)
+
+
+def get_access(request):
+    """
+    Return the requesting user's role and company id, resolved once per
+    request: from the JWT claims when the token carries them, otherwise with
+    a single profile lookup.
+    """
+    http_request = getattr(request, '_request', request)
+    access = getattr(http_request, '_access', None)
+    if access is None:
+        access = http_request._access = resolve_access(request)
+    return access
+
+
+def resolve_access(request):
+    user = request.user
+    if not user or not user.is_authenticated:
+        return NO_ACCESS
+    
+    payload = getattr(getattr(request, 'auth', None), 'payload', None)
+    if payload and ROLE_CLAIM in payload:
+        return Access(payload[ROLE_CLAIM], payload.get(COMPANY_CLAIM))
+    
+    return get_user_access(user.pk)
+
+
+def get_user_access(user_id):
+    """Role and company id from the user's profile, outside of a request."""
+    profile = UserProfile.objects.filter(user_id=user_id).values_list('role', 'company_id').first()
+    return Access(*profile) if profile else NO_ACCESS
+
+
+def get_company_scope(access):
+    """
+    The id of the only company whose rows `access` may write, or None for
+    admins, who are not restricted. Other users without a company may not
+    write at all.
+    """
+    if access.role == 'admin':
+        return None
+    if access.company_id is None:
+        raise PermissionDenied('Your account is not linked to a company.')
+    return access.company_id
+
 
 class IsAdminUser(permissions.BasePermission):
     """
     Allows access only to admin users.
     """
     def has_permission(self, request, view):
-        return request.user and hasattr(request.user, 'profile') and request.user.profile.role == 'admin'
+        return get_access(request).role == 'admin'
 
 
 class IsCompanyManagerOrReadOnly(permissions.BasePermission):
@@ -16,25 +68,21 @@ class IsCompanyManagerOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
         
-        return request.user and hasattr(request.user, 'profile') and (
-            request.user.profile.role == 'admin' or 
-            request.user.profile.role == 'company_manager'
-        )
+        return get_access(request).role in ['admin', 'company_manager']
 
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
         
-        if not hasattr(request.user, 'profile'):
-            return False
+        access = get_access(request)
         
         # Admin can do anything
-        if request.user.profile.role == 'admin':
+        if access.role == 'admin':
             return True
         
         # Company managers can only modify their own company
-        if request.user.profile.role == 'company_manager':
-            return request.user.profile.company == obj
+        if access.role == 'company_manager':
+            return access.company_id is not None and access.company_id == obj.pk
         
         return False
 
@@ -48,26 +96,20 @@ class IsHRStaffOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
         
-        return request.user and hasattr(request.user, 'profile') and (
-            request.user.profile.role == 'admin' or 
-            request.user.profile.role == 'company_manager' or
-            request.user.profile.role == 'hr_staff'
-        )
+        return get_access(request).role in ['admin', 'company_manager', 'hr_staff']
 
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
         
-        if not hasattr(request.user, 'profile'):
-            return False
+        access = get_access(request)
         
         # Admin can do anything
-        if request.user.profile.role == 'admin':
+        if access.role == 'admin':
             return True
         
         # Company managers and HR staff can only modify employees in their company
-        if request.user.profile.role in ['company_manager', 'hr_staff']:
-            return request.user.profile.company == obj.company
+        if access.role in ['company_manager', 'hr_staff']:
+            return access.company_id is not None and access.company_id == obj.company_id
         
         return False
-
@@ -0,0 +1,124 @@
+"""
+Denormalized verification records.
+
+A `VerificationRecord` holds what a verification lookup returns for one
+employee: the current position with the company name, and the whole
+employment history as a compact JSON array with company names inlined. The
+lookup endpoint (`/api/verification-records/<employee_id>/`) is then a single
+indexed row read instead of an employee query plus a history query with
+company joins.
+
+`refresh_records` rebuilds the records of a set of employees with four
+set-based queries per batch. It is called in the same transaction as the
+writes it follows: single saves through `api.signals`, bulk updates, imports
+and seeding directly. A company rename refreshes everyone who worked there.
+Deletes cascade, except raw bulk deletes, which remove records first.
+`rebuild_verification_records` rebuilds the whole table.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import Employee, EmploymentHistory, VerificationRecord
+
+# Employees rebuilt per batch, bounded by the size of the IN clauses
+BATCH_SIZE = 2000
+
+
+def batched(values, size=BATCH_SIZE):
+    batch = []
+    for value in values:
+        batch.append(value)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def history_entry(company_name, department, role, start_date, end_date):
+    return {
+        'company': company_name,
+        'department': department,
+        'role': role,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat() if end_date else None,
+    }
+
+
+def build_records(employee_pks):
+    employees = Employee.objects.filter(pk__in=employee_pks).values_list(
+        'id', 'employee_id', 'name', 'company_id', 'company__name',
+        'department', 'role', 'start_date', 'end_date',
+    )
+    history = defaultdict(list)
+    rows = (
+        EmploymentHistory.objects.filter(employee_id__in=employee_pks)
+        .order_by('employee_id', '-start_date', '-id')
+        .values_list('employee_id', 'company__name', 'department', 'role', 'start_date', 'end_date')
+    )
+    for employee_pk, *entry in rows:
+        history[employee_pk].append(history_entry(*entry))
+
+    return [
+        VerificationRecord(
+            employee_id=pk,
+            employee_number=employee_number,
+            name=name,
+            company_id=company_id,
+            company_name=company_name,
+            department=department,
+            role=role,
+            start_date=start_date,
+            end_date=end_date,
+            history=history[pk],
+        )
+        for (pk, employee_number, name, company_id, company_name,
+             department, role, start_date, end_date) in employees
+    ]
+
+
+def refresh_records(employee_pks):
+    """
+    Rebuild the verification records of the given employees (primary keys,
+    any iterable) from the source tables; returns the number written.
+    Records of employees that no longer exist are removed.
+    """
+    written = 0
+    for batch in batched(dict.fromkeys(employee_pks)):
+        records = build_records(batch)
+        with transaction.atomic():
+            # Delete and insert rather than upsert, so an employee_id that
+            # moved between two employees in the batch cannot collide
+            VerificationRecord.objects.filter(employee_id__in=batch).delete()
+            VerificationRecord.objects.bulk_create(records)
+        written += len(records)
+    return written
+
+
+def refresh_company_records(company_pks):
+    """Rebuild the records of everyone who works or worked at the given companies."""
+    company_pks = list(company_pks)
+    if not company_pks:
+        return 0
+    employee_pks = set(Employee.objects.filter(company_id__in=company_pks).values_list('pk', flat=True))
+    employee_pks.update(
+        EmploymentHistory.objects.filter(company_id__in=company_pks).values_list('employee_id', flat=True)
+    )
+    return refresh_records(employee_pks)
+
+
+def rebuild_records(progress=None):
+    """Rebuild every verification record; returns the number written."""
+    progress = progress or (lambda written: None)
+    written, last = 0, 0
+    while True:
+        # Keyset pages, so no cursor stays open across the writes
+        batch = list(
+            Employee.objects.filter(pk__gt=last).order_by('pk').values_list('pk', flat=True)[:BATCH_SIZE]
+        )
+        if not batch:
+            return written
+        written += refresh_records(batch)
+        last = batch[-1]
+        progress(written)
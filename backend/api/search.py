@@ -0,0 +1,189 @@
+"""
+Pluggable employee search.
+
+`get_search_backend()` picks an implementation for the default database:
+
+* PostgreSQL: substring filters run as ILIKE against `pg_trgm` GIN indexes,
+  and free-text queries match a GIN-indexed `tsvector` ranked by `ts_rank`.
+* SQLite: filters and free-text queries run against the `api_employee_fts`
+  FTS5 table (trigram tokenizer), ranked by `bm25`. Triggers keep it in sync
+  with every insert, update and delete, including bulk uploads.
+* Anything else falls back to chained `icontains` filters.
+
+The indexes, FTS table and triggers are created by migration
+`0006_search_indexes`. Set `SEARCH_BACKEND` to `'database'` to force the
+fallback.
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+# Search terms accepted by `filter`, mapped to the ORM lookup used by the fallback
+SEARCH_FIELDS = {
+    'name': 'name',
+    'employee_id': 'employee_id',
+    'company': 'company__name',
+    'department': 'department',
+    'role': 'role',
+}
+
+# Trigram indexes cannot match terms shorter than one trigram
+MIN_INDEXED_TERM_LENGTH = 3
+
+FTS_TABLE = 'api_employee_fts'
+
+
+def escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class DatabaseSearchBackend:
+    """Portable fallback using `icontains` lookups."""
+
+    def filter(self, queryset, terms):
+        """Return employees matching every `field: substring` pair in `terms`."""
+        for field, term in terms.items():
+            queryset = queryset.filter(**{f'{SEARCH_FIELDS[field]}__icontains': term})
+        return queryset
+
+    def search(self, queryset, text, fields=None):
+        """
+        Return employees where every word of `text` occurs in one of `fields`
+        (default: all search fields), most relevant first where supported.
+        """
+        lookups = [SEARCH_FIELDS[field] for field in (fields or SEARCH_FIELDS)]
+        for word in text.split():
+            query = Q()
+            for lookup in lookups:
+                query |= Q(**{f'{lookup}__icontains': word})
+            queryset = queryset.filter(query)
+        return queryset
+
+
+class PostgresSearchBackend(DatabaseSearchBackend):
+    # Must match the expression of the employee_search_vector_idx index
+    SEARCH_VECTOR = (
+        "to_tsvector('simple', coalesce(\"api_employee\".\"name\", '') || ' ' || "
+        "coalesce(\"api_employee\".\"employee_id\", '') || ' ' || "
+        "coalesce(\"api_employee\".\"department\", '') || ' ' || "
+        "coalesce(\"api_employee\".\"role\", ''))"
+    )
+    COLUMNS = {
+        'name': '"api_employee"."name"',
+        'employee_id': '"api_employee"."employee_id"',
+        'department': '"api_employee"."department"',
+        'role': '"api_employee"."role"',
+    }
+
+    def contains(self, field, term):
+        """A trigram-indexable ILIKE condition for one search field."""
+        pattern = f'%{escape_like(term)}%'
+        if field == 'company':
+            return Q(company_id__in=RawSQL(
+                'SELECT "id" FROM "api_company" WHERE "name" ILIKE %s', [pattern]
+            ))
+        return Q(RawSQL(f'{self.COLUMNS[field]} ILIKE %s', [pattern], output_field=BooleanField()))
+
+    def filter(self, queryset, terms):
+        for field, term in terms.items():
+            queryset = queryset.filter(self.contains(field, term))
+        return queryset
+
+    def search(self, queryset, text, fields=None):
+        if fields:
+            for word in text.split():
+                query = Q()
+                for field in fields:
+                    query |= self.contains(field, word)
+                queryset = queryset.filter(query)
+            return queryset
+
+        return queryset.filter(RawSQL(
+            f"{self.SEARCH_VECTOR} @@ websearch_to_tsquery('simple', %s)", [text],
+            output_field=BooleanField(),
+        )).annotate(search_rank=RawSQL(
+            f"ts_rank({self.SEARCH_VECTOR}, websearch_to_tsquery('simple', %s))", [text],
+            output_field=FloatField(),
+        )).order_by('-search_rank', *queryset.model._meta.ordering)
+
+
+class SQLiteSearchBackend(DatabaseSearchBackend):
+    COLUMNS = {
+        'name': 'name',
+        'employee_id': 'employee_id',
+        'company': 'company_name',
+        'department': 'department',
+        'role': 'role',
+    }
+
+    @staticmethod
+    def phrase(term):
+        return '"{}"'.format(term.replace('"', '""'))
+
+    def match(self, queryset, expression):
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [expression]
+        ))
+
+    def filter(self, queryset, terms):
+        indexed = {
+            field: term for field, term in terms.items()
+            if len(term) >= MIN_INDEXED_TERM_LENGTH
+        }
+        short = {field: term for field, term in terms.items() if field not in indexed}
+        if indexed:
+            queryset = self.match(queryset, ' AND '.join(
+                f'{self.COLUMNS[field]} : {self.phrase(term)}' for field, term in indexed.items()
+            ))
+        return super().filter(queryset, short)
+
+    def search(self, queryset, text, fields=None):
+        words = text.split()
+        indexed = [word for word in words if len(word) >= MIN_INDEXED_TERM_LENGTH]
+        short = ' '.join(word for word in words if len(word) < MIN_INDEXED_TERM_LENGTH)
+        if short:
+            queryset = super().search(queryset, short, fields)
+        if not indexed:
+            return queryset
+
+        columns = '{%s} : ' % ' '.join(self.COLUMNS[field] for field in fields) if fields else ''
+        expression = ' AND '.join(f'{columns}{self.phrase(word)}' for word in indexed)
+        return self.match(queryset, expression).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = "api_employee"."id"', [expression],
+            output_field=FloatField(),
+        )).order_by('-search_rank', *queryset.model._meta.ordering)
+
+
+_backend = None
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        choice = getattr(settings, 'SEARCH_BACKEND', 'auto')
+        if choice == 'auto' and connection.vendor == 'postgresql':
+            _backend = PostgresSearchBackend()
+        elif choice == 'auto' and connection.vendor == 'sqlite' and (
+            FTS_TABLE in connection.introspection.table_names()
+        ):
+            _backend = SQLiteSearchBackend()
+        else:
+            _backend = DatabaseSearchBackend()
+    return _backend
+
+
+class BackendSearchFilter(filters.SearchFilter):
+    """
+    `SearchFilter` that runs `?search=` through the search backend, restricted
+    to the view's `search_fields` (which must be keys of `SEARCH_FIELDS`).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').replace('\x00', '').strip()
+        if not text:
+            return queryset
+        fields = getattr(view, 'search_fields', None)
+        return get_search_backend().search(queryset, text, fields)
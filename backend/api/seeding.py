@@ -0,0 +1,306 @@
+"""
+Synthetic data for load testing.
+
+`seed_database` inserts companies, employees, employment history and audit log
+entries with `bulk_create` in fixed-size batches, so memory stays flat however
+many rows are requested. Distributions follow what production data looks like
+rather than being uniform:
+
+* company sizes are long-tailed (a few large employers, many small ones),
+* first and last names are drawn with Zipf-like weights, so common names
+  repeat the way they do in real registers,
+* roughly a quarter of employees have left (an `end_date`), and employees get
+  earlier positions at other companies in their history,
+* audit entries are mostly views, spread over the last six months.
+
+Rows are tagged with a prefix (`SEED` by default) in `registration_number`,
+`employee_id` and audit log `details`, so seeding can be repeated and
+`clear_seeded` can remove them.
+"""
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .bulk import bulk_delete_employees
+from .caching import invalidate_models
+from .dashboard import rebuild_counters
+from .fuzzy import remove_names
+from .models import AuditLog, Company, Employee, EmploymentHistory, UserProfile
+from .records import refresh_records
+
+FIRST_NAMES = (
+    'Tendai', 'Tatenda', 'Farai', 'Rutendo', 'Nyasha', 'Chipo', 'Tapiwa', 'Kudzai',
+    'Tinashe', 'Rufaro', 'Tafadzwa', 'Chiedza', 'Blessing', 'Simbarashe', 'Memory',
+    'Takudzwa', 'Vimbai', 'Ngonidzashe', 'Precious', 'Tanaka', 'John', 'Mary',
+    'James', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda', 'David',
+    'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica',
+    'Thomas', 'Sarah', 'Charles', 'Karen', 'Thabo', 'Sipho', 'Lerato', 'Ayanda',
+    'Nomvula', 'Kagiso', 'Amara', 'Chinedu', 'Ngozi', 'Kwame', 'Abena', 'Kofi',
+    'Fatima', 'Aisha', 'Ibrahim', 'Grace', 'Peter', 'Ruth', 'Daniel', 'Esther',
+)
+LAST_NAMES = (
+    'Moyo', 'Ncube', 'Sibanda', 'Dube', 'Ndlovu', 'Mpofu', 'Nyathi', 'Khumalo',
+    'Chikwanha', 'Mutasa', 'Chiwenga', 'Mhlanga', 'Banda', 'Phiri', 'Zulu',
+    'Mahlangu', 'Mlambo', 'Gumbo', 'Marufu', 'Chirwa', 'Makoni', 'Chinamasa',
+    'Mugabe', 'Tsvangirai', 'Nkomo', 'Sithole', 'Matongo', 'Mushonga', 'Zvobgo',
+    'Chimombe', 'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia',
+    'Miller', 'Davis', 'Wilson', 'Anderson', 'Taylor', 'Thomas', 'Moore',
+    'Jackson', 'Martin', 'Lee', 'Thompson', 'White', 'Harris', 'Clark', 'Okafor',
+    'Mensah', 'Osei', 'Boateng', 'Naidoo', 'Pillay', 'Botha', 'van der Merwe',
+    'Mokoena', 'Dlamini', 'Nkosi', 'Mabaso', 'Hove', 'Shumba', 'Mapfumo',
+)
+COMPANY_WORDS = (
+    'Zambezi', 'Savanna', 'Great', 'Eastern', 'Highveld', 'Kariba', 'Limpopo',
+    'Summit', 'Pioneer', 'Unity', 'Horizon', 'Granite', 'Baobab', 'Victoria',
+    'Msasa', 'Mutapa', 'Kopje', 'Tech', 'Delta', 'Sable', 'Impala', 'Acacia',
+    'Crest', 'Meridian', 'Apex', 'Frontier', 'Harvest', 'Riverside', 'Northern',
+)
+COMPANY_SECTORS = (
+    'Mining', 'Logistics', 'Solutions', 'Holdings', 'Foods', 'Engineering',
+    'Telecoms', 'Insurance', 'Pharmaceuticals', 'Construction', 'Energy',
+    'Agriculture', 'Consulting', 'Retail', 'Financial Services', 'Motors',
+)
+COMPANY_SUFFIXES = ('Ltd', '(Pvt) Ltd', 'Inc', 'Group', 'Limited', 'Corporation')
+CITIES = ('Harare', 'Bulawayo', 'Mutare', 'Gweru', 'Masvingo', 'Kwekwe', 'Chinhoyi', 'Victoria Falls')
+STREETS = ('Samora Machel Ave', 'Julius Nyerere Way', 'Jason Moyo Ave', 'Fife St', 'Main St', 'Leopold Takawira St')
+
+# Department -> roles, most common first
+DEPARTMENTS = {
+    'Engineering': ('Software Engineer', 'Senior Software Engineer', 'QA Engineer', 'DevOps Engineer', 'Engineering Manager'),
+    'Sales': ('Sales Representative', 'Account Manager', 'Sales Manager', 'Business Development Lead'),
+    'Finance': ('Accountant', 'Financial Analyst', 'Accounts Clerk', 'Finance Manager', 'Chief Financial Officer'),
+    'Human Resources': ('HR Officer', 'Recruiter', 'HR Manager', 'Payroll Administrator'),
+    'Operations': ('Operations Officer', 'Supervisor', 'Logistics Coordinator', 'Operations Manager'),
+    'Marketing': ('Marketing Officer', 'Content Specialist', 'Brand Manager', 'Marketing Manager'),
+    'Customer Service': ('Customer Service Agent', 'Call Centre Agent', 'Team Leader', 'Service Manager'),
+    'Legal': ('Legal Officer', 'Paralegal', 'Legal Counsel'),
+    'IT': ('IT Support Technician', 'Systems Administrator', 'Network Engineer', 'IT Manager'),
+    'Administration': ('Administrator', 'Receptionist', 'Office Manager', 'Executive Assistant'),
+}
+
+AUDIT_ACTIONS = ('view', 'update', 'create', 'delete', 'login', 'logout')
+AUDIT_ACTION_WEIGHTS = (70, 13, 9, 2, 4, 2)
+AUDIT_ENTITY_TYPES = ('employee', 'company', 'employmenthistory', 'search', 'dashboard')
+AUDIT_ENTITY_WEIGHTS = (50, 20, 10, 15, 5)
+
+DEFAULT_PREFIX = 'SEED'
+BATCH_SIZE = 5000
+TODAY = date.today()
+
+
+def zipf_weights(count, exponent=1.0):
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+def company_sizes(companies, employees, rng):
+    """Split `employees` over `companies` with a long-tailed (Pareto) distribution."""
+    weights = [rng.paretovariate(1.2) for _ in range(companies)]
+    total = sum(weights)
+    sizes = [int(employees * weight / total) for weight in weights]
+    # Hand out the rounding remainder to the largest companies
+    order = sorted(range(companies), key=weights.__getitem__, reverse=True)
+    for index in order[:employees - sum(sizes)]:
+        sizes[index] += 1
+    return sizes
+
+
+def random_date(rng, start, end):
+    return start + timedelta(days=rng.randrange(max((end - start).days, 1)))
+
+
+class Seeder:
+    def __init__(self, seed=0, prefix=DEFAULT_PREFIX, batch_size=BATCH_SIZE, progress=None):
+        self.rng = random.Random(seed)
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.progress = progress or (lambda message: None)
+        self.first_weights = zipf_weights(len(FIRST_NAMES), 0.8)
+        self.last_weights = zipf_weights(len(LAST_NAMES), 0.9)
+
+    def person_name(self):
+        first = self.rng.choices(FIRST_NAMES, self.first_weights)[0]
+        last = self.rng.choices(LAST_NAMES, self.last_weights)[0]
+        if self.rng.random() < 0.15:
+            middle = self.rng.choices(FIRST_NAMES, self.first_weights)[0]
+            return f'{first} {middle} {last}'
+        return f'{first} {last}'
+
+    def company(self, number):
+        rng = self.rng
+        name = f'{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SECTORS)} {rng.choice(COMPANY_SUFFIXES)}'
+        slug = name.split()[0].lower()
+        return Company(
+            name=name,
+            registration_number=f'{self.prefix}-C{number:07d}',
+            registration_date=random_date(rng, date(1980, 1, 1), TODAY - timedelta(days=365)),
+            address=f'{rng.randint(1, 250)} {rng.choice(STREETS)}, {rng.choice(CITIES)}',
+            contact_person=self.person_name(),
+            departments=rng.sample(list(DEPARTMENTS), rng.randint(3, len(DEPARTMENTS))),
+            phone=f'+263 {rng.randint(71, 78)} {rng.randint(100, 999)} {rng.randint(1000, 9999)}',
+            email=f'info@{slug}{number}.co.zw',
+        )
+
+    def position(self, company, earliest):
+        rng = self.rng
+        department = rng.choice(company.departments)
+        roles = DEPARTMENTS[department]
+        role = rng.choices(roles, zipf_weights(len(roles), 1.2))[0]
+        return department, role, random_date(rng, max(earliest, company.registration_date), TODAY)
+
+    def employee(self, number, company):
+        rng = self.rng
+        department, role, start_date = self.position(company, TODAY - timedelta(days=15 * 365))
+        end_date = None
+        if rng.random() < 0.25 and start_date < TODAY - timedelta(days=30):
+            end_date = random_date(rng, start_date + timedelta(days=30), TODAY)
+        return Employee(
+            name=self.person_name(),
+            employee_id=f'{self.prefix}-E{number:08d}',
+            company=company,
+            department=department,
+            role=role,
+            start_date=start_date,
+            end_date=end_date,
+            duties=f'{role} duties in the {department} department.',
+        )
+
+    def next_number(self, model, field):
+        return model.objects.filter(**{f'{field}__startswith': f'{self.prefix}-'}).count()
+
+    def seed_companies(self, count):
+        first = self.next_number(Company, 'registration_number')
+        companies = []
+        for start in range(0, count, self.batch_size):
+            batch = [self.company(first + number) for number in range(start, min(start + self.batch_size, count))]
+            companies.extend(Company.objects.bulk_create(batch))
+            self.progress(f'companies: {len(companies)}/{count}')
+        return companies
+
+    def seed_employees(self, companies, count):
+        first = self.next_number(Employee, 'employee_id')
+        sizes = company_sizes(len(companies), count, self.rng)
+        pending, created = [], 0
+        for company, size in zip(companies, sizes):
+            for _ in range(size):
+                pending.append(self.employee(first + created + len(pending), company))
+                if len(pending) >= self.batch_size:
+                    created += self.write_employees(pending)
+                    pending = []
+                    self.progress(f'employees: {created}/{count}')
+        if pending:
+            created += self.write_employees(pending)
+            self.progress(f'employees: {created}/{count}')
+        return created
+
+    def write_employees(self, employees):
+        # bulk_create skips the signals that record the current position
+        Employee.objects.bulk_create(employees)
+        EmploymentHistory.objects.record(employees)
+        return len(employees)
+
+    def seed_history(self, companies, count):
+        """Add `count` earlier positions, at other companies, to random seeded employees."""
+        employees = list(
+            Employee.objects.filter(employee_id__startswith=f'{self.prefix}-')
+            .values_list('id', 'start_date')
+        )
+        if not employees or not companies:
+            return 0
+        created = 0
+        while created < count:
+            batch = []
+            for _ in range(min(self.batch_size, count - created)):
+                employee_id, start_date = self.rng.choice(employees)
+                company = self.rng.choice(companies)
+                earliest = start_date - timedelta(days=10 * 365)
+                department, role, previous_start = self.position(company, earliest)
+                previous_start = min(previous_start, start_date - timedelta(days=60))
+                batch.append(EmploymentHistory(
+                    employee_id=employee_id,
+                    company=company,
+                    department=department,
+                    role=role,
+                    start_date=previous_start,
+                    end_date=random_date(self.rng, previous_start + timedelta(days=30), start_date),
+                ))
+            EmploymentHistory.objects.bulk_create(batch)
+            created += len(batch)
+            self.progress(f'history: {created}/{count}')
+        return created
+
+    def seed_audit_logs(self, count):
+        user_ids = list(User.objects.values_list('id', flat=True)[:50]) or [None]
+        now = timezone.now()
+        created = 0
+        while created < count:
+            batch = []
+            for _ in range(min(self.batch_size, count - created)):
+                action = self.rng.choices(AUDIT_ACTIONS, AUDIT_ACTION_WEIGHTS)[0]
+                entity_type = self.rng.choices(AUDIT_ENTITY_TYPES, AUDIT_ENTITY_WEIGHTS)[0]
+                batch.append(AuditLog(
+                    user_id=self.rng.choice(user_ids),
+                    action=action,
+                    entity_type=entity_type,
+                    entity_id=str(self.rng.randint(1, 100000)) if action != 'view' or self.rng.random() < 0.5 else None,
+                    details={'method': 'GET' if action == 'view' else 'POST', 'seed': self.prefix},
+                    ip_address=f'10.{self.rng.randint(0, 255)}.{self.rng.randint(0, 255)}.{self.rng.randint(1, 254)}',
+                    timestamp=now - timedelta(seconds=self.rng.randrange(180 * 24 * 3600)),
+                ))
+            AuditLog.objects.bulk_create(batch)
+            created += len(batch)
+            self.progress(f'audit log entries: {created}/{count}')
+        return created
+
+
+def seed_database(companies=100, employees=10000, history=5000, audit_logs=20000,
+                  seed=0, prefix=DEFAULT_PREFIX, batch_size=BATCH_SIZE, progress=None):
+    """Insert synthetic rows; returns the number created of each kind."""
+    seeder = Seeder(seed, prefix, batch_size, progress)
+    with transaction.atomic():
+        created_companies = seeder.seed_companies(companies)
+        created = {
+            'companies': len(created_companies),
+            'employees': seeder.seed_employees(created_companies, employees),
+            'history': seeder.seed_history(created_companies, history),
+            'audit_logs': seeder.seed_audit_logs(audit_logs),
+        }
+        # Bulk inserts bypass the signals that maintain these
+        Company.objects.refresh_employee_counts([company.pk for company in created_companies])
+        written = refresh_records(
+            Employee.objects.filter(employee_id__startswith=f'{prefix}-').values_list('pk', flat=True)
+        )
+        seeder.progress(f'verification records: {written}')
+        invalidate_models('company', 'employee', 'employmenthistory')
+    rebuild_counters()
+    return created
+
+
+def clear_seeded(prefix=DEFAULT_PREFIX):
+    """
+    Delete the rows tagged with `prefix`: companies with their employees and
+    history, employees, and audit log entries.
+    """
+    with transaction.atomic():
+        deleted_employees = bulk_delete_employees(
+            Employee.objects.filter(employee_id__startswith=f'{prefix}-')
+        )
+        companies = Company.objects.filter(registration_number__startswith=f'{prefix}-')
+        EmploymentHistory.objects.filter(company__in=companies).delete()
+        bulk_delete_employees(Employee.objects.filter(company__in=companies))
+        UserProfile.objects.filter(company__in=companies).update(company=None)
+        remove_names('company', companies.values_list('pk', flat=True))
+        # Counters are rebuilt below rather than adjusted per company
+        companies.aggregate_bookkeeping = True
+        deleted_companies = companies.delete()[1].get(Company._meta.label, 0)
+        deleted_audit_logs, _ = AuditLog.objects.filter(details__seed=prefix).delete()
+        Company.objects.refresh_employee_counts()
+        invalidate_models('company', 'employee', 'employmenthistory')
+    rebuild_counters()
+    return {
+        'companies': deleted_companies,
+        'employees': deleted_employees,
+        'audit_logs': deleted_audit_logs,
+    }
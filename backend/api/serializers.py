@@ -1,24 +1,318 @@
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
 from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.settings import ISO_8601, api_settings
 from django.contrib.auth.models import User
-from .models import Company, Employee, EmploymentHistory, UserProfile, AuditLog
+from .models import Company, Employee, EmploymentHistory, UserProfile, AuditLog, ImportJob, VerificationRecord
 
 
-class UserSerializer(serializers.ModelSerializer):
+class EagerLoadingMixin:
+    """
+    Lets a serializer declare the related rows it reads so views can load them
+    up front instead of issuing one query per serialized object.
+
+    `only_related_fields` narrows the joined tables to the columns actually
+    read; the model's own columns listed in `Meta.fields` are always loaded.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+    only_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls.prefetch_related_fields)
+        if cls.only_related_fields:
+            model_fields = {field.name for field in queryset.model._meta.concrete_fields}
+            local_fields = [name for name in cls.Meta.fields if name in model_fields]
+            queryset = queryset.only(*local_fields, *cls.only_related_fields)
+        return queryset
+
+
+def split_param(value):
+    return {name.strip() for name in value.split(',') if name.strip()} if value else set()
+
+
+def source_column(model, source):
+    """
+    The ORM path (e.g. `company__name`) of the column a dotted field `source`
+    reads, or None when it is not a plain column of the model or of a model
+    it references.
+    """
+    parts = source.split('.')
+    for position, part in enumerate(parts):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        last = position == len(parts) - 1
+        if not field.concrete or not (last or field.many_to_one or field.one_to_one):
+            return None
+        model = field.related_model
+    return '__'.join(parts)
+
+
+class SparseFieldsMixin:
+    """
+    Lets clients choose the fields of GET responses with `?fields=a,b`, or drop
+    some with `?exclude=a,b`. Only the top-level serializer of a request is
+    trimmed.
+
+    `restrict_queryset` narrows the SQL to the columns the chosen fields read,
+    joining only the related tables they need. Fields computed from columns
+    (properties, nested serializers) list them in `field_columns`; choosing a
+    field whose columns are unknown leaves the queryset as it is.
+    """
+    fields_query_param = 'fields'
+    exclude_query_param = 'exclude'
+    field_columns = {}
+
+    @classmethod
+    def selected_field_names(cls, request, names):
+        """The requested subset of `names`, or None when the request does not pick fields."""
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return None
+        params = getattr(request, 'query_params', request.GET)
+        included = split_param(params.get(cls.fields_query_param))
+        excluded = split_param(params.get(cls.exclude_query_param))
+        if not included and not excluded:
+            return None
+        errors = {
+            param: f"Unknown fields: {', '.join(sorted(unknown))}"
+            for param, unknown in (
+                (cls.fields_query_param, included.difference(names)),
+                (cls.exclude_query_param, excluded.difference(names)),
+            )
+            if unknown
+        }
+        if errors:
+            raise serializers.ValidationError(errors)
+        return [name for name in names if (not included or name in included) and name not in excluded]
+
+    @classmethod
+    def get_field_sources(cls):
+        # Built once per class; sources do not depend on the request
+        sources = cls.__dict__.get('_field_sources')
+        if sources is None:
+            sources = cls._field_sources = {name: field.source for name, field in cls().fields.items()}
+        return sources
+
+    @classmethod
+    def get_field_columns(cls, model, names):
+        """
+        Map each of the field `names` to the columns it reads, or return None
+        if the columns of one of them are unknown.
+        """
+        sources = cls.get_field_sources()
+        columns = {}
+        for name in names:
+            if name in cls.field_columns:
+                columns[name] = tuple(cls.field_columns[name])
+                continue
+            column = source_column(model, sources[name])
+            if column is None:
+                return None
+            columns[name] = (column,)
+        return columns
+
+    @staticmethod
+    def ordering_columns(queryset):
+        """Local fields and annotations the queryset is ordered by."""
+        names = {field.name for field in queryset.model._meta.concrete_fields}
+        names.update(queryset.query.annotations)
+        return {
+            field.lstrip('-') for field in queryset.query.order_by or queryset.model._meta.ordering
+            if isinstance(field, str) and field.lstrip('-') in names
+        }
+
+    @classmethod
+    def restrict_queryset(cls, queryset, request):
+        sources = cls.get_field_sources()
+        selected = cls.selected_field_names(request, list(sources))
+        if selected is None:
+            return queryset
+        field_columns = cls.get_field_columns(queryset.model, selected)
+        if field_columns is None:
+            return queryset
+
+        columns = {column for names in field_columns.values() for column in names}
+        # Keyset pagination reads the ordering values from the last row
+        columns.update(cls.ordering_columns(queryset).difference(queryset.query.annotations))
+        related = {column.rpartition('__')[0] for column in columns if '__' in column}
+        queryset = queryset.select_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*columns) if columns else queryset.only('pk')
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return fields
+        selected = self.selected_field_names(self.context.get('request'), list(fields))
+        if selected is None:
+            return fields
+        return {name: fields[name] for name in selected}
+
+
+# Fields whose representation of a column value is the value itself
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField, serializers.CharField, serializers.EmailField,
+    serializers.IntegerField, serializers.IPAddressField,
+)
+UNSUPPORTED = object()
+
+
+def row_converter(field):
+    """
+    The function turning a column value into `field`'s representation: None
+    when the value is used as is, UNSUPPORTED when the field does not read a
+    single column value (nested serializers, method fields, ...).
+    """
+    if type(field) in PASSTHROUGH_FIELDS:
+        return None
+    if isinstance(field, serializers.JSONField) and not field.binary:
+        return None
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        # .values() yields the foreign key itself
+        return None if field.pk_field is None else field.pk_field.to_representation
+    if type(field) is serializers.DateField and getattr(field, 'format', api_settings.DATE_FORMAT) == ISO_8601:
+        return lambda value: value.isoformat()
+    if isinstance(field, (
+        serializers.BaseSerializer, serializers.RelatedField, serializers.ManyRelatedField,
+        serializers.SerializerMethodField, serializers.HiddenField,
+    )):
+        return UNSUPPORTED
+    return field.to_representation
+
+
+class RowRepresentationMixin:
+    """
+    Read-only fast path for lists, on top of `SparseFieldsMixin`:
+    `values_queryset` fetches the columns of the selected fields as
+    `.values()` rows, and `represent_rows` turns them into the same dicts
+    `to_representation` would, through converters built once per class
+    instead of model instances and bound fields per object.
+
+    Fields computed from other columns supply a function of the row in
+    `row_getters` (and their columns in `field_columns`). `values_queryset`
+    returns None for serializers with fields it cannot convert, which are
+    then serialized as usual.
+    """
+    row_getters = {}
+
+    @classmethod
+    def get_row_converters(cls):
+        # Built once per class; None when a field cannot be read from a row
+        if '_row_converters' not in cls.__dict__:
+            cls._row_converters = cls.build_row_converters()
+        return cls._row_converters
+
+    @classmethod
+    def build_row_converters(cls):
+        """
+        Map field names to `(key, getter, convert, relation, skip)`: the row
+        key or `row_getters` function giving the value, its converter, and
+        for dotted sources the key of the foreign key, whose None makes the
+        field None or, with `skip`, leaves it out (as `Field.get_attribute`).
+        """
+        model = cls.Meta.model
+        converters = {}
+        for name, field in cls().fields.items():
+            if field.write_only:
+                continue
+            convert = row_converter(field)
+            if convert is UNSUPPORTED:
+                return None
+            if name in cls.row_getters:
+                converters[name] = (None, cls.row_getters[name], convert, None, False)
+                continue
+            column = source_column(model, field.source)
+            if column is None:
+                return None
+            relation = column.rpartition('__')[0] or None
+            if relation is not None and (field.default is not empty or (field.required and not field.allow_null)):
+                return None
+            converters[name] = (column, None, convert, relation, not field.allow_null)
+        return converters
+
+    @classmethod
+    def values_queryset(cls, queryset, request=None):
+        """
+        `queryset` as `.values()` rows with the columns `represent_rows`
+        needs for the request, or None when it cannot represent them.
+        """
+        converters = cls.get_row_converters()
+        if converters is None:
+            return None
+        selected = cls.selected_field_names(request, list(converters))
+        if selected is None:
+            selected = list(converters)
+        field_columns = cls.get_field_columns(queryset.model, selected)
+        if field_columns is None:
+            return None
+
+        columns = {column for names in field_columns.values() for column in names}
+        columns.update(converters[name][3] for name in selected if converters[name][3])
+        # Keyset pagination reads the primary key and ordering values from the last row
+        pk_name = queryset.model._meta.pk.name
+        columns.add(pk_name)
+        columns.update(
+            pk_name if field.lstrip('-') == 'pk' else field.lstrip('-')
+            for field in queryset.query.order_by or queryset.model._meta.ordering
+            if isinstance(field, str)
+        )
+        return queryset.values(*columns)
+
+    @classmethod
+    def represent_rows(cls, rows, request=None):
+        converters = cls.get_row_converters()
+        selected = cls.selected_field_names(request, list(converters))
+        fields = [
+            (name, *converters[name]) for name in (list(converters) if selected is None else selected)
+        ]
+        data = []
+        for row in rows:
+            item = {}
+            for name, key, getter, convert, relation, skip in fields:
+                if relation is not None and row[relation] is None:
+                    if not skip:
+                        item[name] = None
+                    continue
+                value = row[key] if getter is None else getter(row)
+                item[name] = value if value is None or convert is None else convert(value)
+            data.append(item)
+        return data
+
+
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'is_active']
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(EagerLoadingMixin, SparseFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     company_name = serializers.CharField(source='company.name', read_only=True)
     
+    select_related_fields = ('user', 'company')
+    only_related_fields = (
+        'user__id', 'user__username', 'user__email', 'user__first_name',
+        'user__last_name', 'user__is_active', 'company__name',
+    )
+    field_columns = {'user': only_related_fields[:6]}
+    
     class Meta:
         model = UserProfile
         fields = ['id', 'user', 'role', 'company', 'company_name', 'phone', 'created_at', 'updated_at']
 
 
-class CompanySerializer(serializers.ModelSerializer):
+class CompanySerializer(SparseFieldsMixin, RowRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = Company
         fields = [
@@ -26,12 +320,18 @@ class CompanySerializer(serializers.ModelSerializer):
             'address', 'contact_person', 'departments', 'employee_count',
             'phone', 'email', 'created_at', 'updated_at'
         ]
+        read_only_fields = ['employee_count']
 
 
-class EmployeeSerializer(serializers.ModelSerializer):
+class EmployeeSerializer(EagerLoadingMixin, SparseFieldsMixin, RowRepresentationMixin, serializers.ModelSerializer):
     company_name = serializers.CharField(source='company.name', read_only=True)
     is_active = serializers.BooleanField(read_only=True)
     
+    select_related_fields = ('company',)
+    only_related_fields = ('company__name',)
+    field_columns = {'is_active': ('end_date',)}
+    row_getters = {'is_active': lambda row: row['end_date'] is None}
+    
     class Meta:
         model = Employee
         fields = [
@@ -41,10 +341,13 @@ class EmployeeSerializer(serializers.ModelSerializer):
         ]
 
 
-class EmploymentHistorySerializer(serializers.ModelSerializer):
+class EmploymentHistorySerializer(EagerLoadingMixin, SparseFieldsMixin, RowRepresentationMixin, serializers.ModelSerializer):
     employee_name = serializers.CharField(source='employee.name', read_only=True)
     company_name = serializers.CharField(source='company.name', read_only=True)
     
+    select_related_fields = ('employee', 'company')
+    only_related_fields = ('employee__name', 'company__name')
+    
     class Meta:
         model = EmploymentHistory
         fields = [
@@ -53,9 +356,12 @@ class EmploymentHistorySerializer(serializers.ModelSerializer):
         ]
 
 
-class AuditLogSerializer(serializers.ModelSerializer):
+class AuditLogSerializer(EagerLoadingMixin, SparseFieldsMixin, RowRepresentationMixin, serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     
+    select_related_fields = ('user',)
+    only_related_fields = ('user__username',)
+    
     class Meta:
         model = AuditLog
         fields = [
@@ -64,6 +370,42 @@ class AuditLogSerializer(serializers.ModelSerializer):
         ]
 
 
+class VerificationRecordSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    employee_id = serializers.CharField(source='employee_number', read_only=True)
+    is_active = serializers.BooleanField(read_only=True)
+    
+    field_columns = {'is_active': ('end_date',)}
+    
+    class Meta:
+        model = VerificationRecord
+        fields = [
+            'employee', 'employee_id', 'name', 'company', 'company_name', 'department',
+            'role', 'start_date', 'end_date', 'is_active', 'history', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
+class ImportJobSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    throughput = serializers.FloatField(read_only=True)
+    eta_seconds = serializers.FloatField(read_only=True)
+    
+    field_columns = {
+        'throughput': ('rows_processed', 'started_at', 'finished_at'),
+        'eta_seconds': (
+            'status', 'total_rows', 'rows_processed', 'rows_failed', 'started_at', 'finished_at',
+        ),
+    }
+    
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'kind', 'mode', 'fuzzy_companies', 'status', 'original_name', 'total_rows',
+            'rows_processed', 'rows_failed', 'throughput', 'eta_seconds', 'error', 'result',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
     password2 = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
@@ -105,6 +447,7 @@ class RegisterSerializer(serializers.ModelSerializer):
 
 
 class SearchSerializer(serializers.Serializer):
+    q = serializers.CharField(required=False)  # Free-text query, ranked by relevance
     name = serializers.CharField(required=False)
     employee_id = serializers.CharField(required=False)
     company = serializers.CharField(required=False)
@@ -112,5 +455,35 @@ class SearchSerializer(serializers.Serializer):
     role = serializers.CharField(required=False)
     start_date_from = serializers.DateField(required=False)
     start_date_to = serializers.DateField(required=False)
-    is_active = serializers.BooleanField(required=False)
+    # Query params are form data, where a missing boolean would otherwise mean False
+    is_active = serializers.BooleanField(required=False, allow_null=True, default=None)
+    # Match `name` and `company` approximately, most similar names first
+    fuzzy = serializers.BooleanField(required=False, default=False)
+
+
+
+class VerificationClaimSerializer(serializers.Serializer):
+    """
+    One employment claim. Only the fields present are checked; a null
+    `end_date` claims the employment is current.
+    """
+    reference = serializers.CharField(required=False, allow_blank=True)  # Echoed back to the caller
+    name = serializers.CharField(required=False)
+    employee_id = serializers.CharField(required=False)
+    company = serializers.CharField(required=False)
+    department = serializers.CharField(required=False)
+    role = serializers.CharField(required=False)
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False, allow_null=True)
+
+    def validate(self, data):
+        if not data.get('name') and not data.get('employee_id'):
+            raise serializers.ValidationError('Provide a name or an employee_id.')
+        return data
+
 
+class VerificationBatchSerializer(serializers.Serializer):
+    # The size limit is checked before any claim is validated
+    claims = VerificationClaimSerializer(
+        many=True, allow_empty=False, max_length=getattr(settings, 'VERIFY_BATCH_MAX_CLAIMS', 5000)
+    )
@@ -0,0 +1,85 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .caching import invalidate_models
+from .dashboard import adjust_counters
+from .fuzzy import remove_names, update_names
+from .models import Company, Employee, EmploymentHistory
+from .records import refresh_company_records, refresh_records
+
+
+def adjust_employee_count(company_id, delta):
+    # Clamp at zero so a drifted count can never block an employee delete
+    Company.objects.filter(pk=company_id).update(
+        employee_count=Greatest(F('employee_count') + delta, 0)
+    )
+    invalidate_models('company')
+
+
+@receiver(post_save, sender=Employee)
+def employee_saved(sender, instance, created, raw=False, **kwargs):
+    """
+    Record a history row when an employee is created or their position
+    changes, and keep company headcounts and dashboard counters in step.
+    """
+    if raw:
+        return
+    previous = getattr(instance, '_history_state', None)
+    state = instance.history_state()
+    if created or state != previous:
+        EmploymentHistory.objects.record([instance])
+
+    if created:
+        adjust_employee_count(instance.company_id, 1)
+        adjust_counters(employees=1, active_employees=int(instance.is_active))
+    elif previous is not None:
+        if previous['company_id'] != instance.company_id:
+            # Transfer between companies
+            adjust_employee_count(previous['company_id'], -1)
+            adjust_employee_count(instance.company_id, 1)
+            adjust_counters()
+        if (previous['end_date'] is None) != instance.is_active:
+            adjust_counters(active_employees=1 if instance.is_active else -1)
+    instance._history_state = state
+    refresh_records([instance.pk])
+    invalidate_models('employee', 'employmenthistory')
+    update_names('employee', [(instance.pk, instance.name)])
+
+
+@receiver(post_delete, sender=Employee)
+def employee_deleted(sender, instance, origin=None, **kwargs):
+    # bulk_delete_employees adjusts counts for the whole queryset at once
+    if getattr(origin, 'aggregate_bookkeeping', False):
+        return
+    adjust_employee_count(instance.company_id, -1)
+    adjust_counters(employees=-1, active_employees=-int(instance.is_active))
+    invalidate_models('employee', 'employmenthistory')
+    remove_names('employee', [instance.pk])
+
+
+@receiver(post_save, sender=Company)
+def company_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        adjust_counters(companies=1)
+    else:
+        # Company details appear in the top companies list
+        adjust_counters()
+        # Verification records inline the names of current and past employers
+        if instance.name != getattr(instance, '_loaded_name', None):
+            refresh_company_records([instance.pk])
+    instance._loaded_name = instance.name
+    invalidate_models('company')
+    update_names('company', [(instance.pk, instance.name)])
+
+
+@receiver(post_delete, sender=Company)
+def company_deleted(sender, instance, origin=None, **kwargs):
+    # clear_seeded rebuilds the counters once for the whole queryset
+    if getattr(origin, 'aggregate_bookkeeping', False):
+        return
+    adjust_counters(companies=-1)
+    invalidate_models('company')
+    remove_names('company', [instance.pk])
@@ -0,0 +1,727 @@
+import csv
+import io
+import shutil
+import tempfile
+from datetime import date, datetime, timezone
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from .archive import archive_audit_logs
+from .dashboard import get_counters, rebuild_counters
+from .fuzzy import build_index
+from .importers import EmployeeImporter
+from .management.commands.benchmark_serialization import SERIALIZERS, field_selections
+from .models import (
+    AuditLog, AuditLogArchive, Company, Employee, EmploymentHistory, ImportJob, VerificationRecord,
+)
+
+# Path, query parameters and queries per request: the caller's access, the
+# count and the page, plus the savepoint, insert and release of the audit entry
+# on the audited endpoints
+AUDIT_QUERIES = 3
+LIST_ENDPOINTS = (
+    ('/api/companies/', {}, 3 + AUDIT_QUERIES),
+    ('/api/employees/', {}, 3 + AUDIT_QUERIES),
+    ('/api/employment-history/', {}, 3),
+    ('/api/audit-logs/', {}, 3),
+    ('/api/verification-records/', {}, 3),
+    ('/api/import-jobs/', {}, 3),
+    ('/api/user-profiles/', {}, 3),
+    ('/api/search/', {'department': 'Engineering'}, 3),
+)
+
+
+# Audit entries written on commit, where tests can see them, instead of from
+# the background thread
+SYNC_AUDIT_LOG = {'ASYNC': False}
+
+
+def create_user(username, role='admin', company=None):
+    user = User.objects.create_user(username)
+    user.profile.role = role
+    user.profile.company = company
+    user.profile.save()
+    return user
+
+
+@override_settings(RESPONSE_CACHE_TTL=0, AUDIT_LOG=SYNC_AUDIT_LOG)
+class ListQueryCountTests(APITestCase):
+    """Related rows are loaded up front, so queries do not grow with the page size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_data', companies=3, employees=60, history=20, audit_logs=60, stdout=io.StringIO()
+        )
+        cls.admin = create_user('admin')
+        for number in range(5):
+            create_user(f'user-{number}', role='regular_user')
+            ImportJob.objects.create(
+                kind=ImportJob.KIND_EMPLOYEE, original_name=f'{number}.csv', created_by=cls.admin
+            )
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def assertConstantQueries(self, path, queries, **params):
+        # Warm up per-process state such as the search backend
+        self.client.get(path, params)
+        for page_size in (3, 50):
+            with self.subTest(path=path, page_size=page_size, **params):
+                # Including the audit entry, written once the request commits
+                with self.assertNumQueries(queries), self.captureOnCommitCallbacks(execute=True):
+                    response = self.client.get(path, {**params, 'page_size': page_size})
+                self.assertEqual(response.status_code, 200)
+                results = response.data['results']
+                if 'count' in response.data:
+                    self.assertEqual(len(results), min(page_size, response.data['count']))
+                else:
+                    self.assertEqual(len(results), page_size)
+
+    def test_list_endpoints(self):
+        for path, params, queries in LIST_ENDPOINTS:
+            self.assertConstantQueries(path, queries, **params)
+
+    def test_keyset_pagination(self):
+        # No count query
+        self.assertConstantQueries('/api/employees/', 2 + AUDIT_QUERIES, pagination='keyset')
+
+
+@override_settings(RESPONSE_CACHE_TTL=0, AUDIT_LOG=SYNC_AUDIT_LOG)
+class CompanyScopeTests(APITestCase):
+    """Users other than admins only see employees of their own company."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', companies=2, employees=20, history=0, audit_logs=0, stdout=io.StringIO())
+        cls.company = Company.objects.order_by('pk').first()
+
+    def get_employee_ids(self, user, path):
+        self.client.force_authenticate(user)
+        response = self.client.get(path, {'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        return {row['employee_id'] for row in response.data['results']}
+
+    def test_scoped_roles(self):
+        own = set(self.company.employees.values_list('employee_id', flat=True))
+        self.assertLess(len(own), Employee.objects.count())
+        for role in ('company_manager', 'hr_staff', 'regular_user'):
+            user = create_user(role, role=role, company=self.company)
+            for path in ('/api/employees/', '/api/search/'):
+                with self.subTest(role=role, path=path):
+                    self.assertEqual(self.get_employee_ids(user, path), own)
+
+    def test_user_without_company(self):
+        user = create_user('unassigned', role='regular_user')
+        for path in ('/api/employees/', '/api/search/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.get_employee_ids(user, path), set())
+
+
+@override_settings(RESPONSE_CACHE_TTL=0, AUDIT_LOG=SYNC_AUDIT_LOG)
+class FastListParityTests(APITestCase):
+    """Lists served from .values() rows render the same bytes as the serializers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', companies=3, employees=40, history=20, audit_logs=30, stdout=io.StringIO())
+        cls.admin = create_user('admin')
+        AuditLog.objects.create(action='login', entity_type='user', entity_id='1', details={'ok': True})
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def assertSameContent(self, path, params):
+        with self.subTest(path=path, **params):
+            with override_settings(FAST_LIST_SERIALIZATION=False):
+                expected = self.client.get(path, params)
+            response = self.client.get(path, params)
+            self.assertEqual(expected.status_code, 200)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, expected.content)
+
+    def test_list_endpoints(self):
+        paths = {label: f'/api/{label}/' for label in SERIALIZERS}
+        paths['search'] = '/api/search/'
+        for label, path in paths.items():
+            serializer_class = SERIALIZERS.get(label, SERIALIZERS['employees'])
+            for selection in field_selections(serializer_class):
+                for pagination in ({'page_size': 100}, {'page_size': 10, 'pagination': 'keyset'}):
+                    self.assertSameContent(path, {**selection, **pagination})
+
+
+def create_company(name, **fields):
+    return Company.objects.create(
+        name=name, registration_number=fields.pop('registration_number', name.upper()),
+        registration_date='2020-01-01', address='1 Main St', contact_person='Pat',
+        phone='555-0100', email='info@example.com', **fields
+    )
+
+
+def upload_file(name, rows):
+    """Write `rows` (header first) as a CSV or Excel upload named `name`."""
+    if name.endswith('.xlsx'):
+        from openpyxl import Workbook
+        workbook = Workbook()
+        for row in rows:
+            workbook.active.append(row)
+        content = io.BytesIO()
+        workbook.save(content)
+        return SimpleUploadedFile(name, content.getvalue())
+    content = io.StringIO()
+    csv.writer(content).writerows(rows)
+    return SimpleUploadedFile(name, content.getvalue().encode())
+
+
+COMPANY_COLUMNS = [
+    'name', 'registration_number', 'registration_date', 'address', 'contact_person',
+    'departments', 'phone', 'email',
+]
+EMPLOYEE_COLUMNS = ['name', 'employee_id', 'company', 'company_id', 'department', 'role', 'start_date', 'end_date']
+
+
+@override_settings(RESPONSE_CACHE_TTL=0, AUDIT_LOG=SYNC_AUDIT_LOG)
+class BulkUploadTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.acme = create_company('Acme')
+        cls.globex = create_company('Globex')
+        cls.admin = create_user('admin')
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def upload(self, path, name, rows, **params):
+        query = ''.join(f'&{key}={value}' for key, value in params.items())
+        return self.client.post(f'{path}?{query[1:]}', {'file': upload_file(name, rows)}, format='multipart')
+
+    def test_excel_numeric_columns(self):
+        # Blanks in a numeric column would make pandas infer float64
+        response = self.upload('/api/employees/bulk_upload/', 'employees.xlsx', [
+            EMPLOYEE_COLUMNS,
+            ['Ann Lee', 1002, None, self.acme.pk, 'Sales', 'Rep', '2021-01-01', None],
+            ['Bo Chen', 1003, 'Globex', None, 'Sales', 'Rep', '2021-01-01', None],
+            ['No Id', None, 'Globex', None, 'Sales', 'Rep', '2021-01-01', None],
+        ])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['stats']['rows'], 2)
+        self.assertEqual(response.data['stats']['rows_failed'], 1)
+        self.assertEqual(
+            dict(Employee.objects.values_list('employee_id', 'company__name')),
+            {'1002': 'Acme', '1003': 'Globex'},
+        )
+
+    def test_company_rows_are_validated(self):
+        response = self.upload('/api/companies/bulk_upload/', 'companies.csv', [
+            COMPANY_COLUMNS,
+            ['Initech', 'INITECH', '2020-02-01', '1 Main St', 'Pat', 'Sales, Support', '555-0100', 'a@initech.com'],
+            ['Hooli', 'HOOLI', 'yesterday', '1 Main St', 'Pat', '', '555-0100', 'a@hooli.com'],
+            ['Umbrella', 'UMBRELLA', '2020-02-01', '1 Main St', 'Pat', '', '555-0100', 'not an email'],
+            ['Initech', 'INITECH', '2020-02-01', '1 Main St', 'Pat', '', '555-0100', 'a@initech.com'],
+            ['Acme', 'ACME', '2020-02-01', '1 Main St', 'Pat', '', '555-0100', 'a@acme.com'],
+        ])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['stats']['rows'], 1)
+        self.assertEqual(response.data['errors'], [
+            {'row': 3, 'field': 'registration_date', 'message': 'Enter a valid date.'},
+            {'row': 4, 'field': 'email', 'message': 'Enter a valid email address.'},
+            {'row': 5, 'field': 'registration_number', 'message': 'Duplicate value in file.'},
+            {'row': 6, 'field': 'registration_number', 'message': 'Already exists.'},
+        ])
+        self.assertEqual(Company.objects.get(registration_number='INITECH').departments, ['Sales', 'Support'])
+
+    def test_chunked_import(self):
+        rows = [
+            EMPLOYEE_COLUMNS,
+            ['Ann Lee', 'E1', 'Acme', None, 'Sales', 'Rep', '2021-01-01', None],
+            ['Bo Chen', 'E2', None, self.acme.pk, 'Sales', 'Rep', '2021-01-01', '2022-01-01'],
+            ['Cy Diaz', 'E3', 'Acme', None, 'Sales', 'Rep', '2021-13-01', None],
+            ['Di Ross', 'E4', 'Globex', None, 'Sales', 'Rep', '2021-01-01', '2020-01-01'],
+            ['Ed Wong', 'E1', 'Globex', None, 'Sales', 'Rep', '2021-01-01', None],
+            ['Fay Kim', 'E5', 'Globex', None, 'Sales', 'Rep', '2021-01-01', None],
+            ['Gus Poe', 'E6', 'Nowhere', None, 'Sales', 'Rep', '2021-01-01', None],
+        ]
+        for name in ('employees.csv', 'employees.xlsx'):
+            with self.subTest(name=name):
+                Employee.objects.all().delete()
+                stats = EmployeeImporter(chunk_size=2).run(upload_file(name, rows))
+                self.assertEqual((stats['rows'], stats['rows_failed']), (3, 4))
+                # Row numbers count from the top of the file, whatever the chunk
+                self.assertEqual(stats['errors'], [
+                    {'row': 4, 'field': 'start_date', 'message': 'Enter a valid date.'},
+                    {'row': 5, 'field': 'end_date', 'message': 'End date cannot be before start date.'},
+                    {'row': 6, 'field': 'employee_id', 'message': 'Duplicate value in file.'},
+                    {'row': 8, 'field': 'company', 'message': 'Company not found.'},
+                ])
+                self.assertEqual(
+                    dict(Employee.objects.values_list('employee_id', 'company__name')),
+                    {'E1': 'Acme', 'E2': 'Acme', 'E5': 'Globex'},
+                )
+                self.assertEqual(EmploymentHistory.objects.count(), 3)
+                self.assertEqual(
+                    dict(Company.objects.values_list('name', 'employee_count')), {'Acme': 2, 'Globex': 1}
+                )
+
+    def test_upsert(self):
+        Employee.objects.create(
+            name='Ann Lee', employee_id='E1', company=self.acme, department='Sales', role='Rep',
+            start_date='2021-01-01',
+        )
+        Employee.objects.create(
+            name='Bo Chen', employee_id='E2', company=self.acme, department='Sales', role='Rep',
+            start_date='2021-01-01',
+        )
+        rows = [
+            EMPLOYEE_COLUMNS,
+            ['Ann Lee', 'E1', 'Acme', None, 'Sales', 'Lead', '2023-01-01', None],
+            ['Bo Chen', 'E2', 'Acme', None, 'Sales', 'Rep', '2021-01-01', None],
+            ['Cy Diaz', 'E3', 'Globex', None, 'Sales', 'Rep', '2021-01-01', None],
+        ]
+        response = self.upload('/api/employees/bulk_upload/', 'employees.csv', rows)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual([error['message'] for error in response.data['errors']], ['Already exists.'] * 2)
+
+        Employee.objects.filter(employee_id='E3').delete()
+        response = self.upload('/api/employees/bulk_upload/', 'employees.csv', rows, mode='upsert')
+        self.assertEqual(response.status_code, 200, response.data)
+        stats = response.data['stats']
+        self.assertEqual((stats['inserted'], stats['updated'], stats['unchanged']), (1, 1, 1))
+        self.assertEqual(response.data['message'], '1 employees created, 1 updated, 1 unchanged')
+        history = EmploymentHistory.objects.filter(employee__employee_id='E1').order_by('id')
+        self.assertEqual(
+            list(history.values_list('role', 'end_date')), [('Rep', date(2023, 1, 1)), ('Lead', None)]
+        )
+        self.assertEqual(dict(Company.objects.values_list('name', 'employee_count')), {'Acme': 2, 'Globex': 1})
+
+        response = self.upload('/api/companies/bulk_upload/', 'companies.csv', [
+            COMPANY_COLUMNS,
+            ['Acme', 'ACME', '2020-01-01', '2 Side St', 'Pat', '', '555-0100', 'info@example.com'],
+        ], mode='upsert')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['stats']['updated'], 1)
+        self.assertEqual(Company.objects.get(pk=self.acme.pk).address, '2 Side St')
+
+    def test_company_scope(self):
+        Employee.objects.create(
+            name='Bo Chen', employee_id='G1', company=self.globex, department='Sales', role='Rep',
+            start_date='2021-01-01',
+        )
+        self.client.force_authenticate(create_user('acme-hr', role='hr_staff', company=self.acme))
+        response = self.upload('/api/employees/bulk_upload/', 'employees.csv', [
+            EMPLOYEE_COLUMNS,
+            ['Ann Lee', 'E1', 'Acme', None, 'Sales', 'Rep', '2021-01-01', None],
+            ['Bo Chen', 'G1', 'Acme', None, 'Sales', 'Rep', '2021-01-01', None],
+            ['Cy Diaz', 'E3', 'Globex', None, 'Sales', 'Rep', '2021-01-01', None],
+        ], mode='upsert')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['errors'], [
+            {'row': 3, 'field': 'employee_id', 'message': 'Belongs to another company.'},
+            {'row': 4, 'field': 'company', 'message': 'You can only import employees of your own company.'},
+        ])
+        self.assertEqual(
+            dict(Employee.objects.values_list('employee_id', 'company__name')), {'E1': 'Acme', 'G1': 'Globex'}
+        )
+
+        self.client.force_authenticate(create_user('unlinked-hr', role='hr_staff'))
+        response = self.upload('/api/employees/bulk_upload/', 'employees.csv', [EMPLOYEE_COLUMNS])
+        self.assertEqual(response.status_code, 403)
+
+    def test_fuzzy_company_names(self):
+        initech = create_company('Initech Solutions')
+        # Index updates wait for a commit, which test transactions never make
+        build_index('company')
+        rows = [
+            EMPLOYEE_COLUMNS,
+            ['Ann Lee', 'E1', 'Initech Solutions Inc', None, 'Sales', 'Rep', '2021-01-01', None],
+            ['Bo Chen', 'E2', 'Globex', None, 'Sales', 'Rep', '2021-01-01', None],
+        ]
+        response = self.upload('/api/employees/bulk_upload/', 'employees.csv', rows)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            response.data['errors'], [{'row': 2, 'field': 'company', 'message': 'Company not found.'}]
+        )
+        self.assertEqual(response.data['stats']['fuzzy_companies'], [])
+
+        rows[2][1] = 'E3'
+        response = self.upload('/api/employees/bulk_upload/', 'employees.csv', rows, fuzzy_companies='true')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['stats']['fuzzy_companies'], [{
+            'row': 2, 'company': 'Initech Solutions Inc', 'matched': 'Initech Solutions',
+            'company_id': initech.pk,
+        }])
+        self.assertEqual(Employee.objects.get(employee_id='E1').company, initech)
+
+
+@override_settings(RESPONSE_CACHE_TTL=0, AUDIT_LOG=SYNC_AUDIT_LOG)
+class EmploymentHistoryTests(APITestCase):
+    """One row per position: date changes update it, new positions close it."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.acme = create_company('Acme')
+        cls.admin = create_user('admin')
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+        self.employee = Employee.objects.create(
+            name='Ann Lee', employee_id='E1', company=self.acme, department='Engineering',
+            role='Dev', start_date='2021-01-01',
+        )
+
+    def get_history(self):
+        return list(
+            EmploymentHistory.objects.filter(employee=self.employee)
+            .order_by('id').values_list('role', 'start_date', 'end_date')
+        )
+
+    def test_date_changes_update_the_position(self):
+        self.assertEqual(self.get_history(), [('Dev', date(2021, 1, 1), None)])
+        response = self.client.patch(f'/api/employees/{self.employee.pk}/', {'end_date': '2024-05-31'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_history(), [('Dev', date(2021, 1, 1), date(2024, 5, 31))])
+
+        response = self.client.post('/api/employees/bulk_update/', {
+            'ids': [self.employee.pk], 'changes': {'end_date': '2024-06-30'},
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_history(), [('Dev', date(2021, 1, 1), date(2024, 6, 30))])
+
+        history = self.client.get('/api/verification-records/E1/').data['history']
+        self.assertEqual([(row['role'], row['end_date']) for row in history], [('Dev', '2024-06-30')])
+
+    def test_new_position_closes_the_previous_one(self):
+        response = self.client.patch(
+            f'/api/employees/{self.employee.pk}/', {'role': 'Lead', 'start_date': '2023-03-01'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_history(), [
+            ('Dev', date(2021, 1, 1), date(2023, 3, 1)),
+            ('Lead', date(2023, 3, 1), None),
+        ])
+        # Saving again without changes records nothing
+        Employee.objects.get(pk=self.employee.pk).save()
+        self.assertEqual(len(self.get_history()), 2)
+
+
+@override_settings(RESPONSE_CACHE_TTL=0, AUDIT_LOG=SYNC_AUDIT_LOG)
+class BulkEmployeeTests(APITestCase):
+    """Bulk updates and deletes keep history, headcounts and counters in step."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.acme = create_company('Acme')
+        cls.globex = create_company('Globex')
+        cls.admin = create_user('admin')
+        for number in range(6):
+            Employee.objects.create(
+                name=f'Employee {number}', employee_id=f'E{number}',
+                company=cls.acme if number < 4 else cls.globex,
+                department='Sales' if number % 2 else 'Engineering', role='Rep', start_date='2021-01-01',
+            )
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def post(self, action, data):
+        response = self.client.post(f'/api/employees/{action}/', data, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def get_headcounts(self):
+        return dict(Company.objects.values_list('name', 'employee_count'))
+
+    def assertCountersExact(self):
+        self.assertEqual(get_counters(), rebuild_counters())
+
+    def test_bulk_update_ends_positions(self):
+        data = self.post('bulk_update', {'filter': {'department': 'Sales'}, 'changes': {'end_date': '2024-05-31'}})
+        self.assertEqual(data, {'matched': 3, 'updated': 3})
+        laid_off = EmploymentHistory.objects.filter(employee__department='Sales')
+        self.assertEqual(
+            list(laid_off.values_list('end_date', flat=True)), [date(2024, 5, 31)] * 3
+        )
+        self.assertEqual(get_counters()['active_employees'], 3)
+        self.assertCountersExact()
+
+    def test_bulk_update_moves_employees(self):
+        data = self.post('bulk_update', {'filter': {'company': self.acme.pk}, 'changes': {'company': self.globex.pk}})
+        self.assertEqual(data['updated'], 4)
+        self.assertEqual(self.get_headcounts(), {'Acme': 0, 'Globex': 6})
+        self.assertEqual(EmploymentHistory.objects.filter(company=self.acme, end_date__isnull=True).count(), 0)
+        self.assertEqual(EmploymentHistory.objects.filter(company=self.globex, end_date__isnull=True).count(), 6)
+        self.assertCountersExact()
+
+    def test_bulk_delete(self):
+        data = self.post('bulk_delete', {'filter': {'company': self.acme.pk, 'department': 'Sales'}})
+        self.assertEqual(data, {'deleted': 2})
+        self.assertEqual(self.get_headcounts(), {'Acme': 2, 'Globex': 2})
+        self.assertEqual(EmploymentHistory.objects.count(), 4)
+        self.assertEqual(VerificationRecord.objects.count(), 4)
+        self.assertEqual(get_counters()['employees'], 4)
+        self.assertCountersExact()
+
+
+@override_settings(RESPONSE_CACHE_TTL=0, AUDIT_LOG=SYNC_AUDIT_LOG)
+class VerifyBatchTests(APITestCase):
+    """Claims only verify against the records the caller may see."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.acme = create_company('Acme')
+        cls.globex = create_company('Globex')
+        Employee.objects.create(
+            name='Alice Smith', employee_id='A-1', company=cls.acme, department='Engineering',
+            role='Dev', start_date='2021-01-01',
+        )
+        # Index updates wait for a commit, which test transactions never make
+        build_index('employee')
+
+    def verify(self, user, *claims):
+        self.client.force_authenticate(user)
+        response = self.client.post('/api/verify/batch/', {'claims': claims}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['results']
+
+    def test_match(self):
+        [result] = self.verify(create_user('admin'), {'name': 'Alice Smith', 'employee_id': 'A-1', 'company': 'Acme'})
+        self.assertEqual(result['status'], 'match')
+        self.assertEqual(result['employee']['employee_id'], 'A-1')
+
+    def test_unknown_employee_id(self):
+        [result] = self.verify(create_user('admin'), {'name': 'Alice Smith', 'employee_id': 'FAKE-999', 'company': 'Acme'})
+        self.assertEqual(result['status'], 'mismatch')
+        self.assertEqual(result['matched_by'], 'name')
+        self.assertEqual(result['mismatches'], ['employee_id'])
+
+    def test_other_company(self):
+        user = create_user('globex-user', role='regular_user', company=self.globex)
+        results = self.verify(
+            user,
+            {'name': 'Alice Smith', 'employee_id': 'A-1'},
+            {'name': 'Alice Smith'},
+            {'name': 'Alice Smiths'},
+        )
+        self.assertEqual([result['status'] for result in results], ['not_found'] * 3)
+        self.assertNotIn('employee', str(results))
+
+        manager = create_user('acme-manager', role='company_manager', company=self.acme)
+        [result] = self.verify(manager, {'name': 'Alice Smiths'})
+        self.assertEqual((result['status'], result['matched_by']), ('mismatch', 'similar_name'))
+
+
+@override_settings(RESPONSE_CACHE_TTL=0, AUDIT_LOG=SYNC_AUDIT_LOG)
+class AuditLogArchiveTests(APITestCase):
+    """Date-range queries page through live rows and archive files as one list."""
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user('admin')
+        # Two entries a month from January to May; the first three months are archived
+        for month in range(1, 6):
+            for day, entity_type in ((5, 'company'), (20, 'employee')):
+                AuditLog.objects.create(
+                    user=cls.admin, action='view', entity_type=entity_type,
+                    timestamp=datetime(2024, month, day, tzinfo=timezone.utc),
+                )
+        cls.ids = list(AuditLog.objects.order_by('-timestamp').values_list('id', flat=True))
+        archive_audit_logs(datetime(2024, 4, 1, tzinfo=timezone.utc))
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def get_all(self, **params):
+        """Follow the next links from the first page and return every entry id."""
+        ids, url, params = [], '/api/audit-logs/', {'from': '2024-01-01', 'page_size': 3, **params}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            ids += [entry['id'] for entry in response.data['results']]
+            url, params = response.data['next'], None
+        return ids
+
+    def test_archived(self):
+        self.assertEqual(AuditLog.objects.count(), 4)
+        self.assertEqual(
+            list(AuditLogArchive.objects.order_by('month').values_list('month', 'rows')),
+            [(date(2024, 1, 1), 2), (date(2024, 2, 1), 2), (date(2024, 3, 1), 2)],
+        )
+        # Without a date range only the live rows are listed
+        response = self.client.get('/api/audit-logs/')
+        self.assertEqual(response.data['count'], 4)
+
+    def test_page_numbers(self):
+        response = self.client.get('/api/audit-logs/', {'from': '2024-01-01', 'page_size': 3})
+        self.assertEqual(response.data['count'], 10)
+        self.assertEqual(self.get_all(), self.ids)
+        self.assertEqual(self.get_all(ordering='timestamp'), self.ids[::-1])
+        self.assertEqual(self.get_all(to='2024-02-29'), self.ids[6:])
+
+    def test_keyset(self):
+        self.assertEqual(self.get_all(pagination='keyset'), self.ids)
+        self.assertEqual(self.get_all(pagination='keyset', ordering='timestamp'), self.ids[::-1])
+
+    def test_filters(self):
+        self.assertEqual(self.get_all(entity_type='company'), self.ids[1::2])
+        self.assertEqual(self.get_all(entity_type='company', pagination='keyset'), self.ids[1::2])
+
+
+@override_settings(
+    RESPONSE_CACHE_TTL=60, AUDIT_LOG=SYNC_AUDIT_LOG,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class ResponseCacheTests(APITestCase):
+    """Cached responses are per scope and stop being served once a write commits."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.acme = create_company('Acme')
+        cls.globex = create_company('Globex')
+        cls.admin = create_user('admin')
+        cls.employee = Employee.objects.create(
+            name='Ann Lee', employee_id='E1', company=cls.acme, department='Sales', role='Rep',
+            start_date='2021-01-01',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.admin)
+
+    def get(self, path, expected_cache, **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], expected_cache)
+        return response.data
+
+    def write(self, method, path, data):
+        # Versions are bumped once the write commits
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(path, data, format='json')
+        self.assertIn(response.status_code, (200, 201), response.data)
+        return response
+
+    def test_writes_invalidate(self):
+        detail = f'/api/employees/{self.employee.pk}/'
+        for path in ('/api/employees/', detail, '/api/employment-history/', '/api/search/'):
+            self.get(path, 'MISS')
+            self.get(path, 'HIT')
+
+        self.write('patch', detail, {'role': 'Lead'})
+        self.assertEqual(self.get(detail, 'MISS')['role'], 'Lead')
+        self.assertEqual(self.get('/api/employees/', 'MISS')['results'][0]['role'], 'Lead')
+        self.assertEqual(len(self.get('/api/employment-history/', 'MISS')['results']), 2)
+        self.get('/api/search/', 'MISS')
+
+    def test_company_changes_invalidate_employees(self):
+        self.get('/api/employees/', 'MISS')
+        self.get('/api/companies/', 'MISS')
+        self.write('patch', f'/api/companies/{self.acme.pk}/', {'name': 'Acme Corp'})
+        self.assertEqual(self.get('/api/employees/', 'MISS')['results'][0]['company_name'], 'Acme Corp')
+
+        # A new employee changes the company's headcount
+        self.get('/api/companies/', 'MISS')
+        self.write('post', '/api/employees/', {
+            'name': 'Bo Chen', 'employee_id': 'E2', 'company': self.globex.pk,
+            'department': 'Sales', 'role': 'Rep', 'start_date': '2021-01-01',
+        })
+        companies = self.get('/api/companies/', 'MISS', ordering='name')['results']
+        self.assertEqual([company['employee_count'] for company in companies], [1, 1])
+
+    def test_bulk_upload_invalidates(self):
+        self.get('/api/employees/', 'MISS')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/employees/bulk_upload/', {'file': upload_file('employees.csv', [
+                EMPLOYEE_COLUMNS, ['Bo Chen', 'E2', 'Globex', None, 'Sales', 'Rep', '2021-01-01', None],
+            ])}, format='multipart')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.get('/api/employees/', 'MISS')['count'], 2)
+
+    def test_scopes_are_cached_apart(self):
+        self.assertEqual(self.get('/api/employees/', 'MISS')['count'], 1)
+        self.client.force_authenticate(create_user('globex-user', role='regular_user', company=self.globex))
+        self.assertEqual(self.get('/api/employees/', 'MISS')['count'], 0)
+        self.assertEqual(self.get('/api/employees/', 'HIT')['count'], 0)
+
+
+@override_settings(RESPONSE_CACHE_TTL=0, AUDIT_LOG=SYNC_AUDIT_LOG)
+class VerificationRecordTests(APITestCase):
+    """Records follow employee, history and company writes, and can be rebuilt in bulk."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.acme = create_company('Acme')
+        cls.globex = create_company('Globex')
+        cls.admin = create_user('admin')
+        for number in range(3):
+            Employee.objects.create(
+                name=f'Employee {number}', employee_id=f'E{number}', company=cls.acme,
+                department='Sales', role='Rep', start_date='2021-01-01',
+            )
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def get_record(self, employee_id='E0'):
+        response = self.client.get(f'/api/verification-records/{employee_id}/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def get_records(self):
+        return list(
+            VerificationRecord.objects.order_by('employee_number')
+            .values_list('employee_number', 'company_name', 'role', 'history')
+        )
+
+    def test_follows_writes(self):
+        employee = Employee.objects.get(employee_id='E0')
+        response = self.client.patch(
+            f'/api/employees/{employee.pk}/', {'role': 'Lead', 'start_date': '2023-01-01'}
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.patch(f'/api/companies/{self.acme.pk}/', {'name': 'Acme Corp'})
+        self.assertEqual(response.status_code, 200)
+
+        record = self.get_record()
+        self.assertEqual((record['company_name'], record['role']), ('Acme Corp', 'Lead'))
+        history = [(entry['company'], entry['role'], entry['end_date']) for entry in record['history']]
+        self.assertEqual(history, [('Acme Corp', 'Lead', None), ('Acme Corp', 'Rep', '2023-01-01')])
+        self.assertEqual(self.get_record('E1')['company_name'], 'Acme Corp')
+
+    def test_rebuild(self):
+        expected = self.get_records()
+        # Writes that bypass the signals leave the records behind
+        Employee.objects.filter(employee_id='E1').update(role='Lead')
+        Company.objects.filter(pk=self.acme.pk).update(name='Acme Corp')
+        VerificationRecord.objects.filter(employee__employee_id='E2').delete()
+
+        output = io.StringIO()
+        call_command('rebuild_verification_records', stdout=output)
+        self.assertIn('Rebuilt 3 verification records.', output.getvalue())
+        self.assertEqual(self.get_records(), [
+            (employee_id, 'Acme Corp', 'Lead' if employee_id == 'E1' else role,
+             [{**entry, 'company': 'Acme Corp'} for entry in history])
+            for employee_id, _, role, history in expected
+        ])
+
+    def test_lookup(self):
+        # A missing record is built on first lookup
+        VerificationRecord.objects.all().delete()
+        self.assertEqual(self.get_record('E2')['name'], 'Employee 2')
+        self.assertEqual(VerificationRecord.objects.count(), 1)
+
+        response = self.client.get('/api/verification-records/unknown/')
+        self.assertEqual(response.status_code, 404)
+        self.client.force_authenticate(create_user('globex-user', role='regular_user', company=self.globex))
+        response = self.client.get('/api/verification-records/E0/')
+        self.assertEqual(response.status_code, 404)
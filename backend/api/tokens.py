@@ -0,0 +1,39 @@
+"""
+JWT tokens carrying the user's role and company.
+
+Access tokens issued through `/api/auth/token/` and `/api/auth/token/refresh/`
+include `role` and `company_id` claims read from the user's profile when the
+token is minted, so permission checks need no database lookup (see
+`api.permissions.get_access`). A profile change takes effect with the next
+access token, i.e. within `ACCESS_TOKEN_LIFETIME`.
+"""
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import UserProfile
+
+ROLE_CLAIM = 'role'
+COMPANY_CLAIM = 'company_id'
+
+
+class ProfileRefreshToken(RefreshToken):
+    @property
+    def access_token(self):
+        access = super().access_token
+        # Read on every mint rather than copied from the refresh token, so
+        # refreshed access tokens pick up profile changes
+        profile = UserProfile.objects.filter(
+            user_id=self.payload[api_settings.USER_ID_CLAIM]
+        ).values_list('role', 'company_id').first()
+        if profile is not None:
+            access[ROLE_CLAIM], access[COMPANY_CLAIM] = profile
+        return access
+
+
+class ProfileTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = ProfileRefreshToken
+
+
+class ProfileTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = ProfileRefreshToken
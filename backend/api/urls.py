@@ -2,21 +2,26 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     CompanyViewSet, EmployeeViewSet, EmploymentHistoryViewSet,
-    UserProfileViewSet, AuditLogViewSet, RegisterView, SearchView,
-    DashboardView
+    VerificationRecordViewSet, UserProfileViewSet, AuditLogViewSet, ImportJobViewSet, RegisterView, SearchView,
+    SearchExportView, VerifyBatchView, DashboardView, MetricsView
 )
 
 router = DefaultRouter()
 router.register(r'companies', CompanyViewSet)
 router.register(r'employees', EmployeeViewSet)
 router.register(r'employment-history', EmploymentHistoryViewSet)
+router.register(r'verification-records', VerificationRecordViewSet)
 router.register(r'user-profiles', UserProfileViewSet)
 router.register(r'audit-logs', AuditLogViewSet)
+router.register(r'import-jobs', ImportJobViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
     path('register/', RegisterView.as_view(), name='register'),
     path('search/', SearchView.as_view(), name='search'),
+    path('search/export/', SearchExportView.as_view(), name='search-export'),
+    path('verify/batch/', VerifyBatchView.as_view(), name='verify-batch'),
     path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
 
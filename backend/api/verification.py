@@ -0,0 +1,229 @@
+"""
+Batch employment verification.
+
+`verify_claims` checks a list of employment claims with a fixed number of
+set-based queries, whatever the batch size:
+
+1. employees whose `employee_id` was claimed (`IN` lookups),
+2. for claims without a known `employee_id`, employees with the same name
+   (case and whitespace insensitive), or failing that the closest names in
+   the fuzzy employee name index,
+3. the employment history of every candidate, so claims about earlier
+   positions verify too, and the names of the companies involved.
+
+A claim with a null `end_date` claims current employment and is checked
+against the employee's current position only. Claimed company names match
+regardless of punctuation, or when the fuzzy company index resolves them to
+the position's company ("Tech Solutions Inc." for "Tech Solutions Inc").
+
+Each claim gets a verdict: `match`, `mismatch` (with the fields that differ
+from the closest position on record) or `not_found`. A claimed `employee_id`
+that differs from the matched employee's is a mismatch, so a made-up id does
+not verify through the name alone. Candidates are drawn from the `employees`
+queryset passed in, e.g. the employees of the caller's company.
+"""
+from collections import defaultdict
+
+from django.db.models.functions import Lower
+
+from .fuzzy import get_name_index, normalize_name
+from .models import Company, Employee, EmploymentHistory
+
+MATCH = 'match'
+MISMATCH = 'mismatch'
+NOT_FOUND = 'not_found'
+
+# Claim fields compared against a position, in reporting order
+CHECKED_FIELDS = ('company', 'department', 'role', 'start_date', 'end_date')
+TEXT_FIELDS = ('company', 'department', 'role')
+
+# Upper bound for values in a single IN clause
+LOOKUP_BATCH_SIZE = 2000
+
+# Names without an exact match are compared with the closest names on record
+FUZZY_NAME_SCORE = 0.6
+FUZZY_NAME_CANDIDATES = 3
+
+EMPLOYEE_FIELDS = (
+    'id', 'employee_id', 'name', 'company_id', 'company__name',
+    'department', 'role', 'start_date', 'end_date',
+)
+
+
+def normalize(value):
+    return ' '.join(str(value).split()).lower()
+
+
+def batched(values):
+    values = list(values)
+    for start in range(0, len(values), LOOKUP_BATCH_SIZE):
+        yield values[start:start + LOOKUP_BATCH_SIZE]
+
+
+def load_candidates(claims, employees):
+    """
+    Return `(by_employee_id, by_name, by_similar_name)` lookups of candidate
+    employees from the `employees` queryset.
+    """
+    by_employee_id = {}
+    employee_ids = {claim['employee_id'] for claim in claims if claim.get('employee_id')}
+    for batch in batched(employee_ids):
+        for employee in employees.filter(employee_id__in=batch).values(*EMPLOYEE_FIELDS):
+            by_employee_id[employee['employee_id']] = employee
+
+    by_name = defaultdict(list)
+    names = {
+        normalize(claim['name']) for claim in claims
+        if claim.get('name') and claim.get('employee_id') not in by_employee_id
+    }
+    for batch in batched(names):
+        named = (
+            employees.annotate(name_key=Lower('name'))
+            .filter(name_key__in=batch).values(*EMPLOYEE_FIELDS)
+        )
+        for employee in named:
+            by_name[normalize(employee['name'])].append(employee)
+
+    by_similar_name = {}
+    unmatched = names - by_name.keys()
+    if unmatched:
+        index = get_name_index('employee')
+        similar = {
+            name: index.search(name, limit=FUZZY_NAME_CANDIDATES, threshold=FUZZY_NAME_SCORE)
+            for name in unmatched
+        }
+        found = {}
+        for batch in batched({key for matches in similar.values() for key, _ in matches}):
+            found.update(
+                (employee['id'], employee)
+                for employee in employees.filter(id__in=batch).values(*EMPLOYEE_FIELDS)
+            )
+        for name, matches in similar.items():
+            by_similar_name[name] = [found[key] for key, _ in matches if key in found]
+    return by_employee_id, by_name, by_similar_name
+
+
+def load_positions(employees):
+    """
+    Map each employee pk to the positions on record (current and historical)
+    and return the company names they refer to.
+    """
+    positions = defaultdict(list)
+    company_names = {}
+    for employee in employees:
+        positions[employee['id']].append(employee)
+        company_names[employee['company_id']] = employee['company__name']
+
+    for batch in batched(positions):
+        history = EmploymentHistory.objects.filter(employee_id__in=batch).values(
+            'employee_id', 'company_id', 'department', 'role', 'start_date', 'end_date'
+        )
+        for position in history:
+            positions[position['employee_id']].append(position)
+
+    missing = {
+        position['company_id'] for entries in positions.values() for position in entries
+    } - company_names.keys()
+    for batch in batched(missing):
+        company_names.update(Company.objects.filter(id__in=batch).values_list('id', 'name'))
+    return positions, company_names
+
+
+def resolve_companies(claims):
+    """Map each claimed company name to the id of its best fuzzy match, or None."""
+    names = {claim['company'] for claim in claims if claim.get('company')}
+    if not names:
+        return {}
+    index = get_name_index('company')
+    return {name: index.best_match(name) for name in names}
+
+
+def compare(claim, position, company_names, company_ids=None):
+    """
+    Return the claimed fields that differ from `position`. `company_ids` maps
+    claimed company names to the companies they resolve to.
+    """
+    mismatches = []
+    for field in CHECKED_FIELDS:
+        if field not in claim:
+            continue
+        claimed = claim[field]
+        actual = company_names.get(position['company_id']) if field == 'company' else position[field]
+        if field == 'company':
+            equal = (
+                normalize_name(claimed) == normalize_name(actual or '')
+                or (company_ids or {}).get(claimed) == position['company_id']
+            )
+        elif field in TEXT_FIELDS:
+            equal = normalize(claimed) == normalize(actual or '')
+        else:
+            # A null end date claims the employment is current
+            equal = claimed == actual
+        if not equal:
+            mismatches.append(field)
+    return mismatches
+
+
+def verify_claims(claims, employees=None):
+    """
+    Return one verdict dict per claim, in order, matching claims against the
+    `employees` queryset (every employee by default).
+    """
+    if employees is None:
+        employees = Employee.objects.all()
+    by_employee_id, by_name, by_similar_name = load_candidates(claims, employees)
+    found = {employee['id']: employee for employee in by_employee_id.values()}
+    for candidates in (*by_name.values(), *by_similar_name.values()):
+        found.update((employee['id'], employee) for employee in candidates)
+    positions, company_names = load_positions(found.values())
+    company_ids = resolve_companies(claims)
+
+    results = []
+    for claim in claims:
+        employee = by_employee_id.get(claim.get('employee_id'))
+        if employee is not None:
+            matched_by, candidates = 'employee_id', [employee]
+        elif claim.get('name'):
+            name = normalize(claim['name'])
+            matched_by, candidates = 'name', by_name.get(name)
+            if not candidates:
+                matched_by, candidates = 'similar_name', by_similar_name.get(name, [])
+        else:
+            candidates = []
+
+        # Only the current position can back a claim of current employment
+        current_only = 'end_date' in claim and claim['end_date'] is None
+        best = None
+        for candidate in candidates:
+            mismatches = min(
+                (
+                    compare(claim, position, company_names, company_ids)
+                    for position in ([candidate] if current_only else positions[candidate['id']])
+                ),
+                key=len,
+            )
+            if claim.get('employee_id') and claim['employee_id'] != candidate['employee_id']:
+                mismatches.insert(0, 'employee_id')
+            if claim.get('name') and normalize(claim['name']) != normalize(candidate['name']):
+                mismatches.insert(0, 'name')
+            if best is None or len(mismatches) < len(best[1]):
+                best = (candidate, mismatches)
+
+        result = {'reference': claim['reference']} if 'reference' in claim else {}
+        if best is None:
+            result['status'] = NOT_FOUND
+        else:
+            candidate, mismatches = best
+            result.update(
+                status=MISMATCH if mismatches else MATCH,
+                matched_by=matched_by,
+                mismatches=mismatches,
+                employee={
+                    'id': candidate['id'],
+                    'employee_id': candidate['employee_id'],
+                    'name': candidate['name'],
+                    'company': candidate['company__name'],
+                },
+            )
+        results.append(result)
+    return results
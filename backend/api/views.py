@@ -1,32 +1,166 @@
-from rest_framework import viewsets, filters, status
+import time
+from datetime import datetime, timedelta
+from rest_framework import viewsets, filters, serializers, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
+from rest_framework.settings import api_settings
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404
 from django.db.models import Q
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.contrib.auth.models import User
-from .models import Company, Employee, EmploymentHistory, UserProfile, AuditLog
+from .models import (
+    Company, Employee, EmploymentHistory, UserProfile, AuditLog, AuditLogArchive, ImportJob,
+    VerificationRecord,
+)
 from .serializers import (
     CompanySerializer, EmployeeSerializer, EmploymentHistorySerializer,
     UserProfileSerializer, UserSerializer, AuditLogSerializer, RegisterSerializer,
-    SearchSerializer
+    SearchSerializer, ImportJobSerializer, VerificationBatchSerializer, VerificationRecordSerializer
+)
+from .permissions import get_access, get_company_scope, IsAdminUser, IsCompanyManagerOrReadOnly, IsHRStaffOrReadOnly
+from .importers import (
+    CompanyImporter, EmployeeImporter, ImportValidationError, SUPPORTED_EXTENSIONS
 )
-from .permissions import IsAdminUser, IsCompanyManagerOrReadOnly, IsHRStaffOrReadOnly
-import csv
-import io
-import pandas as pd
+from .jobs import enqueue_import_job
+from .archive import AuditLogEntries
+from .audit import log_request
+from .bulk import BULK_UPDATE_FIELDS, bulk_delete_employees, bulk_update_employees
+from .dashboard import get_dashboard
+from .exports import (
+    COMPANY_EXPORT_COLUMNS, EMPLOYEE_EXPORT_COLUMNS, EXPORT_FORMATS, export_response
+)
+from .verification import MATCH, MISMATCH, NOT_FOUND, verify_claims
+from .fuzzy import fuzzy_filter
+from .search import BackendSearchFilter, SEARCH_FIELDS, get_search_backend
+from .pagination import HybridPagination
+from .caching import get_response_cache_ttl, response_cache_key
+from .metrics import PrometheusRenderer, get_metrics_registry
+from .records import refresh_records
 from rest_framework.authtoken.models import Token
 
-class CompanyViewSet(viewsets.ModelViewSet):
-    queryset = Company.objects.all()
-    serializer_class = CompanySerializer
-    permission_classes = [IsAuthenticated, IsCompanyManagerOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['registration_date', 'employee_count']
-    search_fields = ['name', 'registration_number', 'contact_person']
-    ordering_fields = ['name', 'registration_date', 'employee_count']
+class QueryShapingMixin:
+    """
+    Applies the eager loading declared by the view's serializer (see
+    `EagerLoadingMixin`) to its queryset, narrowed to the fields the request
+    selects with `?fields=` / `?exclude=` (see `SparseFieldsMixin`).
+    """
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        setup_eager_loading = getattr(serializer_class, 'setup_eager_loading', None)
+        if setup_eager_loading is not None:
+            queryset = setup_eager_loading(queryset)
+        restrict_queryset = getattr(serializer_class, 'restrict_queryset', None)
+        if restrict_queryset is not None:
+            queryset = restrict_queryset(queryset, self.request)
+        return queryset
+
+
+class FastListMixin:
+    """
+    Serves `list` from `.values()` rows through the serializer's row
+    representation (see `RowRepresentationMixin`), which renders the same data
+    without building model instances and serializers per object. Falls back to
+    the regular `list` for serializers without it, or with
+    `FAST_LIST_SERIALIZATION` off.
+    """
+    def get_values_queryset(self, queryset, serializer_class):
+        if not getattr(settings, 'FAST_LIST_SERIALIZATION', True):
+            return None
+        values_queryset = getattr(serializer_class, 'values_queryset', None)
+        return values_queryset(queryset, self.request) if values_queryset is not None else None
+    
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        rows = self.get_values_queryset(self.filter_queryset(self.get_queryset()), serializer_class)
+        if rows is None:
+            return super().list(request, *args, **kwargs)
+        
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer_class.represent_rows(page, request))
+        return Response(serializer_class.represent_rows(rows, request))
+
+
+class ResponseCacheMixin:
+    """
+    Serves `list` and `retrieve` from the response cache (see `api.caching`),
+    keyed by query parameters, the caller's role and company, and the versions
+    of `cache_models`, which writes to those models bump. Only response data
+    is cached, so content negotiation still applies to cache hits.
+    """
+    cache_models = ()
+    
+    def cached_response(self, handler, request, *args, **kwargs):
+        ttl = get_response_cache_ttl()
+        if not ttl:
+            return handler(request, *args, **kwargs)
+        
+        key = response_cache_key(request, get_access(request), self.cache_models)
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, ttl)
+            response['X-Cache'] = 'MISS'
+        return response
+    
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+    
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+
+class CompanyScopeMixin:
+    """
+    Restricts every user but admins to rows of their own company with a
+    single indexed `company_id = ?` filter; users without a company see
+    nothing. Views that build their queryset themselves call
+    `scope_queryset`.
+    """
+    company_scope_field = 'company_id'
+    scoped_roles = ('company_manager', 'hr_staff', 'regular_user')
+    
+    def get_queryset(self):
+        return self.scope_queryset(super().get_queryset())
+    
+    def scope_queryset(self, queryset):
+        access = get_access(self.request)
+        if access.role not in self.scoped_roles:
+            return queryset
+        if access.company_id is None:
+            return queryset.none()
+        return queryset.filter(**{self.company_scope_field: access.company_id})
+
+
+class BulkUploadMixin:
+    """
+    Adds a `bulk_upload` action that imports rows from a CSV or Excel file.
+    
+    Pass `?mode=upsert` to update rows whose natural key already exists
+    instead of rejecting them, and `?async=true` to run the import as a
+    background job; the response is then the job, which can be polled at
+    `/api/import-jobs/<id>/`. Users other than admins only write rows of
+    their own company (see `get_company_scope`). `?fuzzy_companies=true`
+    accepts close matches for company names not found exactly; the rows
+    resolved that way are listed in the stats.
+    """
+    importer_class = None
+    import_kind = None
+    import_label = 'rows'
 
     @action(detail=False, methods=['post'])
     def bulk_upload(self, request):
@@ -34,140 +168,214 @@ class CompanyViewSet(viewsets.ModelViewSet):
             return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
         
         file = request.FILES['file']
-        if file.name.endswith('.csv'):
-            decoded_file = file.read().decode('utf-8')
-            io_string = io.StringIO(decoded_file)
-            reader = csv.DictReader(io_string)
-            companies = []
-            
-            for row in reader:
-                # Process CSV row into Company object
-                companies.append(Company(
-                    name=row['name'],
-                    registration_date=row['registration_date'],
-                    registration_number=row['registration_number'],
-                    address=row['address'],
-                    contact_person=row['contact_person'],
-                    departments=row['departments'].split(','),
-                    employee_count=int(row['employee_count']),
-                    phone=row['phone'],
-                    email=row['email']
-                ))
-            
-            # Bulk create companies
-            Company.objects.bulk_create(companies)
-            return Response({'message': f'{len(companies)} companies created successfully'})
+        if not file.name.endswith(SUPPORTED_EXTENSIONS):
+            return Response({'error': 'Unsupported file format'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        mode = request.query_params.get('mode', ImportJob.MODE_INSERT)
+        if mode not in dict(ImportJob.MODE_CHOICES):
+            return Response({'error': f'Unsupported mode: {mode}'}, status=status.HTTP_400_BAD_REQUEST)
         
-        elif file.name.endswith(('.xls', '.xlsx')):
-            # Process Excel file
-            df = pd.read_excel(file)
-            companies = []
-            
-            for _, row in df.iterrows():
-                companies.append(Company(
-                    name=row['name'],
-                    registration_date=row['registration_date'],
-                    registration_number=row['registration_number'],
-                    address=row['address'],
-                    contact_person=row['contact_person'],
-                    departments=str(row['departments']).split(','),
-                    employee_count=int(row['employee_count']),
-                    phone=row['phone'],
-                    email=row['email']
-                ))
-            
-            # Bulk create companies
-            Company.objects.bulk_create(companies)
-            return Response({'message': f'{len(companies)} companies created successfully'})
+        company_scope = get_company_scope(get_access(request))
+        fuzzy_companies = request.query_params.get('fuzzy_companies', '').lower() in ('1', 'true', 'yes')
+        if request.query_params.get('async', '').lower() in ('1', 'true', 'yes'):
+            job = ImportJob.objects.create(
+                kind=self.import_kind,
+                mode=mode,
+                fuzzy_companies=fuzzy_companies,
+                file=file,
+                original_name=file.name,
+                created_by=request.user,
+            )
+            enqueue_import_job(job)
+            return Response(ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
         
-        return Response({'error': 'Unsupported file format'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            stats = self.importer_class(
+                mode=mode, company_scope=company_scope, fuzzy_companies=fuzzy_companies,
+            ).run(file)
+        except ImportValidationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Invalid rows are skipped and reported individually
+        errors = stats.pop('errors')
+        if stats['rows_failed'] and not stats['rows']:
+            return Response({
+                'error': 'No valid rows found',
+                'errors': errors,
+                'stats': stats,
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if mode == ImportJob.MODE_UPSERT:
+            message = (
+                f"{stats['inserted']} {self.import_label} created, "
+                f"{stats['updated']} updated, {stats['unchanged']} unchanged"
+            )
+        else:
+            message = f"{stats['rows']} {self.import_label} created successfully"
+        if stats.get('fuzzy_companies'):
+            message += f", {len(stats['fuzzy_companies'])} with an approximate company match"
+        if stats['rows_failed']:
+            message += f", {stats['rows_failed']} rows failed validation"
+        return Response({'message': message, 'errors': errors, 'stats': stats})
+
+
+class ExportMixin:
+    """
+    Adds an `export` action that streams the filtered list as CSV, or as an
+    Excel file with `?file_type=xlsx`, in the column layout of the upload
+    template so it can be re-imported through `bulk_upload`.
+    """
+    export_columns = ()
+    export_name = 'export'
+    export_sheet_title = 'Sheet'
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        file_type = request.query_params.get('file_type', 'csv')
+        if file_type not in EXPORT_FORMATS:
+            return Response({'error': f'Unsupported file type: {file_type}'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(
+            queryset, self.export_columns, file_type, self.export_name, self.export_sheet_title
+        )
+
+
+class CompanyViewSet(ResponseCacheMixin, FastListMixin, CompanyScopeMixin, QueryShapingMixin, BulkUploadMixin, ExportMixin, viewsets.ModelViewSet):
+    queryset = Company.objects.all()
+    company_scope_field = 'pk'
+    cache_models = ('company',)
+    serializer_class = CompanySerializer
+    permission_classes = [IsAuthenticated, IsCompanyManagerOrReadOnly]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['registration_date', 'employee_count']
+    search_fields = ['name', 'registration_number', 'contact_person']
+    ordering_fields = ['name', 'registration_date', 'employee_count']
+    importer_class = CompanyImporter
+    import_kind = ImportJob.KIND_COMPANY
+    import_label = 'companies'
+    export_columns = COMPANY_EXPORT_COLUMNS
+    export_name = 'companies'
+    export_sheet_title = 'Companies'
 
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+class EmployeeViewSet(ResponseCacheMixin, FastListMixin, CompanyScopeMixin, QueryShapingMixin, BulkUploadMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Employee.objects.all()
+    cache_models = ('employee', 'company')
     serializer_class = EmployeeSerializer
     permission_classes = [IsAuthenticated, IsHRStaffOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, BackendSearchFilter, filters.OrderingFilter]
     filterset_fields = ['company', 'department', 'start_date', 'end_date']
     search_fields = ['name', 'employee_id', 'role']
     ordering_fields = ['name', 'start_date', 'end_date']
-
-    @action(detail=False, methods=['post'])
-    def bulk_upload(self, request):
-        if 'file' not in request.FILES:
-            return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
+    importer_class = EmployeeImporter
+    import_kind = ImportJob.KIND_EMPLOYEE
+    import_label = 'employees'
+    export_columns = EMPLOYEE_EXPORT_COLUMNS
+    export_name = 'employees'
+    export_sheet_title = 'Employees'
+    
+    # Filters accepted by bulk_update and bulk_delete, mapped to ORM lookups
+    bulk_filter_fields = {
+        'company': 'company_id',
+        'department': 'department',
+        'role': 'role',
+        'start_date': 'start_date',
+        'end_date': 'end_date',
+        'is_active': 'end_date__isnull',
+    }
+    
+    def get_bulk_queryset(self, data):
+        """
+        The employees selected by a bulk request's `ids` and/or `filter`,
+        within the caller's company scope. All `ids` must be in scope; they
+        are checked with a single query.
+        """
+        ids = data.get('ids') or []
+        criteria = data.get('filter') or {}
+        if not isinstance(ids, list) or not isinstance(criteria, dict) or not (ids or criteria):
+            raise ValidationError({'error': 'Provide a list of "ids" and/or a non-empty "filter"'})
+        unknown = set(criteria) - set(self.bulk_filter_fields)
+        if unknown:
+            raise ValidationError({'error': f"Unsupported filter fields: {', '.join(sorted(unknown))}"})
         
-        file = request.FILES['file']
-        if file.name.endswith('.csv'):
-            decoded_file = file.read().decode('utf-8')
-            io_string = io.StringIO(decoded_file)
-            reader = csv.DictReader(io_string)
-            employees = []
-            
-            for row in reader:
-                # Get company by name or ID
-                try:
-                    if 'company_id' in row:
-                        company = Company.objects.get(id=row['company_id'])
-                    else:
-                        company = Company.objects.get(name=row['company'])
-                    
-                    # Process CSV row into Employee object
-                    employees.append(Employee(
-                        name=row['name'],
-                        employee_id=row['employee_id'],
-                        company=company,
-                        department=row['department'],
-                        role=row['role'],
-                        start_date=row['start_date'],
-                        end_date=row['end_date'] if row['end_date'] else None,
-                        duties=row['duties']
-                    ))
-                except Company.DoesNotExist:
-                    return Response({
-                        'error': f'Company not found: {row.get("company", row.get("company_id"))}'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Bulk create employees
-            Employee.objects.bulk_create(employees)
-            return Response({'message': f'{len(employees)} employees created successfully'})
+        queryset = self.get_queryset()
+        try:
+            lookups = {self.bulk_filter_fields[field]: value for field, value in criteria.items()}
+            if 'is_active' in criteria:
+                lookups['end_date__isnull'] = str(criteria['is_active']).lower() in ('1', 'true', 'yes')
+            queryset = queryset.filter(**lookups)
+            if ids:
+                ids = {int(pk) for pk in ids}
+                queryset = queryset.filter(pk__in=ids)
+        except (TypeError, ValueError, DjangoValidationError):
+            raise ValidationError({'error': 'Invalid "ids" or "filter" values'})
+        
+        if ids:
+            missing = ids - set(queryset.values_list('pk', flat=True))
+            if missing:
+                raise ValidationError({
+                    'error': 'Some employees were not found or do not match the filter',
+                    'missing_ids': sorted(missing),
+                })
+        return queryset
+    
+    def get_bulk_changes(self, request):
+        changes = request.data.get('changes')
+        if not isinstance(changes, dict) or not changes:
+            raise ValidationError({'error': 'Provide the "changes" to apply'})
+        unknown = set(changes) - set(BULK_UPDATE_FIELDS)
+        if unknown:
+            raise ValidationError({'error': f"Fields cannot be bulk updated: {', '.join(sorted(unknown))}"})
+        
+        serializer = self.get_serializer(data=changes, partial=True)
+        serializer.is_valid(raise_exception=True)
+        changes = dict(serializer.validated_data)
         
-        elif file.name.endswith(('.xls', '.xlsx')):
-            # Process Excel file
-            df = pd.read_excel(file)
-            employees = []
-            
-            for _, row in df.iterrows():
-                try:
-                    if 'company_id' in df.columns:
-                        company = Company.objects.get(id=row['company_id'])
-                    else:
-                        company = Company.objects.get(name=row['company'])
-                    
-                    employees.append(Employee(
-                        name=row['name'],
-                        employee_id=row['employee_id'],
-                        company=company,
-                        department=row['department'],
-                        role=row['role'],
-                        start_date=row['start_date'],
-                        end_date=row['end_date'] if pd.notna(row['end_date']) else None,
-                        duties=row['duties']
-                    ))
-                except Company.DoesNotExist:
-                    return Response({
-                        'error': f'Company not found: {row.get("company", row.get("company_id"))}'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Bulk create employees
-            Employee.objects.bulk_create(employees)
-            return Response({'message': f'{len(employees)} employees created successfully'})
+        # Scoped users cannot move employees out of their company
+        access = get_access(request)
+        if 'company' in changes and access.role in self.scoped_roles and changes['company'].pk != access.company_id:
+            raise PermissionDenied('Employees can only be moved within your own company.')
+        return changes
+    
+    @action(detail=False, methods=['post'])
+    def bulk_update(self, request):
+        """
+        Apply `changes` to the selected employees in a single UPDATE, e.g.
+        `{"filter": {"department": "Sales"}, "changes": {"end_date": "2024-05-31"}}`.
+        """
+        queryset = self.get_bulk_queryset(request.data)
+        changes = self.get_bulk_changes(request)
+        matched, updated = bulk_update_employees(queryset, changes)
         
-        return Response({'error': 'Unsupported file format'}, status=status.HTTP_400_BAD_REQUEST)
+        log_request(request, action='update', entity_type='employee', details={
+            'bulk': True,
+            'ids': request.data.get('ids'),
+            'filter': request.data.get('filter'),
+            'changes': request.data['changes'],
+            'matched': matched,
+            'updated': updated,
+        })
+        return Response({'matched': matched, 'updated': updated})
+    
+    @action(detail=False, methods=['post'])
+    def bulk_delete(self, request):
+        """Delete the employees selected by `ids` and/or `filter` in a single DELETE."""
+        queryset = self.get_bulk_queryset(request.data)
+        deleted = bulk_delete_employees(queryset)
+        
+        log_request(request, action='delete', entity_type='employee', details={
+            'bulk': True,
+            'ids': request.data.get('ids'),
+            'filter': request.data.get('filter'),
+            'deleted': deleted,
+        })
+        return Response({'deleted': deleted})
 
 
-class EmploymentHistoryViewSet(viewsets.ReadOnlyModelViewSet):
+class EmploymentHistoryViewSet(ResponseCacheMixin, FastListMixin, CompanyScopeMixin, QueryShapingMixin, viewsets.ReadOnlyModelViewSet):
     queryset = EmploymentHistory.objects.all()
+    cache_models = ('employmenthistory', 'employee', 'company')
     serializer_class = EmploymentHistorySerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -176,7 +384,59 @@ class EmploymentHistoryViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['start_date', 'end_date']
 
 
-class UserProfileViewSet(viewsets.ModelViewSet):
+class VerificationRecordViewSet(CompanyScopeMixin, QueryShapingMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Denormalized verification records (see `api.records`).
+    `/api/verification-records/<employee_id>/` returns an employee's current
+    position and full employment history from a single indexed row.
+    """
+    queryset = VerificationRecord.objects.all()
+    serializer_class = VerificationRecordSerializer
+    permission_classes = [IsAuthenticated]
+    lookup_field = 'employee_number'
+    lookup_url_kwarg = 'employee_id'
+    lookup_value_regex = '[^/]+'
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['company', 'department', 'end_date']
+    ordering_fields = ['employee_number', 'name', 'start_date']
+    
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            # Employees written before the read model existed are built on first lookup
+            employee_pk = Employee.objects.filter(
+                employee_id=self.kwargs[self.lookup_url_kwarg]
+            ).values_list('pk', flat=True).first()
+            if employee_pk is None or not refresh_records([employee_pk]):
+                raise
+            return super().get_object()
+    
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        log_request(
+            request, action='view', entity_type='verification', entity_id=kwargs[self.lookup_url_kwarg]
+        )
+        return response
+
+
+class ImportJobViewSet(QueryShapingMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['kind', 'status']
+    ordering_fields = ['created_at']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Non-admin users only see the jobs they started
+        if get_access(self.request).role != 'admin':
+            queryset = queryset.filter(created_by=self.request.user)
+        return queryset
+
+
+class UserProfileViewSet(QueryShapingMixin, viewsets.ModelViewSet):
     queryset = UserProfile.objects.all()
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated, IsAdminUser]
@@ -185,7 +445,13 @@ class UserProfileViewSet(viewsets.ModelViewSet):
     search_fields = ['user__username', 'user__email', 'user__first_name', 'user__last_name']
 
 
-class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
+class AuditLogViewSet(FastListMixin, QueryShapingMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Pass `?from=` and/or `?to=` (ISO date or datetime, `to` inclusive for
+    dates) to limit entries to a date range. When the range reaches entries
+    moved out by `archive_audit_logs`, they are read back from the archive
+    files and merged in.
+    """
     queryset = AuditLog.objects.all()
     serializer_class = AuditLogSerializer
     permission_classes = [IsAuthenticated, IsAdminUser]
@@ -193,6 +459,84 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_fields = ['user', 'action', 'entity_type', 'timestamp']
     search_fields = ['user__username', 'entity_type', 'entity_id']
     ordering_fields = ['timestamp']
+    
+    def get_date_range(self):
+        params = self.request.query_params
+        start = parse_range_bound(params['from']) if params.get('from') else None
+        end = parse_range_bound(params['to'], end=True) if params.get('to') else None
+        return start, end
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        start, end = self.get_date_range()
+        if start:
+            queryset = queryset.filter(timestamp__gte=start)
+        if end:
+            queryset = queryset.filter(timestamp__lt=end)
+        return queryset
+    
+    def list(self, request, *args, **kwargs):
+        start, end = self.get_date_range()
+        archives = AuditLogArchive.objects.all()
+        if start:
+            archives = archives.filter(last_timestamp__gte=start)
+        if end:
+            archives = archives.filter(first_timestamp__lt=end)
+        if not (start or end) or not archives.exists():
+            return super().list(request, *args, **kwargs)
+        
+        # Live rows are paged in SQL, archive files are read only past them
+        params = request.query_params
+        filtered = any(params.get(name) for name in ('user', 'action', 'entity_type', 'search'))
+        entries = AuditLogEntries(
+            self.filter_queryset(self.get_queryset()), start, end,
+            self.matches_filters if filtered else None,
+        )
+        page = self.paginate_queryset(entries)
+        data = [self.represent(entry) for entry in (entries[0:] if page is None else page)]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+    
+    def matches_filters(self, record):
+        """Apply the list filters to an archived entry."""
+        params = self.request.query_params
+        for field in ('user', 'action', 'entity_type'):
+            if params.get(field) and str(record[field]) != params[field]:
+                return False
+        text = ' '.join(str(record[field] or '') for field in ('username', 'entity_type', 'entity_id')).lower()
+        return all(term.lower() in text for term in params.get('search', '').split())
+    
+    def represent(self, entry):
+        if isinstance(entry, AuditLog):
+            return self.get_serializer(entry).data
+        data = {**entry, 'timestamp': serializers.DateTimeField().to_representation(entry['timestamp'])}
+        if data['user'] is None:
+            # As AuditLogSerializer, which skips user.username without a user
+            del data['username']
+        selected = AuditLogSerializer.selected_field_names(
+            self.request, list(AuditLogSerializer.get_field_sources())
+        )
+        return data if selected is None else {name: data[name] for name in selected if name in data}
+
+
+def parse_range_bound(value, end=False):
+    """
+    Parse an ISO date or datetime query parameter into an aware datetime. A
+    date used as an end bound covers that whole day.
+    """
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError
+            parsed = datetime.combine(day + timedelta(days=1) if end else day, datetime.min.time())
+    except ValueError:
+        raise ValidationError({'date': f'Invalid date: {value}'})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
 
 
 class RegisterView(APIView):
@@ -227,53 +571,68 @@ class RegisterView(APIView):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
-class SearchView(APIView):
+class SearchView(ResponseCacheMixin, FastListMixin, CompanyScopeMixin, APIView):
     permission_classes = [IsAuthenticated]
+    cache_models = ('employee', 'company')
     
-    def get(self, request):
-        serializer = SearchSerializer(data=request.query_params)
+    def get_queryset(self):
+        serializer = SearchSerializer(data=self.request.query_params)
         serializer.is_valid(raise_exception=True)
         
         # Build query based on search parameters
         query = Q()
         
-        if 'name' in serializer.validated_data:
-            query &= Q(name__icontains=serializer.validated_data['name'])
-        
-        if 'employee_id' in serializer.validated_data:
-            query &= Q(employee_id__icontains=serializer.validated_data['employee_id'])
-        
-        if 'company' in serializer.validated_data:
-            query &= Q(company__name__icontains=serializer.validated_data['company'])
-        
-        if 'department' in serializer.validated_data:
-            query &= Q(department__icontains=serializer.validated_data['department'])
-        
-        if 'role' in serializer.validated_data:
-            query &= Q(role__icontains=serializer.validated_data['role'])
-        
         if 'start_date_from' in serializer.validated_data:
             query &= Q(start_date__gte=serializer.validated_data['start_date_from'])
         
         if 'start_date_to' in serializer.validated_data:
             query &= Q(start_date__lte=serializer.validated_data['start_date_to'])
         
-        if 'is_active' in serializer.validated_data:
+        if serializer.validated_data.get('is_active') is not None:
             if serializer.validated_data['is_active']:
                 query &= Q(end_date__isnull=True)
             else:
                 query &= Q(end_date__isnull=False)
         
+        # Text terms go through the search backend's indexes
+        backend = get_search_backend()
+        terms = {
+            field: serializer.validated_data[field]
+            for field in SEARCH_FIELDS if field in serializer.validated_data
+        }
+        employees = self.scope_queryset(Employee.objects.filter(query))
+        if serializer.validated_data['fuzzy']:
+            employees = fuzzy_filter(employees, terms.pop('name', None), terms.pop('company', None))
+        employees = backend.filter(employees, terms)
+        if serializer.validated_data.get('q'):
+            employees = backend.search(employees, serializer.validated_data['q'])
+        return employees
+    
+    def get(self, request):
+        return self.cached_response(self.search, request)
+    
+    def search(self, request):
+        employees = self.get_queryset()
+        
         # Execute query
-        employees = Employee.objects.filter(query)
+        employees = EmployeeSerializer.setup_eager_loading(employees)
+        employees = EmployeeSerializer.restrict_queryset(employees, request)
+        context = {'request': request}
+        
+        rows = self.get_values_queryset(employees, EmployeeSerializer)
+        if rows is not None:
+            page = self.paginate_queryset(rows)
+            if page is not None:
+                return self.get_paginated_response(EmployeeSerializer.represent_rows(page, request))
+            return Response(EmployeeSerializer.represent_rows(rows, request))
         
         # Paginate results
         page = self.paginate_queryset(employees)
         if page is not None:
-            serializer = EmployeeSerializer(page, many=True)
+            serializer = EmployeeSerializer(page, many=True, context=context)
             return self.get_paginated_response(serializer.data)
         
-        serializer = EmployeeSerializer(employees, many=True)
+        serializer = EmployeeSerializer(employees, many=True, context=context)
         return Response(serializer.data)
     
     @property
@@ -282,8 +641,7 @@ class SearchView(APIView):
         The paginator instance associated with the view, or `None`.
         """
         if not hasattr(self, '_paginator'):
-            from rest_framework.pagination import PageNumberPagination
-            self._paginator = PageNumberPagination()
+            self._paginator = HybridPagination()
         return self._paginator
     
     def paginate_queryset(self, queryset):
@@ -302,33 +660,69 @@ class SearchView(APIView):
         return self.paginator.get_paginated_response(data)
 
 
-class DashboardView(APIView):
-    permission_classes = [IsAuthenticated]
+class SearchExportView(SearchView):
+    """Streams the results of a search as CSV, or Excel with `?file_type=xlsx`."""
     
     def get(self, request):
-        # Get counts for dashboard metrics
-        total_companies = Company.objects.count()
-        total_employees = Employee.objects.count()
-        active_employees = Employee.objects.filter(end_date__isnull=True).count()
-        recent_activities = AuditLog.objects.all().order_by('-timestamp')[:10]
-        
-        # Get top companies by employee count
-        top_companies = Company.objects.order_by('-employee_count')[:5]
-        
-        # Get recent employees
-        recent_employees = Employee.objects.order_by('-created_at')[:5]
+        file_type = request.query_params.get('file_type', 'csv')
+        if file_type not in EXPORT_FORMATS:
+            return Response({'error': f'Unsupported file type: {file_type}'}, status=status.HTTP_400_BAD_REQUEST)
+        return export_response(
+            self.get_queryset(), EMPLOYEE_EXPORT_COLUMNS, file_type, 'search-results', 'Employees'
+        )
+
+
+class VerifyBatchView(CompanyScopeMixin, APIView):
+    """
+    Verifies a batch of employment claims, e.g.
+    `{"claims": [{"reference": "c-1", "name": "...", "employee_id": "...", "role": "..."}]}`,
+    returning one verdict per claim in the same order. Users other than
+    admins only verify claims against employees of their own company.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        serializer = VerificationBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        claims = serializer.validated_data['claims']
         
-        data = {
-            'metrics': {
-                'total_companies': total_companies,
-                'total_employees': total_employees,
-                'active_employees': active_employees,
-                'inactive_employees': total_employees - active_employees,
-            },
-            'top_companies': CompanySerializer(top_companies, many=True).data,
-            'recent_employees': EmployeeSerializer(recent_employees, many=True).data,
-            'recent_activities': AuditLogSerializer(recent_activities, many=True).data,
-        }
+        started = time.perf_counter()
+        results = verify_claims(claims, self.scope_queryset(Employee.objects.all()))
+        seconds = time.perf_counter() - started
         
-        return Response(data)
+        summary = {status_name: 0 for status_name in (MATCH, MISMATCH, NOT_FOUND)}
+        for result in results:
+            summary[result['status']] += 1
+        log_request(request, action='view', entity_type='verification', details={
+            'claims': len(claims), **summary,
+        })
+        return Response({
+            'results': results,
+            'summary': summary,
+            'seconds': round(seconds, 3),
+        })
 
+
+class DashboardView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        # Served from denormalized counters and a short-lived payload cache
+        return Response(get_dashboard())
+
+
+class MetricsView(APIView):
+    """
+    Per-endpoint latency, query and response size histograms collected by
+    `MetricsMiddleware` in this process. `?format=prometheus` returns the
+    Prometheus text format; DELETE resets the histograms.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, PrometheusRenderer]
+    
+    def get(self, request):
+        return Response(get_metrics_registry().snapshot())
+    
+    def delete(self, request):
+        get_metrics_registry().reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
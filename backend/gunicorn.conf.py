@@ -0,0 +1,30 @@
+"""
+Gunicorn settings. The Procfile passes this file with `-c`; gunicorn also
+reads it when started from this directory.
+
+Import jobs run on threads inside the workers, so jobs a previous server
+left pending or running will never finish. The master marks them failed
+once, before any worker starts taking new jobs.
+"""
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+wsgi_app = 'talent_verify.wsgi'
+
+
+def on_starting(server):
+    # The project package lives next to this file, whatever the working directory
+    if BASE_DIR not in sys.path:
+        sys.path.insert(0, BASE_DIR)
+
+    import django
+    from django.core.management import call_command
+    from django.db import connections
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'talent_verify.settings')
+    django.setup()
+    call_command('fail_interrupted_jobs')
+    # Workers must not inherit the master's connection
+    connections.close_all()
@@ -32,6 +32,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -40,6 +41,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.AuditLogMiddleware',
 ]
 
 ROOT_URLCONF = 'talent_verify.urls'
@@ -80,6 +82,9 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # Seconds a write waits for SQLite's single write lock (held by a
+            # request or the audit log writer) before "database is locked"
+            'OPTIONS': {'timeout': int(os.environ.get('SQLITE_TIMEOUT', '20'))},
         }
     }
 
@@ -112,6 +117,10 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Uploaded files (import job sources)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -129,7 +138,17 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # orjson-backed JSON; falls back to DRF's encoder when orjson is missing
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.HybridPagination',
     'PAGE_SIZE': 10,
     'UNAUTHENTICATED_USER': None,
 }
@@ -147,6 +166,9 @@ SIMPLE_JWT = {
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    # Embed role and company_id claims in access tokens (see api.tokens)
+    'TOKEN_OBTAIN_SERIALIZER': 'api.tokens.ProfileTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'api.tokens.ProfileTokenRefreshSerializer',
     'TOKEN_TYPE_CLAIM': 'token_type',
     'JTI_CLAIM': 'jti',
     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
@@ -154,6 +176,80 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=7),
 }
 
+# Background import jobs
+IMPORT_JOB_WORKERS = int(os.environ.get('IMPORT_JOB_WORKERS', '2'))
+
+# Cache backend: 'locmem' (per process, the default), 'file' (CACHE_LOCATION is
+# a directory) or 'redis' (CACHE_LOCATION is a redis:// URL; needs the redis
+# package). Use a shared backend when running several worker processes.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION', str(BASE_DIR / 'cache') if CACHE_BACKEND == 'file' else ''
+        ),
+        'OPTIONS': {} if CACHE_BACKEND == 'redis' else {
+            'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '10000')),
+        },
+    }
+}
+
+# Seconds the dashboard payload is cached for
+DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', '60'))
+
+# Seconds list, detail and search responses are cached for; 0 disables.
+# Writes invalidate cached responses through version keys kept in the cache
+# itself. With 'locmem' each worker process has its own, so a write handled
+# by one worker leaves the others serving their cached responses until they
+# expire: the default is a few seconds with 'locmem' and five minutes with a
+# shared backend. Raise it with 'locmem' only when running a single worker.
+RESPONSE_CACHE_TTL = int(
+    os.environ.get('RESPONSE_CACHE_TTL', '5' if CACHE_BACKEND == 'locmem' else '300')
+)
+
+# Serve list and search responses from .values() rows instead of model
+# instances where the serializer supports it (same output, less CPU)
+FAST_LIST_SERIALIZATION = os.environ.get('FAST_LIST_SERIALIZATION', 'True') == 'True'
+
+# Employee search backend: 'auto' picks Postgres full-text/trigram or SQLite FTS5
+# based on the database, 'database' forces plain icontains filters
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')
+
+# Upper bound for the client-selectable ?page_size= on list endpoints
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '100'))
+
+# Maximum number of claims accepted by /api/verify/batch/
+VERIFY_BATCH_MAX_CLAIMS = int(os.environ.get('VERIFY_BATCH_MAX_CLAIMS', '5000'))
+
+# Seconds before the in-process fuzzy name indexes are rebuilt in the
+# background to pick up writes made by other processes
+NAME_INDEX_MAX_AGE = int(os.environ.get('NAME_INDEX_MAX_AGE', '600'))
+
+# Batched audit logging (see api.audit for all options). Entries are written
+# from a background thread unless AUDIT_LOG_ASYNC=False
+AUDIT_LOG = {
+    'ASYNC': os.environ.get('AUDIT_LOG_ASYNC', 'True') == 'True',
+    'BATCH_SIZE': int(os.environ.get('AUDIT_LOG_BATCH_SIZE', '500')),
+    'FLUSH_INTERVAL': float(os.environ.get('AUDIT_LOG_FLUSH_INTERVAL', '2')),
+    'VIEW_SAMPLE_RATE': float(os.environ.get('AUDIT_LOG_VIEW_SAMPLE_RATE', '1')),
+    'VIEW_SUPPRESS_SECONDS': int(os.environ.get('AUDIT_LOG_VIEW_SUPPRESS_SECONDS', '0')),
+    'RETENTION_DAYS': int(os.environ.get('AUDIT_LOG_RETENTION_DAYS', '90')),
+}
+
+# Per-endpoint request metrics served at /api/metrics/ (see api.metrics)
+METRICS = {
+    'ENABLED': os.environ.get('METRICS_ENABLED', 'True') == 'True',
+    'SLOW_REQUEST_MS': int(os.environ.get('METRICS_SLOW_REQUEST_MS', '1000')),
+    'SLOW_QUERY_MS': int(os.environ.get('METRICS_SLOW_QUERY_MS', '200')),
+    'LOG_SQL': os.environ.get('METRICS_LOG_SQL', 'True') == 'True',
+}
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = os.environ.get('CORS_ALLOWED_ORIGINS', 'http://localhost:3000').split(',')
 CORS_ALLOW_CREDENTIALS = True